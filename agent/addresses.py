@@ -0,0 +1,50 @@
+"""
+Compact IP address representation for the connection path.
+
+Addresses travel as a single int in the IPv6 space: IPv4 addresses are
+stored IPv4-mapped (::ffff:a.b.c.d), IPv6 addresses as their 128-bit value.
+Both families therefore share one key type that hashes and compares as a
+plain int, and formatting to text happens only at the edges (DNS, DB rows,
+UI), through a cached format_address().
+"""
+import socket
+from functools import lru_cache
+
+V4_MAPPED_PREFIX = 0xFFFF << 32
+V4_MAPPED_MASK = ~0xFFFFFFFF & ((1 << 128) - 1)
+
+UNSPECIFIED = 0 # "::", used when a source has no address
+
+def from_v4(value: int) -> int:
+    """Host-order 32-bit IPv4 address (as WFP reports it) -> address key."""
+    return V4_MAPPED_PREFIX | (value & 0xFFFFFFFF)
+
+def from_v4_bytes(packed: bytes) -> int:
+    """4 bytes in network order -> address key."""
+    return V4_MAPPED_PREFIX | int.from_bytes(packed, "big")
+
+def from_v6_bytes(packed) -> int:
+    """16 bytes in network order (bytes or a ctypes UINT8[16]) -> address key."""
+    return int.from_bytes(bytes(packed), "big")
+
+def is_v4(key: int) -> bool:
+    return key & V4_MAPPED_MASK == V4_MAPPED_PREFIX
+
+@lru_cache(maxsize=8192)
+def format_address(key: int) -> str:
+    """Address key -> '10.0.0.1' / '2001:db8::1'."""
+    if is_v4(key):
+        return socket.inet_ntop(socket.AF_INET, (key & 0xFFFFFFFF).to_bytes(4, "big"))
+    return socket.inet_ntop(socket.AF_INET6, key.to_bytes(16, "big"))
+
+@lru_cache(maxsize=8192)
+def parse_address(text: str) -> int:
+    """'10.0.0.1' / '2001:db8::1' -> address key. Unparseable text maps to UNSPECIFIED."""
+    try:
+        if ":" in text:
+            key = from_v6_bytes(socket.inet_pton(socket.AF_INET6, text.split("%", 1)[0]))
+        else:
+            key = from_v4_bytes(socket.inet_pton(socket.AF_INET, text))
+    except (OSError, ValueError, AttributeError):
+        return UNSPECIFIED
+    return key
@@ -0,0 +1,274 @@
+"""
+Connection sources for the enrichment pipeline.
+
+A ConnectionSource yields one raw record per live connection each poll, in
+the shape of agent.wfp_enum.connection_info():
+
+    {"id", "process_id", "local_addr", "local_port", "remote_addr", "remote_port", "direction"}
+
+with addresses as agent.addresses int keys.
+
+Replayed records may also carry "process_name"/"process_path"/"parent_info",
+which the pipeline then uses instead of resolving the (foreign) PID.
+
+- WfpConnectionSource: FwpmConnectionEnum0 on Windows (the agent's source)
+- ProcNetSource:       /proc/net/tcp and /proc/net/tcp6 on Linux
+- ReplaySource:        a recorded trace, optionally paced to a target rate
+"""
+import csv
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, List, Optional
+
+from agent.addresses import UNSPECIFIED, format_address, from_v4_bytes, from_v6_bytes, parse_address
+from agent.wfp_enum import DEFAULT_PAGE_SIZE, connection_info, iter_enum
+from agent.wfp_types import FWPM_CONNECTION0
+
+class ConnectionSource(ABC):
+    """Produces the raw records of the live connections, once per poll."""
+
+    name = "abstract"
+
+    @abstractmethod
+    def iter_connections(self) -> Iterator[dict]:
+        """Streams one raw record per connection currently open."""
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+class WfpConnectionSource(ConnectionSource):
+    """Paginated FwpmConnectionEnum0 over an open WFP engine session."""
+
+    name = "wfp"
+
+    def __init__(self, lib, engine_handle, page_size=DEFAULT_PAGE_SIZE):
+        """
+        Args:
+            lib: fwpuclnt
+            engine_handle: HANDLE filled in by FwpmEngineOpen0 (read at every poll)
+        """
+        self.lib = lib
+        self.engine_handle = engine_handle
+        self.page_size = page_size
+
+    def iter_connections(self, page_size=None):
+        return iter_enum(self.lib, "Connection", self.engine_handle, FWPM_CONNECTION0, connection_info,
+                         page_size=page_size or self.page_size)
+
+# /proc/net/tcp socket states
+TCP_ESTABLISHED = 0x01
+TCP_SYN_SENT = 0x02
+TCP_SYN_RECV = 0x03
+TCP_LISTEN = 0x0A
+
+# States that correspond to a connection WFP would list
+LIVE_STATES = (TCP_ESTABLISHED, TCP_SYN_SENT, TCP_SYN_RECV)
+
+def decode_proc_address(value: str):
+    """'0100007F:0050' -> (address key of 127.0.0.1, 80). IPv6 addresses are four host-order 32-bit words."""
+    address, port = value.split(":")
+    raw = bytes.fromhex(address)
+    if len(raw) == 4:
+        return from_v4_bytes(raw[::-1]), int(port, 16)
+    words = b"".join(raw[i:i + 4][::-1] for i in range(0, 16, 4))
+    return from_v6_bytes(words), int(port, 16)
+
+class ProcNetSource(ConnectionSource):
+    """
+    Linux TCP connections from /proc/net/tcp and tcp6.
+
+    The socket inode is the connection id. Owning PIDs come from the
+    socket:[inode] links in /proc/<pid>/fd; the inode -> pid map is cached
+    and only rescanned for inodes not seen before (sockets of processes we
+    may not inspect keep process_id 0). A connection whose local port has a
+    listening socket is Inbound, anything else Outbound.
+    """
+
+    name = "procnet"
+
+    def __init__(self, proc_root="/proc", files=("net/tcp", "net/tcp6")):
+        self.proc_root = proc_root
+        self.files = files
+        self._owners = {} # inode -> pid
+
+    def _read_sockets(self):
+        for name in self.files:
+            path = os.path.join(self.proc_root, name)
+            try:
+                with open(path, encoding="ascii") as f:
+                    next(f, None) # header
+                    for line in f:
+                        fields = line.split()
+                        if len(fields) < 10:
+                            continue
+                        yield fields[1], fields[2], int(fields[3], 16), int(fields[9])
+            except FileNotFoundError:
+                continue
+
+    def _scan_owners(self, wanted):
+        """Maps the wanted socket inodes to PIDs with one pass over /proc/*/fd."""
+        found = {}
+        try:
+            pids = [entry.name for entry in os.scandir(self.proc_root) if entry.name.isdigit()]
+        except OSError:
+            return found
+        for pid in pids:
+            fd_dir = os.path.join(self.proc_root, pid, "fd")
+            try:
+                fds = os.scandir(fd_dir)
+            except OSError:
+                continue # exited, or not ours to inspect
+            with fds:
+                for fd in fds:
+                    try:
+                        target = os.readlink(fd.path)
+                    except OSError:
+                        continue
+                    if target.startswith("socket:["):
+                        inode = int(target[8:-1])
+                        if inode in wanted:
+                            found[inode] = int(pid)
+            if len(found) == len(wanted):
+                break
+        return found
+
+    def iter_connections(self):
+        sockets = list(self._read_sockets())
+        listening = {decode_proc_address(local)[1] for local, _, state, _ in sockets if state == TCP_LISTEN}
+        live = [s for s in sockets if s[2] in LIVE_STATES and s[3]]
+
+        inodes = {inode for *_, inode in live}
+        unknown = inodes - self._owners.keys()
+        if unknown:
+            self._owners.update(self._scan_owners(unknown))
+        # Forget closed sockets
+        self._owners = {inode: pid for inode, pid in self._owners.items() if inode in inodes}
+
+        for local, remote, state, inode in live:
+            local_addr, local_port = decode_proc_address(local)
+            remote_addr, remote_port = decode_proc_address(remote)
+            yield {
+                "id": inode,
+                "process_id": self._owners.get(inode, 0),
+                "local_addr": local_addr,
+                "local_port": local_port,
+                "remote_addr": remote_addr,
+                "remote_port": remote_port,
+                "direction": "Inbound" if local_port in listening else "Outbound",
+            }
+
+# Fields kept when recording or loading a trace (addresses as text, see _normalize)
+TRACE_FIELDS = (
+    "id", "process_id", "local_ip", "local_port", "remote_ip", "remote_port", "direction",
+    "process_name", "process_path", "parent_info",
+)
+
+def _normalize(record: dict, index: int) -> dict:
+    out = {key: record[key] for key in TRACE_FIELDS if record.get(key) not in (None, "")}
+    out["id"] = int(out.get("id", index))
+    out["process_id"] = int(out.get("process_id", 0))
+    out["local_port"] = int(out.get("local_port", 0))
+    out["remote_port"] = int(out.get("remote_port", 0))
+    # Text addresses in the trace, int keys in the records
+    out["local_addr"] = parse_address(out.pop("local_ip")) if "local_ip" in out else record.get("local_addr", UNSPECIFIED)
+    out["remote_addr"] = parse_address(out.pop("remote_ip")) if "remote_ip" in out else record.get("remote_addr", UNSPECIFIED)
+    out.setdefault("direction", "Outbound")
+    return out
+
+def _to_trace(record: dict) -> dict:
+    out = {key: record[key] for key in TRACE_FIELDS if key in record}
+    out["local_ip"] = format_address(record["local_addr"])
+    out["remote_ip"] = format_address(record["remote_addr"])
+    return out
+
+def load_trace(path) -> List[dict]:
+    """Reads a JSON-lines trace (record_trace) or an export_data.py CSV."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if str(path).endswith(".csv"):
+            records = list(csv.DictReader(f))
+        else:
+            records = [json.loads(line) for line in f if line.strip()]
+    return [_normalize(record, i) for i, record in enumerate(records)]
+
+def record_trace(source: ConnectionSource, path, polls=1, interval=1.0, process_cache=None) -> int:
+    """
+    Appends `polls` enumerations of source to a JSON-lines trace for ReplaySource.
+    With a process_cache, process name/path are stored too, so the trace
+    replays meaningfully on another machine. Returns the records written.
+    """
+    count = 0
+    with open(path, "a", encoding="utf-8") as f:
+        for poll in range(polls):
+            if poll:
+                time.sleep(interval)
+            records = list(source.iter_connections())
+            processes = process_cache.resolve_many(r["process_id"] for r in records) if process_cache else {}
+            for record in records:
+                proc = processes.get(record["process_id"])
+                if proc is not None:
+                    record = dict(record, process_name=proc.name, process_path=proc.path,
+                                  parent_info=proc.parent_info)
+                f.write(json.dumps(_to_trace(record)) + "\n")
+                count += 1
+    return count
+
+class ReplaySource(ConnectionSource):
+    """
+    Replays recorded connections, batch_size per poll (all remaining if None),
+    paced to `rate` connections per second across polls (unpaced if None).
+    Every replayed record gets a fresh id, so each one is a new connection to
+    the pipeline. With loop=True the trace restarts when it is exhausted.
+    """
+
+    name = "replay"
+
+    def __init__(self, records: Iterable[dict], rate: Optional[float] = None,
+                 batch_size: Optional[int] = None, loop: bool = False,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.records = [_normalize(record, i) for i, record in enumerate(records)]
+        self.rate = rate
+        self.batch_size = batch_size
+        self.loop = loop
+        self._clock = clock
+        self._sleep = sleep
+        self._position = 0
+        self._emitted = 0
+        self._started = None
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        return cls(load_trace(path), **kwargs)
+
+    @property
+    def exhausted(self) -> bool:
+        return not self.records or (not self.loop and self._position >= len(self.records))
+
+    def iter_connections(self):
+        remaining = self.batch_size
+        while remaining is None or remaining > 0:
+            if self._position >= len(self.records):
+                if not self.loop or not self.records:
+                    return
+                self._position = 0
+
+            if self.rate:
+                if self._started is None:
+                    self._started = self._clock()
+                delay = self._started + self._emitted / self.rate - self._clock()
+                if delay > 0:
+                    self._sleep(delay)
+
+            record = dict(self.records[self._position], id=self._emitted)
+            self._position += 1
+            self._emitted += 1
+            if remaining is not None:
+                remaining -= 1
+            yield record
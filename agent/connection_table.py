@@ -0,0 +1,94 @@
+import threading
+from typing import NamedTuple
+
+
+class ConnectionDelta(NamedTuple):
+    """Result of one poll: connections that appeared, disappeared and are still live."""
+    added: list
+    removed: list
+    active: list
+
+
+class ConnectionTable:
+    """
+    Connection-state table keyed by WFP connectionId.
+    Lets a poll skip the enrichment pipeline (process lookup, hashing, DNS, policy,
+    ML, sample collection) for connections that were already processed earlier.
+    """
+    def __init__(self):
+        self._entries = {} # connection_id -> enriched info dict
+        self._lock = threading.Lock()
+
+    def lookup(self, connection_id, process_id=None):
+        """
+        Returns the enriched info for a known connection, or None if it is new.
+        A matching id owned by a different process is treated as new (id reuse).
+        """
+        with self._lock:
+            info = self._entries.get(connection_id)
+        if info is None:
+            return None
+        if process_id is not None and info.get("process_id") != process_id:
+            return None
+        return info
+
+    def apply(self, seen_ids, added):
+        """
+        Commits one poll to the table.
+
+        Args:
+            seen_ids: connectionIds enumerated this poll that were already known
+            added: enriched info dicts for connections first seen this poll
+        Returns:
+            ConnectionDelta with the added/removed infos and the full active set
+        """
+        live = set(seen_ids)
+        live.update(info["id"] for info in added)
+
+        with self._lock:
+            removed = [info for cid, info in self._entries.items() if cid not in live]
+            for info in removed:
+                del self._entries[info["id"]]
+            for info in added:
+                previous = self._entries.get(info["id"])
+                if previous is not None:
+                    # Same id now owned by another process: report the old one as gone
+                    removed.append(previous)
+                self._entries[info["id"]] = info
+            active = list(self._entries.values())
+
+        return ConnectionDelta(added=list(added), removed=removed, active=active)
+
+    def apply_events(self, added, closed_ids):
+        """
+        Commits a batch of connection events (event-driven capture).
+
+        Args:
+            added: enriched info dicts for connections opened since the last batch
+            closed_ids: connectionIds reported closed
+        Returns:
+            ConnectionDelta. A connection opened and closed within the batch
+            is reported in both added and removed.
+        """
+        with self._lock:
+            removed = []
+            for info in added:
+                previous = self._entries.get(info["id"])
+                if previous is not None:
+                    removed.append(previous)
+                self._entries[info["id"]] = info
+            for cid in closed_ids:
+                info = self._entries.pop(cid, None)
+                if info is not None:
+                    removed.append(info)
+            active = list(self._entries.values())
+
+        return ConnectionDelta(added=list(added), removed=removed, active=active)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
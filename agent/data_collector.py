@@ -0,0 +1,168 @@
+import logging
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from agent.ingest_queue import BoundedIngestQueue, DROP_OLDEST
+
+try:
+    from app.common.database import SessionLocal
+    from app.common.models import TrafficSample
+except ImportError:
+    # Fallback or mock for standalone testing if app not available
+    SessionLocal = None
+    TrafficSample = None
+
+logger = logging.getLogger(__name__)
+
+# Column list for the bulk insert, with the value used when a sample lacks the key
+SAMPLE_COLUMNS = (
+    ("process_name", "Unknown"),
+    ("process_path", "Unknown"),
+    ("process_hash", None),
+    ("parent_info", None),
+    ("remote_ip", None),
+    ("remote_port", None),
+    ("remote_hostname", None),
+    ("direction", "Outbound"),
+)
+
+class DataCollector:
+    """
+    Collects traffic samples and writes to DB in batches.
+    Producers only append to a bounded ring buffer; a dedicated writer thread
+    drains it every flush_interval seconds, or as soon as batch_size samples
+    are waiting, so the enumeration loop never blocks on a disk commit.
+    With autostart=False no thread is started and the owner (AgentRuntime)
+    calls flush() and run_retention() on its own schedule.
+    """
+    def __init__(self, flush_interval=10, batch_size=50, max_retries=3, session_factory=None,
+                 max_queue=10000, overflow=DROP_OLDEST, partitions=None, retention=None,
+                 retention_interval=3600, autostart=True):
+        self.queue = BoundedIngestQueue(maxsize=max_queue, overflow=overflow)
+        self.lock = threading.Lock() # guards stats
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.session_factory = session_factory or SessionLocal
+        self._insert = insert(TrafficSample) if TrafficSample else None
+        self.partitions = partitions # SamplePartitions: route rows into per-day tables
+        self.retention = retention # RetentionManager run from the writer thread
+        self.retention_interval = retention_interval
+        self._last_retention = time.monotonic()
+        self._write_lock = threading.Lock()
+        self._failures = 0 # consecutive failed flushes of the head batch
+        self.stats = {
+            "rows_written": 0,
+            "batches": 0,
+            "failed_batches": 0,
+            "dropped": 0,
+            "last_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+        self._wake = threading.Event()
+        self.running = autostart
+        self.thread = None
+        if autostart:
+            self.thread = threading.Thread(target=self._flush_loop, daemon=True, name="sample-writer")
+            self.thread.start()
+
+    @staticmethod
+    def _to_row(info):
+        """Projects a connection info dict onto the prepared TrafficSample column list."""
+        row = {column: info.get(column, default) for column, default in SAMPLE_COLUMNS}
+        # Placeholder as WFP POC uses Connect layer which is mostly TCP
+        row["protocol"] = "TCP"
+        row["timestamp"] = datetime.utcnow()
+        return row
+
+    @property
+    def batch_ready(self):
+        """True once batch_size samples are waiting to be written."""
+        return len(self.queue) >= self.batch_size
+
+    def add_sample(self, info):
+        """Adds a connection sample to be logged."""
+        if not TrafficSample:
+            return
+
+        self.queue.put(self._to_row(info))
+        if self.batch_ready:
+            # Hand off to the writer thread instead of committing on the caller's thread
+            self._wake.set()
+
+    def flush(self):
+        """Writes buffered samples to DB with a single executemany insert."""
+        if not self.session_factory or not TrafficSample:
+            return
+
+        with self._write_lock:
+            to_write = self.queue.drain()
+            if not to_write:
+                return
+
+            start = time.perf_counter()
+            try:
+                with self.session_factory() as db:
+                    if self.partitions:
+                        self.partitions.insert_rows(db.connection(), to_write)
+                    else:
+                        db.execute(self._insert, to_write)
+                    db.commit()
+            except Exception as e:
+                self._on_failure(to_write, e)
+                return
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._failures = 0
+            with self.lock:
+                self.stats["rows_written"] += len(to_write)
+                self.stats["batches"] += 1
+                self.stats["last_flush_ms"] = elapsed_ms
+                self.stats["total_flush_ms"] += elapsed_ms
+
+    def _on_failure(self, rows, error):
+        """Puts a failed batch back at the head of the queue until max_retries is exhausted."""
+        self._failures += 1
+        with self.lock:
+            self.stats["failed_batches"] += 1
+            if self._failures <= self.max_retries:
+                # Rows that no longer fit behind newer samples count as overflow drops
+                requeued = self.queue.requeue(rows)
+                logger.warning(f"Sample flush failed (attempt {self._failures}), requeued {requeued} rows: {error}")
+                return
+            self.stats["dropped"] += len(rows)
+        self._failures = 0
+        logger.error(f"Sample flush failed {self.max_retries + 1} times, dropped {len(rows)} rows: {error}")
+
+    def get_stats(self):
+        """Returns a snapshot of the collector counters."""
+        with self.lock:
+            stats = dict(self.stats)
+        stats["queued"] = len(self.queue)
+        stats["overflow_dropped"] = self.queue.dropped
+        stats["overflow_policy"] = self.queue.overflow
+        return stats
+
+    def _flush_loop(self):
+        while self.running:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+            self.run_retention()
+
+    def run_retention(self):
+        """Runs rollup/expiry after a flush, at most every retention_interval seconds."""
+        if not self.retention or time.monotonic() - self._last_retention < self.retention_interval:
+            return
+        self._last_retention = time.monotonic()
+        self.retention.run()
+
+    def shutdown(self):
+        self.running = False
+        self._wake.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        self.flush()
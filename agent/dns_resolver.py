@@ -0,0 +1,228 @@
+import concurrent.futures
+import ipaddress
+import logging
+import socket
+import threading
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app.common.cache import LRUCache
+
+try:
+    from app.common.database import SessionLocal
+    from app.common.models import DnsLog
+except ImportError:
+    # Fallback or mock for standalone testing if app not available
+    SessionLocal = None
+    DnsLog = None
+
+logger = logging.getLogger(__name__)
+
+class DnsLogWriter:
+    """
+    Buffers DNS resolution logs and writes them to DB in batches.
+    Resolver threads only append to the buffer; a single writer thread bulk-inserts
+    them in one transaction. An ip -> hostname pair already logged within
+    dedup_window seconds is skipped, so repeated (or repeatedly failing) lookups
+    of the same address do not produce a row per TTL expiry. A pair only counts
+    as logged once its batch is committed; a failed batch is put back and
+    retried up to max_retries times.
+    With autostart=False the owner (AgentRuntime) calls flush() instead.
+    """
+    def __init__(self, flush_interval=10, batch_size=100, dedup_window=3600, session_factory=None,
+                 autostart=True, max_retries=3):
+        self.queue = []
+        self.lock = threading.Lock()
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.session_factory = session_factory or SessionLocal
+        self.max_retries = max_retries
+        self._last_logged = LRUCache(maxsize=8192, ttl=dedup_window) # ip -> hostname, committed
+        self._pending = {} # ip -> hostname, queued but not yet committed
+        self._failures = 0 # consecutive failed flushes of the head batch
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self.running = autostart
+        self.thread = None
+        if autostart:
+            self.thread = threading.Thread(target=self._flush_loop, daemon=True, name="dns-log-writer")
+            self.thread.start()
+
+    def log(self, ip, hostname):
+        """Queues a resolution result unless the same pair was logged recently."""
+        if not DnsLog or not self.session_factory:
+            return
+        if self._last_logged.get(ip) == hostname:
+            return
+
+        with self.lock:
+            if self._pending.get(ip) == hostname:
+                return
+            self._pending[ip] = hostname
+            self.queue.append({
+                "timestamp": datetime.utcnow(),
+                "ip_address": ip,
+                "hostname": hostname
+            })
+            should_flush = len(self.queue) >= self.batch_size
+
+        if should_flush:
+            # Hand off to the writer thread instead of committing on the resolver thread
+            self._wake.set()
+
+    def flush(self):
+        """Writes buffered logs to DB with a single bulk insert."""
+        if not self.session_factory or not DnsLog:
+            return
+
+        with self._write_lock:
+            with self.lock:
+                if not self.queue:
+                    return
+                to_write = self.queue
+                self.queue = []
+
+            try:
+                with self.session_factory() as db:
+                    db.execute(insert(DnsLog), to_write)
+                    db.commit()
+            except Exception as e:
+                # Never raised: must not crash WFP
+                self._on_failure(to_write, e)
+                return
+
+            self._failures = 0
+            with self.lock:
+                for row in to_write:
+                    self._last_logged.put(row["ip_address"], row["hostname"])
+                    if self._pending.get(row["ip_address"]) == row["hostname"]:
+                        del self._pending[row["ip_address"]]
+
+    def _on_failure(self, rows, error):
+        """Puts a failed batch back at the head of the queue until max_retries is exhausted."""
+        self._failures += 1
+        with self.lock:
+            if self._failures <= self.max_retries:
+                self.queue = rows + self.queue
+                logger.debug(f"DNS log flush failed (attempt {self._failures}), requeued {len(rows)} rows: {error}")
+                return
+            # Dropped: forget the pairs so a later lookup logs them again
+            for row in rows:
+                if self._pending.get(row["ip_address"]) == row["hostname"]:
+                    del self._pending[row["ip_address"]]
+        self._failures = 0
+        logger.warning(f"DNS log flush failed {self.max_retries + 1} times, dropped {len(rows)} rows: {error}")
+
+    def _flush_loop(self):
+        while self.running:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def shutdown(self):
+        self.running = False
+        self._wake.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        self.flush()
+
+# 0.0.0.0/8 ("this network") never has a PTR record either
+_THIS_NETWORK = ipaddress.ip_network("0.0.0.0/8")
+
+def _is_resolvable(ip_address):
+    """False for addresses a reverse lookup cannot answer: unparsable, unspecified, loopback, link-local."""
+    try:
+        addr = ipaddress.ip_address(ip_address)
+    except ValueError:
+        return False
+    if addr.version == 6 and addr.ipv4_mapped:
+        addr = addr.ipv4_mapped
+    if addr.version == 4 and addr in _THIS_NETWORK:
+        return False
+    return not (addr.is_unspecified or addr.is_loopback or addr.is_link_local)
+
+class DnsResolver:
+    """
+    Non-blocking reverse DNS resolver.
+    resolve_ip never waits on the network: a cache miss returns the IP right away
+    and queues one background lookup per IP (concurrent misses are deduplicated).
+    Successful and failed lookups are cached with separate TTLs in a bounded LRU.
+    """
+    def __init__(self, cache_ttl=300, negative_ttl=60, cache_size=4096, max_workers=5, log_writer=None):
+        self.log_writer = log_writer or DnsLogWriter()
+        self._cache = LRUCache(maxsize=cache_size) # ip -> hostname (ip itself if unresolvable)
+        self._ttl = cache_ttl
+        self._negative_ttl = negative_ttl
+        self._pending = set() # ips with a lookup in flight
+        self._pending_lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="dns-resolver"
+        )
+
+    def resolve_ip(self, ip_address):
+        """
+        Returns the cached hostname for ip_address.
+        On a miss the IP itself is returned and resolution continues in the background,
+        so a later poll picks up the hostname from the cache.
+        """
+        if not _is_resolvable(ip_address):
+            return ip_address
+
+        hostname = self._cache.get(ip_address)
+        if hostname is not None:
+            return hostname
+
+        self._schedule(ip_address)
+        return ip_address
+
+    def _schedule(self, ip_address):
+        """Queues a background lookup unless one is already in flight for this IP."""
+        with self._pending_lock:
+            if ip_address in self._pending:
+                return
+            self._pending.add(ip_address)
+
+        try:
+            self._executor.submit(self._do_resolve, ip_address)
+        except RuntimeError:
+            # Executor already shut down
+            with self._pending_lock:
+                self._pending.discard(ip_address)
+
+    def _do_resolve(self, ip_address):
+        hostname = ip_address
+        try:
+            try:
+                hostname, _, _ = socket.gethostbyaddr(ip_address)
+                self._cache.put(ip_address, hostname, ttl=self._ttl)
+            except Exception:
+                # Resolution failed: cache the miss for the (shorter) negative TTL
+                self._cache.put(ip_address, ip_address, ttl=self._negative_ttl)
+        finally:
+            with self._pending_lock:
+                self._pending.discard(ip_address)
+
+        # Log result regardless of success/fail
+        self._log_resolution(ip_address, hostname)
+        return hostname
+
+    def _log_resolution(self, ip, hostname):
+        """Queues the resolution for the batched DNS log writer."""
+        self.log_writer.log(ip, hostname)
+
+    @property
+    def pending_count(self):
+        """Number of lookups currently queued or running."""
+        with self._pending_lock:
+            return len(self._pending)
+
+    def stats(self):
+        stats = self._cache.stats()
+        stats["pending"] = self.pending_count
+        return stats
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.log_writer.shutdown()
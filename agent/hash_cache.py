@@ -0,0 +1,119 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from app.common.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Returned (and never cached) when the executable cannot be read
+UNVERIFIED_HASH = "Unverified (Access Denied)"
+
+# 1 MiB reads: executables are hashed in a handful of syscalls instead of thousands
+HASH_BLOCK_SIZE = 1024 * 1024
+
+class FileHashCache:
+    """
+    SHA-256 cache for executables keyed by path and file identity.
+    An entry is reused while (size, mtime, inode/file-id) is unchanged, so only
+    replaced or updated binaries are rehashed. Entries are LRU-evicted and
+    persisted to a JSON store so the cache survives agent restarts.
+    """
+    def __init__(self, store_path=None, maxsize=4096, save_interval=300):
+        self.store_path = store_path
+        self.save_interval = save_interval
+        self._cache = LRUCache(maxsize=maxsize) # path -> (identity, digest)
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._save_lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def file_identity(filepath):
+        """Returns (size, mtime_ns, inode) for the file. st_ino is the NTFS file-id on Windows."""
+        st = os.stat(filepath)
+        return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+    @staticmethod
+    def hash_file(filepath, block_size=HASH_BLOCK_SIZE):
+        """Calculates SHA256 hash of a file using large buffered reads."""
+        sha256_hash = hashlib.sha256()
+        buf = bytearray(block_size)
+        view = memoryview(buf)
+        with open(filepath, "rb", buffering=0) as f:
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                sha256_hash.update(view[:n])
+        return sha256_hash.hexdigest()
+
+    def get_hash(self, filepath):
+        """Returns the cached hash if the file is unchanged, otherwise rehashes it."""
+        if not filepath or filepath == "Unknown":
+            return None
+
+        try:
+            identity = self.file_identity(filepath)
+        except OSError:
+            return UNVERIFIED_HASH
+
+        cached = self._cache.get(filepath)
+        if cached is not None and cached[0] == identity:
+            return cached[1]
+
+        try:
+            digest = self.hash_file(filepath)
+        except OSError:
+            return UNVERIFIED_HASH
+
+        self._cache.put(filepath, (identity, digest))
+        self._dirty = True
+        return digest
+
+    def stats(self):
+        return self._cache.stats()
+
+    def load(self):
+        """Loads persisted entries from the on-disk store, if any."""
+        if not self.store_path or not os.path.exists(self.store_path):
+            return
+
+        try:
+            with open(self.store_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            for path, (size, mtime_ns, ino, digest) in entries.items():
+                self._cache.put(path, ((size, mtime_ns, ino), digest))
+            logger.info(f"Loaded {len(entries)} cached executable hashes.")
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable hash cache {self.store_path}: {e}")
+
+    def save(self, force=True):
+        """
+        Writes entries to the on-disk store (atomically via a temp file).
+        With force=False it only writes when dirty and save_interval has elapsed.
+        """
+        if not self.store_path or not self._dirty:
+            return
+        if not force and time.monotonic() - self._last_save < self.save_interval:
+            return
+
+        with self._save_lock:
+            entries = {
+                path: [*identity, digest]
+                for path, (identity, digest) in self._cache.items()
+            }
+            self._dirty = False
+            self._last_save = time.monotonic()
+            tmp_path = f"{self.store_path}.tmp"
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.store_path)), exist_ok=True)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(entries, f)
+                os.replace(tmp_path, self.store_path)
+            except OSError as e:
+                self._dirty = True
+                logger.warning(f"Failed to persist hash cache: {e}")
@@ -0,0 +1,77 @@
+import random
+import threading
+from collections import deque
+
+DROP_OLDEST = "drop-oldest"
+DROP_NEWEST = "drop-newest"
+SAMPLE = "sample"
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, SAMPLE)
+
+class BoundedIngestQueue:
+    """
+    Fixed-capacity ring buffer between producers and a single writer thread.
+    put() never blocks on the consumer; when the buffer is full the overflow
+    policy decides what is lost:
+      drop-oldest: evict the oldest queued item (keep the most recent traffic)
+      drop-newest: reject the incoming item (keep the backlog intact)
+      sample:      the incoming item replaces a random queued item, so under
+                   sustained overload the buffer stays a uniform sample
+    """
+    def __init__(self, maxsize=10000, overflow=DROP_OLDEST):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow}', expected one of {OVERFLOW_POLICIES}")
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._seen_while_full = 0
+        self.dropped = 0
+
+    def put(self, item):
+        """Adds an item. Returns False if the item itself was discarded."""
+        with self._lock:
+            if len(self._items) < self.maxsize:
+                self._items.append(item)
+                self._seen_while_full = 0
+                return True
+
+            self.dropped += 1
+            if self.overflow == DROP_OLDEST:
+                self._items.popleft()
+                self._items.append(item)
+                return True
+            if self.overflow == DROP_NEWEST:
+                return False
+
+            # Reservoir-style replacement over the items offered while full
+            self._seen_while_full += 1
+            slot = random.randrange(self.maxsize + self._seen_while_full)
+            if slot < self.maxsize:
+                self._items[slot] = item
+                return True
+            return False
+
+    def drain(self, max_items=None):
+        """Removes and returns up to max_items from the head (all if None)."""
+        with self._lock:
+            if max_items is None or max_items >= len(self._items):
+                items = list(self._items)
+                self._items.clear()
+            else:
+                items = [self._items.popleft() for _ in range(max_items)]
+            if len(self._items) < self.maxsize:
+                self._seen_while_full = 0
+            return items
+
+    def requeue(self, items):
+        """Puts items back at the head (e.g. a failed batch), dropping the oldest that no longer fit."""
+        with self._lock:
+            room = max(self.maxsize - len(self._items), 0)
+            keep = items[len(items) - room:] if room else []
+            self.dropped += len(items) - len(keep)
+            self._items.extendleft(reversed(keep))
+            return len(keep)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
@@ -0,0 +1,226 @@
+"""
+Source-independent connection processing.
+
+EnrichmentPipeline.poll() enumerates a ConnectionSource, skips connections
+already known to the ConnectionTable, and runs the new ones through process
+resolution, file hashing, DNS, policy, batched ML scoring, alerting and
+sample collection. WfpManager drives it with the WFP source; the /proc and
+replay sources drive the same code on Linux for profiling and load tests.
+"""
+import logging
+import time
+from collections import defaultdict
+
+from agent.addresses import format_address
+from agent.connection_table import ConnectionTable
+from agent.process_cache import ProcessInfo, ProcessInfoCache
+
+try:
+    from app.common.database import SessionLocal
+    from app.common.models import Alert
+except ImportError:
+    SessionLocal = None
+    Alert = None
+
+logger = logging.getLogger(__name__)
+
+ALERT_COOLDOWN = 60 # seconds per (path, ip, port)
+
+# Event types for process_events (FWPM_CONNECTION_EVENT_ADD / _DELETE)
+CONNECTION_OPENED = 0
+CONNECTION_CLOSED = 1
+
+class EnrichmentPipeline:
+    def __init__(self, source, connection_table=None, process_cache=None, hash_cache=None,
+                 dns_resolver=None, policy_engine=None, inference_engine=None, collector=None,
+                 alert_session_factory=None, alerts=True):
+        """
+        Args:
+            source: ConnectionSource enumerated on every poll
+            hash_cache / dns_resolver / policy_engine / inference_engine / collector:
+                Optional stages; a missing one is skipped (hash None, hostname = IP,
+                policy ALLOW, no ML score, no sample)
+            alert_session_factory: Session factory for alerts. Defaults to SessionLocal.
+            alerts: False to skip alert generation entirely (profiling, replays)
+        """
+        self.source = source
+        self.connection_table = connection_table or ConnectionTable()
+        self.process_cache = process_cache or ProcessInfoCache()
+        self.hash_cache = hash_cache
+        self.dns_resolver = dns_resolver
+        self.policy_engine = policy_engine
+        self.inference_engine = inference_engine
+        self.collector = collector
+        self.alert_session_factory = alert_session_factory or SessionLocal
+        self.alerts = alerts
+        self.recent_alerts = {} # (path, remote_addr, port) -> timestamp
+        self.stage_seconds = defaultdict(float) # cumulative wall time per stage
+        self.polls = 0
+        self.enriched = 0
+
+    def poll(self):
+        """
+        Enumerates the source and diffs it against the previous poll.
+        Only connections not seen before go through the enrichment pipeline.
+        Returns: ConnectionDelta (added, removed, active)
+        """
+        start = time.perf_counter()
+        new_conns = [] # raw fields of connections not seen before
+        seen_ids = [] # already known, enrichment skipped
+        for raw in self.source.iter_connections():
+            # Long-lived connection already enriched on a previous poll
+            if self.connection_table.lookup(raw["id"], raw["process_id"]) is not None:
+                seen_ids.append(raw["id"])
+                continue
+            new_conns.append(raw)
+        self.stage_seconds["enumerate"] += time.perf_counter() - start
+
+        connections = self.process(new_conns)
+        self.polls += 1
+        return self.connection_table.apply(seen_ids, connections)
+
+    def process_events(self, events):
+        """
+        Applies (event_type, raw record) connection events in order.
+        Opened connections are enriched even if they closed again within
+        the batch, so short-lived connections are scored and collected.
+        Returns: ConnectionDelta (added, removed, active)
+        """
+        opened = {} # id -> raw record
+        closed = {} # ordered set of ids
+        for event_type, raw in events:
+            cid = raw["id"]
+            if event_type == CONNECTION_OPENED:
+                closed.pop(cid, None)
+                if self.connection_table.lookup(cid, raw["process_id"]) is None:
+                    opened[cid] = raw
+            else:
+                closed[cid] = None
+
+        connections = self.process(list(opened.values()))
+        self.polls += 1
+        return self.connection_table.apply_events(connections, list(closed))
+
+    def process(self, new_conns):
+        """Enriches, scores, alerts on and collects raw records. Returns the enriched infos."""
+        connections = self.enrich(new_conns)
+        self.score(connections)
+
+        start = time.perf_counter()
+        for info in connections:
+            # Alert Generation
+            if self.alerts and info["ml_label"] == "Anomaly":
+                self.raise_alert(info)
+
+            # Collect for ML Training
+            if self.collector:
+                self.collector.add_sample(info)
+
+        # Periodically persist newly computed hashes
+        if self.hash_cache:
+            self.hash_cache.save(force=False)
+        self.stage_seconds["collect"] += time.perf_counter() - start
+        self.enriched += len(connections)
+        return connections
+
+    def enrich(self, new_conns):
+        start = time.perf_counter()
+        # Process Resolution - one cached lookup per PID, not per socket.
+        # Replayed records bring their own process fields.
+        processes = self.process_cache.resolve_many(
+            c["process_id"] for c in new_conns if "process_path" not in c
+        )
+        self.stage_seconds["process"] += time.perf_counter() - start
+
+        connections = []
+        for raw in new_conns:
+            if "process_path" in raw:
+                proc = ProcessInfo(raw.get("process_name", "Unknown"), raw["process_path"],
+                                   raw.get("parent_info", "Unknown"))
+            else:
+                proc = processes[raw["process_id"]]
+            process_path = proc.path
+            # Text form for the edges (DNS, DB, UI); cached per address
+            remote_ip = format_address(raw["remote_addr"])
+
+            # Only rehashed when the binary's (size, mtime, file-id) changed
+            t = time.perf_counter()
+            process_hash = self.hash_cache.get_hash(process_path) if self.hash_cache else None
+
+            # DNS Resolution (non-blocking; IP until the background lookup lands)
+            t_dns = time.perf_counter()
+            remote_hostname = self.dns_resolver.resolve_ip(remote_ip) if self.dns_resolver else remote_ip
+
+            # Policy Check
+            t_policy = time.perf_counter()
+            policy_action = self.policy_engine.check_connection(process_path) if self.policy_engine else "ALLOW"
+            t_end = time.perf_counter()
+
+            self.stage_seconds["hash"] += t_dns - t
+            self.stage_seconds["dns"] += t_policy - t_dns
+            self.stage_seconds["policy"] += t_end - t_policy
+
+            connections.append({
+                "id": raw["id"],
+                "process_id": raw["process_id"],
+                "process_name": proc.name,
+                "process_path": process_path,
+                "process_hash": process_hash,
+                "parent_info": proc.parent_info,
+                "local_port": raw["local_port"],
+                "remote_port": raw["remote_port"],
+                "remote_addr": raw["remote_addr"],
+                "remote_ip": remote_ip,
+                "remote_hostname": remote_hostname,
+                "direction": raw["direction"],
+                "policy_action": policy_action,
+            })
+        return connections
+
+    def score(self, connections):
+        """Inference (ML) - scores all new connections in one pipeline pass."""
+        start = time.perf_counter()
+        if self.inference_engine:
+            predictions = self.inference_engine.predict_batch(connections)
+        else:
+            predictions = [(0.0, "Unknown (ML Disabled)")] * len(connections)
+
+        for info, (ml_score, ml_label) in zip(connections, predictions):
+            info["ml_score"] = ml_score
+            info["ml_label"] = ml_label
+        self.stage_seconds["score"] += time.perf_counter() - start
+
+    def raise_alert(self, info):
+        """Persists an anomaly alert, rate limited per (path, ip, port)."""
+        if not Alert or not self.alert_session_factory:
+            return
+
+        try:
+            alert_key = (info["process_path"], info["remote_addr"], info["remote_port"])
+            now = time.time()
+            last_alert = self.recent_alerts.get(alert_key, 0)
+
+            if now - last_alert > ALERT_COOLDOWN:
+                with self.alert_session_factory() as db:
+                    alert = Alert(
+                        process_name=info["process_name"],
+                        process_path=info["process_path"],
+                        remote_ip=info["remote_ip"],
+                        remote_port=info["remote_port"],
+                        risk_score=info["ml_score"],
+                        status="New"
+                    )
+                    db.add(alert)
+                    db.commit()
+                self.recent_alerts[alert_key] = now
+        except Exception as e:
+            logger.error(f"Alert creation failed: {e}")
+
+    def stats(self):
+        return {
+            "source": self.source.name,
+            "polls": self.polls,
+            "enriched": self.enriched,
+            "tracked": len(self.connection_table),
+            "stage_seconds": dict(self.stage_seconds),
+        }
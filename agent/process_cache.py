@@ -0,0 +1,122 @@
+import logging
+from typing import NamedTuple
+
+import psutil
+
+from app.common.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Cheap attributes fetched for every process during a priming sweep
+PRIME_ATTRS = ['pid', 'name', 'ppid', 'create_time']
+
+class ProcessInfo(NamedTuple):
+    """Process metadata needed to enrich a connection."""
+    name: str
+    path: str
+    parent_info: str
+    create_time: float = 0.0
+
+UNKNOWN_PROCESS = ProcessInfo("Unknown", "Unknown", "Unknown")
+
+class ProcessInfoCache:
+    """
+    Process metadata cache keyed by (pid, create_time).
+    A reused PID has a different create time, so stale entries are never
+    returned; they simply age out of the LRU. Many lookups at once are served
+    from a single psutil.process_iter sweep instead of per-PID syscalls.
+    """
+    def __init__(self, maxsize=2048, prime_threshold=8):
+        self._cache = LRUCache(maxsize=maxsize) # (pid, create_time) -> ProcessInfo
+        self.prime_threshold = prime_threshold
+
+    def get(self, pid):
+        """Returns ProcessInfo for a single PID, building it only on a cache miss."""
+        try:
+            p = psutil.Process(pid)
+            key = (pid, p.create_time())
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return UNKNOWN_PROCESS
+
+        info = self._cache.get(key)
+        if info is None:
+            info = self._build(p, key[1])
+            self._cache.put(key, info)
+        return info
+
+    def prime(self, pids=None):
+        """
+        Fills the cache from one process_iter sweep.
+
+        Args:
+            pids: PIDs to build entries for. None builds entries for every process.
+        Returns:
+            Dict of pid -> ProcessInfo for the requested PIDs found in the sweep
+        """
+        procs = {}
+        for p in psutil.process_iter(PRIME_ATTRS):
+            procs[p.info['pid']] = p
+
+        wanted = procs.keys() if pids is None else [pid for pid in pids if pid in procs]
+
+        result = {}
+        for pid in wanted:
+            p = procs[pid]
+            key = (pid, p.info['create_time'])
+            info = self._cache.get(key)
+            if info is None:
+                info = self._build(p, key[1], procs)
+                self._cache.put(key, info)
+            result[pid] = info
+        return result
+
+    def resolve_many(self, pids):
+        """Resolves a set of PIDs, priming with a single sweep when there are many."""
+        pids = set(pids)
+        result = self.prime(pids) if len(pids) >= self.prime_threshold else {}
+        for pid in pids:
+            if pid not in result:
+                result[pid] = self.get(pid)
+        return result
+
+    def stats(self):
+        return self._cache.stats()
+
+    @staticmethod
+    def _build(p, create_time, procs=None):
+        """Reads name, exe, svchost group and parent for one process."""
+        process_name = "Unknown"
+        process_path = "Unknown"
+        parent_info = "Unknown"
+        try:
+            with p.oneshot():
+                info = getattr(p, 'info', None) or {}
+                process_name = info.get('name') or p.name()
+                process_path = p.exe()
+
+                # Special Case: svchost.exe service group
+                if process_name.lower() == "svchost.exe":
+                    try:
+                        cmdline = p.cmdline()
+                        # Look for -k argument
+                        if "-k" in cmdline:
+                            idx = cmdline.index("-k")
+                            if idx + 1 < len(cmdline):
+                                group = cmdline[idx+1]
+                                process_name = f"{process_name} ({group})"
+                    except (psutil.AccessDenied, IndexError):
+                        pass
+
+                # Parent Resolution (reuse the sweep's name instead of another syscall)
+                ppid = info['ppid'] if 'ppid' in info else p.ppid()
+                if ppid:
+                    parent = procs.get(ppid) if procs else None
+                    if parent is not None:
+                        parent_name = parent.info['name']
+                    else:
+                        parent_name = psutil.Process(ppid).name()
+                    parent_info = f"{parent_name} (PID: {ppid})"
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            pass
+
+        return ProcessInfo(process_name, process_path, parent_info, create_time)
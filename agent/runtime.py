@@ -0,0 +1,203 @@
+"""
+Single asyncio runtime for the agent's periodic work.
+
+Each PeriodicTask is a loop on one event loop that runs a blocking function
+in a bounded executor and then waits out the rest of its interval (or
+until it is woken early). Connection capture (enumeration or events,
+enrichment and batched scoring) runs in its own one-thread executor, so
+the WFP session and pipeline are only ever used from one thread. Sample
+and DNS log flushes, model checks and actions share the "io" executor.
+DNS lookups stay on the resolver's own bounded pool.
+
+stop() lets in-flight runs finish, then runs the shutdown hooks in order
+(drain the sample and DNS log queues, close the WFP session) and releases
+the executors.
+"""
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from typing import Callable, NamedTuple
+
+try:
+    from app.config import settings
+except ImportError:
+    settings = None
+
+logger = logging.getLogger(__name__)
+
+CAPTURE = "capture"
+IO = "io"
+
+class PeriodicTask(NamedTuple):
+    name: str
+    interval: float # seconds from the start of one run to the start of the next
+    func: Callable[[], object]
+    executor: str = IO
+
+class AgentRuntime:
+    def __init__(self, tasks, shutdown_hooks=(), io_workers=2, shutdown_timeout=10):
+        """
+        Args:
+            tasks: PeriodicTasks to schedule
+            shutdown_hooks: (name, func) pairs run in order after the tasks have stopped
+            io_workers: Threads shared by the IO tasks
+            shutdown_timeout: Seconds to wait for in-flight runs, and for each hook
+        """
+        self.tasks = list(tasks)
+        self.shutdown_hooks = list(shutdown_hooks)
+        self.io_workers = io_workers
+        self.shutdown_timeout = shutdown_timeout
+        self.task_stats = {
+            task.name: {"runs": 0, "errors": 0, "overruns": 0, "last_seconds": 0.0,
+                        "max_seconds": 0.0, "total_seconds": 0.0}
+            for task in self.tasks
+        }
+        self.thread = None
+        self._loop = None
+        self._stopping = None
+        self._wakes = {}
+        self._stop_requested = threading.Event()
+
+    @classmethod
+    def for_agent(cls, agent):
+        """
+        Schedules a WfpManager created with start_threads=False (session
+        already open): capture, sample flushes, DNS log flushes, pending
+        actions and model checks.
+        """
+        def interval(name, default):
+            return getattr(settings, name) if settings else default
+
+        runtime = None
+
+        def capture():
+            agent.poll_connections()
+            # Flush as soon as a batch is waiting, not only on the interval
+            if agent.collector.batch_ready:
+                runtime.wake("samples")
+
+        def flush_samples():
+            agent.collector.flush()
+            agent.collector.run_retention()
+
+        tasks = [
+            PeriodicTask("capture", interval("AGENT_POLL_INTERVAL", 1.0), capture, CAPTURE),
+            PeriodicTask("samples", interval("COLLECTOR_FLUSH_INTERVAL", 10), flush_samples),
+            PeriodicTask("dns_log", interval("DNS_LOG_FLUSH_INTERVAL", 10), agent.dns_resolver.log_writer.flush),
+            PeriodicTask("actions", interval("ACTION_POLL_INTERVAL", 5), agent.action_manager.process_queue),
+        ]
+        if agent.model_registry:
+            tasks.append(PeriodicTask("model", interval("MODEL_WATCH_INTERVAL", 5.0), agent.model_registry.check))
+
+        runtime = cls(
+            tasks,
+            shutdown_hooks=[
+                ("samples", agent.collector.shutdown),
+                ("dns", agent.dns_resolver.shutdown),
+                ("session", agent.close_session),
+            ],
+            io_workers=interval("RUNTIME_IO_WORKERS", 2),
+            shutdown_timeout=interval("RUNTIME_SHUTDOWN_TIMEOUT", 10)
+        )
+        return runtime
+
+    async def run(self):
+        """Runs the tasks until stop(), then drains and shuts down."""
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self._wakes = {task.name: asyncio.Event() for task in self.tasks}
+        if self._stop_requested.is_set():
+            self._request_stop()
+
+        executors = {
+            CAPTURE: concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent-capture"),
+            IO: concurrent.futures.ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="agent-io"),
+        }
+        try:
+            loops = [asyncio.create_task(self._run_periodic(task, executors[task.executor]), name=task.name)
+                     for task in self.tasks]
+            await self._stopping.wait()
+
+            # In-flight runs finish; the loops exit instead of sleeping again
+            pending = ()
+            if loops:
+                _, pending = await asyncio.wait(loops, timeout=self.shutdown_timeout)
+            for loop_task in pending:
+                logger.warning(f"Task {loop_task.get_name()} did not finish within {self.shutdown_timeout}s")
+                loop_task.cancel()
+
+            for name, hook in self.shutdown_hooks:
+                try:
+                    await asyncio.wait_for(self._loop.run_in_executor(executors[IO], hook), self.shutdown_timeout)
+                except Exception as e:
+                    logger.error(f"Shutdown step {name} failed: {e!r}")
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=False, cancel_futures=True)
+            self._loop = None
+
+    async def _run_periodic(self, task, executor):
+        stats = self.task_stats[task.name]
+        wake = self._wakes[task.name]
+        while not self._stopping.is_set():
+            wake.clear()
+            start = time.perf_counter()
+            try:
+                await self._loop.run_in_executor(executor, task.func)
+            except Exception as e:
+                stats["errors"] += 1
+                logger.error(f"Task {task.name} failed: {e}")
+            elapsed = time.perf_counter() - start
+
+            stats["runs"] += 1
+            stats["last_seconds"] = elapsed
+            stats["total_seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+            if elapsed > task.interval:
+                stats["overruns"] += 1
+
+            try:
+                await asyncio.wait_for(wake.wait(), max(task.interval - elapsed, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    def wake(self, name):
+        """Runs a task now instead of at its next interval. Safe from any thread."""
+        loop = self._loop
+        if loop is not None and name in self._wakes:
+            loop.call_soon_threadsafe(self._wakes[name].set)
+
+    def _request_stop(self):
+        self._stopping.set()
+        for wake in self._wakes.values():
+            wake.set()
+
+    def start(self):
+        """Runs the event loop on a background thread."""
+        if self.thread and self.thread.is_alive():
+            return
+        self._stop_requested.clear()
+        self.thread = threading.Thread(target=asyncio.run, args=(self.run(),), daemon=True, name="agent-runtime")
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Requests shutdown and waits for the drain to finish. Safe from any
+        thread. timeout defaults to enough for the tasks and every hook.
+        """
+        self._stop_requested.set()
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._request_stop)
+            except RuntimeError:
+                pass # loop already closed
+        if self.thread:
+            if timeout is None:
+                timeout = self.shutdown_timeout * (len(self.shutdown_hooks) + 1)
+            self.thread.join(timeout=timeout)
+
+    def stats(self):
+        return {name: dict(stats) for name, stats in self.task_stats.items()}
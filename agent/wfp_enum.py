@@ -0,0 +1,93 @@
+"""
+Paginated WFP object enumeration.
+
+FwpmXxxEnum0 returns at most the requested number of entries per call, so a
+single call silently drops everything past the first page. iter_enum keeps
+calling it until a short page signals the end, frees each page as soon as it
+has been copied out, and yields the entries one by one so callers can stream
+thousands of connections or filters without holding them all.
+"""
+import ctypes
+from typing import Callable, Iterator, TypeVar
+
+from agent.addresses import from_v4, from_v6_bytes
+from agent.wfp_types import (
+    FWP_DIRECTION_OUTBOUND, FWP_IP_VERSION_V6, FWPM_CONNECTION0, FWPM_FILTER0, HANDLE, UINT32
+)
+
+DEFAULT_PAGE_SIZE = 500
+
+T = TypeVar("T")
+
+def iter_enum(lib, kind: str, engine_handle, entry_type, convert: Callable[[object], T],
+              page_size: int = DEFAULT_PAGE_SIZE, template=None) -> Iterator[T]:
+    """
+    Yields convert(entry) for every object of a WFP enumeration.
+
+    Args:
+        lib: fwpuclnt (or a fake with the same functions)
+        kind: Object type in the function names, e.g. "Filter" -> FwpmFilterEnum0
+        entry_type: ctypes structure the enumeration returns (FWPM_FILTER0, ...)
+        convert: Copies the fields needed out of an entry; WFP frees the page afterwards
+        page_size: Entries requested per FwpmXxxEnum0 call
+        template: Optional FWPM_XXX_ENUM_TEMPLATE0 pointer
+    """
+    if page_size < 1:
+        raise ValueError("page_size must be positive")
+
+    create_handle = getattr(lib, f"Fwpm{kind}CreateEnumHandle0")
+    enum = getattr(lib, f"Fwpm{kind}Enum0")
+    destroy_handle = getattr(lib, f"Fwpm{kind}DestroyEnumHandle0")
+
+    enum_handle = HANDLE()
+    res = create_handle(engine_handle, template, ctypes.byref(enum_handle))
+    if res != 0:
+        raise OSError(f"Fwpm{kind}CreateEnumHandle0 failed with error: {res}")
+
+    try:
+        while True:
+            entries = ctypes.POINTER(ctypes.POINTER(entry_type))()
+            returned = UINT32()
+            res = enum(engine_handle, enum_handle, page_size, ctypes.byref(entries), ctypes.byref(returned))
+            if res != 0:
+                raise OSError(f"Fwpm{kind}Enum0 failed with error: {res}")
+
+            try:
+                page = [convert(entries[i].contents) for i in range(returned.value)]
+            finally:
+                # Free memory provided by WFP (FwpmFreeMemory0 takes the address of the pointer)
+                if entries:
+                    lib.FwpmFreeMemory0(ctypes.byref(entries))
+
+            # Yielded after the free, so a slow consumer never pins WFP memory
+            yield from page
+            if returned.value < page_size:
+                break
+    finally:
+        destroy_handle(engine_handle, enum_handle)
+
+def filter_info(flt: FWPM_FILTER0) -> dict:
+    return {
+        "id": flt.filterId,
+        "name": flt.displayData.name,
+        "description": flt.displayData.description
+    }
+
+def connection_info(conn: FWPM_CONNECTION0) -> dict:
+    """Raw fields of a connection, copied out of WFP-owned memory. Addresses are agent.addresses keys."""
+    if conn.ipVersion == FWP_IP_VERSION_V6:
+        local_addr = from_v6_bytes(conn.localV6Address)
+        remote_addr = from_v6_bytes(conn.remoteV6Address)
+    else:
+        # WFP reports IPv4 addresses in host byte order
+        local_addr = from_v4(conn.localV4Address)
+        remote_addr = from_v4(conn.remoteV4Address)
+    return {
+        "id": conn.connectionId,
+        "process_id": conn.processId,
+        "local_addr": local_addr,
+        "local_port": conn.localPort,
+        "remote_addr": remote_addr,
+        "remote_port": conn.remotePort,
+        "direction": "Outbound" if conn.direction == FWP_DIRECTION_OUTBOUND else "Inbound",
+    }
@@ -0,0 +1,191 @@
+"""
+Event-driven connection capture.
+
+Polling FwpmConnectionEnum0 only sees connections that are open at the
+instant of the poll, so anything shorter-lived than the poll interval
+(port scans, probes) is missed. FwpmConnectionSubscribe0 instead calls back
+on every connection add/delete. The callback copies the connection out
+and appends it to a bounded EventQueue. It takes no lock and cannot
+fail into the DLL. EventCapture drains that queue into the enrichment
+pipeline on every step.
+
+Polling stays as the fallback: when the subscription API is missing (before
+Windows 8) or refused, EventCapture just polls. In event mode a full poll
+still runs every reconcile_interval, and right after the queue overflowed,
+to resynchronise the connection table.
+"""
+import ctypes
+import logging
+import time
+from collections import deque
+
+from agent.connection_table import ConnectionDelta
+from agent.wfp_enum import connection_info
+from agent.wfp_types import FWPM_CONNECTION_CALLBACK0, FWPM_CONNECTION_SUBSCRIPTION0, HANDLE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 65536
+DEFAULT_RECONCILE_INTERVAL = 60 # seconds
+
+class EventQueue:
+    """
+    Bounded FIFO between the WFP callback thread and the pipeline.
+    deque.append/popleft are atomic under the GIL, so neither side takes a
+    lock. When full, the oldest event is dropped and counted.
+    """
+
+    def __init__(self, maxlen=DEFAULT_QUEUE_SIZE):
+        self.maxlen = maxlen
+        self._events = deque(maxlen=maxlen)
+        self.dropped = 0 # only the producer writes this
+
+    def put(self, event):
+        if len(self._events) >= self.maxlen:
+            self.dropped += 1
+        self._events.append(event)
+
+    def drain(self, limit=None):
+        """Removes and returns up to limit events (all queued events if None), oldest first."""
+        events = []
+        popleft = self._events.popleft
+        while limit is None or len(events) < limit:
+            try:
+                events.append(popleft())
+            except IndexError:
+                break
+        return events
+
+    def __len__(self):
+        return len(self._events)
+
+class ConnectionSubscription:
+    """FwpmConnectionSubscribe0 registration that feeds (event_type, raw record) into a queue."""
+
+    def __init__(self, lib, engine_handle, queue):
+        self.lib = lib
+        self.engine_handle = engine_handle
+        self.queue = queue
+        self.errors = 0 # callbacks that failed to decode
+        self._handle = HANDLE()
+        self._callback = None # kept referenced while subscribed
+
+    @property
+    def active(self):
+        return self._callback is not None
+
+    def subscribe(self):
+        """Registers the callback. Raises OSError if the API is unavailable or fails."""
+        if self.active:
+            return
+        if not hasattr(self.lib, "FwpmConnectionSubscribe0"):
+            raise OSError("FwpmConnectionSubscribe0 not available (requires Windows 8 or later)")
+
+        subscription = FWPM_CONNECTION_SUBSCRIPTION0() # no template: every connection
+        callback = FWPM_CONNECTION_CALLBACK0(self._on_event)
+        res = self.lib.FwpmConnectionSubscribe0(
+            self.engine_handle,
+            ctypes.byref(subscription),
+            callback,
+            None,
+            ctypes.byref(self._handle)
+        )
+        if res != 0:
+            raise OSError(f"FwpmConnectionSubscribe0 failed with error: {res}")
+        self._callback = callback
+
+    def unsubscribe(self):
+        if not self.active:
+            return
+        # Returns once in-flight callbacks have finished, so the callback can be released after it
+        self.lib.FwpmConnectionUnsubscribe0(self.engine_handle, self._handle)
+        self._callback = None
+
+    def _on_event(self, context, event_type, connection):
+        # Runs on a WFP thread: copy out and return; an exception must not reach the DLL
+        try:
+            self.queue.put((event_type, connection_info(connection.contents)))
+        except Exception:
+            self.errors += 1
+
+class EventCapture:
+    """
+    Drives an EnrichmentPipeline from connection events, with polling as
+    the fallback and for periodic reconciliation.
+    """
+
+    def __init__(self, pipeline, subscription=None, reconcile_interval=DEFAULT_RECONCILE_INTERVAL,
+                 batch_limit=None, clock=time.monotonic):
+        """
+        Args:
+            pipeline: EnrichmentPipeline (its source is used for the polls)
+            subscription: ConnectionSubscription; None always polls
+            reconcile_interval: Seconds between full polls in event mode
+            batch_limit: Most events applied per step (None: all queued)
+        """
+        self.pipeline = pipeline
+        self.subscription = subscription
+        self.reconcile_interval = reconcile_interval
+        self.batch_limit = batch_limit
+        self._clock = clock
+        self._last_reconcile = None
+        self._dropped_seen = 0
+        self.events_applied = 0
+        self.reconciles = 0
+
+    @property
+    def mode(self):
+        return "events" if self.subscription and self.subscription.active else "poll"
+
+    def start(self):
+        """Subscribes (falling back to polling on failure). Returns the capture mode."""
+        if self.subscription:
+            try:
+                self.subscription.subscribe()
+            except OSError as e:
+                logger.warning(f"Connection events unavailable, falling back to polling: {e}")
+        logger.info(f"Connection capture mode: {self.mode}")
+        return self.mode
+
+    def stop(self):
+        if self.subscription:
+            self.subscription.unsubscribe()
+
+    def step(self):
+        """
+        One capture cycle. Returns the ConnectionDelta since the previous step.
+        In event mode, subscribing before the first (reconciling) poll means
+        connections that already existed are picked up by that poll and
+        anything opened afterwards by the events.
+        """
+        if self.mode == "poll":
+            return self.pipeline.poll()
+
+        queue = self.subscription.queue
+        events = queue.drain(self.batch_limit)
+        self.events_applied += len(events)
+        delta = self.pipeline.process_events(events)
+
+        now = self._clock()
+        overflowed = queue.dropped > self._dropped_seen
+        due = self._last_reconcile is None or now - self._last_reconcile >= self.reconcile_interval
+        if overflowed or due:
+            if overflowed:
+                logger.warning(f"Connection event queue overflowed ({queue.dropped - self._dropped_seen} dropped), reconciling")
+            self._dropped_seen = queue.dropped
+            self._last_reconcile = now
+            self.reconciles += 1
+            polled = self.pipeline.poll()
+            delta = ConnectionDelta(
+                added=delta.added + polled.added,
+                removed=delta.removed + polled.removed,
+                active=polled.active
+            )
+        return delta
+
+    def stats(self):
+        stats = {"mode": self.mode, "events_applied": self.events_applied, "reconciles": self.reconciles}
+        if self.subscription:
+            stats.update(queued=len(self.subscription.queue), dropped=self.subscription.queue.dropped,
+                         callback_errors=self.subscription.errors)
+        return stats
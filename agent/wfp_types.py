@@ -0,0 +1,156 @@
+"""
+ctypes definitions of the WFP (fwpuclnt.dll) types and constants.
+
+Kept free of any DLL loading so the structures can be built and tested on
+any platform; agent.wfp_wrapper binds them to the real fwpuclnt functions.
+"""
+import ctypes
+from ctypes import wintypes
+
+RPC_C_AUTHN_WINNT = 10
+RPC_C_AUTHN_LEVEL_DEFAULT = 0
+FWPM_SESSION_FLAG_DYNAMIC = 0x00000001
+FWP_IP_VERSION_V4 = 0
+FWP_IP_VERSION_V6 = 1
+FWP_DIRECTION_OUTBOUND = 0
+FWP_DIRECTION_INBOUND = 1
+
+# GUIDs
+class GUID(ctypes.Structure):
+    _fields_ = [
+        ("Data1", ctypes.c_ulong),
+        ("Data2", ctypes.c_ushort),
+        ("Data3", ctypes.c_ushort),
+        ("Data4", ctypes.c_ubyte * 8)
+    ]
+
+    def __str__(self):
+        return f"{{{self.Data1:08x}-{self.Data2:04x}-{self.Data3:04x}-{self.Data4[0]:02x}{self.Data4[1]:02x}-{self.Data4[2]:02x}{self.Data4[3]:02x}{self.Data4[4]:02x}{self.Data4[5]:02x}{self.Data4[6]:02x}{self.Data4[7]:02x}}}"
+
+def DEFINE_GUID(l, w1, w2, b1, b2, b3, b4, b5, b6, b7, b8):
+    return GUID(l, w1, w2, (ctypes.c_ubyte * 8)(b1, b2, b3, b4, b5, b6, b7, b8))
+
+FWPM_LAYER_ALE_AUTH_CONNECT_V4 = DEFINE_GUID(0xc38d57d1, 0x1317, 0x4076, 0x97, 0xca, 0xd5, 0x14, 0xc7, 0xc5, 0x85, 0x96)
+FWPM_CONDITION_IP_REMOTE_PORT = DEFINE_GUID(0x0c1ba1af, 0x5765, 0x453f, 0xaf, 0x22, 0xa8, 0xf7, 0x91, 0xac, 0x77, 0x5b)
+
+# Match Types
+FWP_MATCH_EQUAL = 0
+
+# Data Types
+FWP_UINT16 = 2
+FWP_UINT64 = 4
+
+# Action Types
+FWP_ACTION_BLOCK = 0x00001001 # (0x00000001 | 0x00001000)
+FWP_ACTION_PERMIT = 0x00001002
+
+class FWP_VALUE0(ctypes.Structure):
+    class _U(ctypes.Union):
+        _fields_ = [
+             ("uint16", ctypes.c_ushort),
+             ("uint32", ctypes.c_uint32),
+             ("uint64", ctypes.c_uint64),
+        ]
+    _fields_ = [
+        ("type", ctypes.c_int), # FWP_DATA_TYPE
+        ("u", _U) # union
+    ]
+
+class FWPM_FILTER_CONDITION0(ctypes.Structure):
+    _fields_ = [
+        ("fieldKey", GUID),
+        ("matchType", ctypes.c_int), # FWP_MATCH_TYPE
+        ("conditionValue", FWP_VALUE0)
+    ]
+
+class FWPM_ACTION0(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_uint32), # FWP_ACTION_TYPE
+        ("filterType", GUID)
+    ]
+
+# Types
+UINT32 = ctypes.c_uint32
+UINT64 = ctypes.c_uint64
+UINT8 = ctypes.c_uint8
+HANDLE = wintypes.HANDLE
+LPWSTR = wintypes.LPWSTR
+
+
+class FWPM_DISPLAY_DATA0(ctypes.Structure):
+    _fields_ = [
+        ("name", LPWSTR),
+        ("description", LPWSTR)
+    ]
+
+class FWPM_SESSION0(ctypes.Structure):
+    _fields_ = [
+        ("sessionKey", GUID),
+        ("displayData", FWPM_DISPLAY_DATA0),
+        ("flags", UINT32),
+        ("txnWaitTimeoutInMSec", UINT32),
+        ("processId", UINT32),
+        ("sid", ctypes.c_void_p),
+        ("username", LPWSTR),
+        ("kernelMode", wintypes.BOOL)
+    ]
+
+class FWPM_FILTER0(ctypes.Structure):
+    # Partial definition for enumeration
+    _fields_ = [
+        ("filterKey", GUID),
+        ("displayData", FWPM_DISPLAY_DATA0),
+        ("flags", UINT32),
+        ("providerKey", ctypes.POINTER(GUID)),
+        ("providerData", ctypes.c_void_p), # FWP_BYTE_BLOB
+        ("layerKey", GUID),
+        ("subLayerKey", GUID),
+        ("weight", ctypes.c_void_p), # FWP_VALUE0 (union)
+        ("numFilterConditions", UINT32),
+        ("filterCondition", ctypes.c_void_p), # FWPM_FILTER_CONDITION0*
+        ("action", ctypes.c_void_p), # FWPM_ACTION0
+        ("context", UINT64), # union
+        ("reserved", ctypes.c_void_p), # GUID*
+        ("filterId", UINT64),
+        ("effectiveWeight", ctypes.c_void_p) # FWP_VALUE0 (union)
+    ]
+
+class FWPM_CONNECTION0(ctypes.Structure):
+    class _U1(ctypes.Union):
+        _fields_ = [("localV4Address", UINT32), ("localV6Address", UINT8 * 16)]
+    class _U2(ctypes.Union):
+        _fields_ = [("remoteV4Address", UINT32), ("remoteV6Address", UINT8 * 16)]
+        
+    _anonymous_ = ("_u1", "_u2")
+    _fields_ = [
+        ("connectionId", UINT64),
+        ("ipVersion", ctypes.c_int), # FWP_IP_VERSION enum
+        ("_u1", _U1),
+        ("_u2", _U2),
+        ("localPort", ctypes.c_ushort),
+        ("remotePort", ctypes.c_ushort),
+        ("direction", ctypes.c_int), # FWP_DIRECTION enum
+        ("processId", UINT64),
+        ("startTime", UINT64), # Approx
+    ]
+
+# Connection subscription (FwpmConnectionSubscribe0, Windows 8+)
+FWPM_CONNECTION_EVENT_ADD = 0
+FWPM_CONNECTION_EVENT_DELETE = 1
+
+class FWPM_CONNECTION_SUBSCRIPTION0(ctypes.Structure):
+    _fields_ = [
+        ("enumTemplate", ctypes.c_void_p), # FWPM_CONNECTION_ENUM_TEMPLATE0*, NULL = all
+        ("flags", UINT32),
+        ("sessionKey", GUID)
+    ]
+
+# WINAPI callbacks; the same convention as cdecl on x64 and outside Windows
+WINFUNCTYPE = getattr(ctypes, "WINFUNCTYPE", ctypes.CFUNCTYPE)
+
+FWPM_CONNECTION_CALLBACK0 = WINFUNCTYPE(
+    None,
+    ctypes.c_void_p, # context
+    ctypes.c_int, # FWPM_CONNECTION_EVENT_TYPE
+    ctypes.POINTER(FWPM_CONNECTION0)
+)
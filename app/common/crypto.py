@@ -3,14 +3,18 @@ Encryption utilities for PortKodiakAIShield.
 Uses cryptography.fernet for symmetric encryption.
 """
 
-from pathlib import Path
-from cryptography.fernet import Fernet
+import threading
 from app.config import settings
 
 KEY_FILE = settings.LOG_DIR.parent / "secret.key"
 
+_cipher = None
+_cipher_lock = threading.Lock()
+
 def _get_or_create_key() -> bytes:
     """Load existing key or generate a new one."""
+    from cryptography.fernet import Fernet
+
     if KEY_FILE.exists():
         return KEY_FILE.read_bytes()
     
@@ -24,24 +28,30 @@ def _get_or_create_key() -> bytes:
         
     return key
 
-# Initialize cipher
-try:
-    _cipher = Fernet(_get_or_create_key())
-except Exception:
-    # Fallback if filesystem is readonly or other issues
-    _cipher = Fernet(Fernet.generate_key())
+def _get_cipher():
+    """Initialize cipher on first use (the key file is not touched at import)."""
+    global _cipher
+    with _cipher_lock:
+        if _cipher is None:
+            from cryptography.fernet import Fernet
+            try:
+                _cipher = Fernet(_get_or_create_key())
+            except Exception:
+                # Fallback if filesystem is readonly or other issues
+                _cipher = Fernet(Fernet.generate_key())
+        return _cipher
 
 def encrypt_data(data: str) -> str:
     """Encrypt string data."""
     if not data:
         return ""
-    return _cipher.encrypt(data.encode()).decode()
+    return _get_cipher().encrypt(data.encode()).decode()
 
 def decrypt_data(token: str) -> str:
     """Decrypt token to string."""
     if not token:
         return ""
     try:
-        return _cipher.decrypt(token.encode()).decode()
+        return _get_cipher().decrypt(token.encode()).decode()
     except Exception:
         return ""
@@ -1,34 +1,142 @@
 """
 Database configuration and session management.
+
+Nothing touches the filesystem at import: the data directory and the engines
+are created on first use (get_engine(), the first session, or accessing
+`engine`/`read_engine`), so importing this module stays cheap for processes
+that never query the database.
 """
 import logging
-from sqlalchemy import create_engine, select, text
+import threading
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session
 from app.config import settings
 from app.common.models import Base
+from app.common.migrations import run_migrations
 
 logger = logging.getLogger(__name__)
 
-# Ensure data directory exists
-try:
-    settings.DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-except PermissionError:
-    logger.warning("Could not create DB directory, falling back to in-memory DB")
-    settings.DB_PATH = ":memory:"
+_init_lock = threading.RLock()
+
+def _ensure_db_dir() -> None:
+    """Ensure data directory exists."""
+    if _is_memory_db(settings.DB_PATH):
+        return
+    try:
+        settings.DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    except PermissionError:
+        logger.warning("Could not create DB directory, falling back to in-memory DB")
+        settings.DB_PATH = ":memory:"
+
+def _is_memory_db(db_path) -> bool:
+    return str(db_path) in (":memory:", "")
+
+def _apply_pragmas(dbapi_conn, read_only: bool) -> None:
+    """Applies the configured SQLite pragmas to a new DBAPI connection."""
+    cursor = dbapi_conn.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.DB_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA cache_size={-int(settings.DB_CACHE_SIZE_KB)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.DB_MMAP_SIZE)}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        else:
+            # journal_mode is persistent in the file; only writers need to set it
+            cursor.execute(f"PRAGMA journal_mode={settings.DB_JOURNAL_MODE}")
+            cursor.execute(f"PRAGMA synchronous={settings.DB_SYNCHRONOUS}")
+    finally:
+        cursor.close()
+
+def create_db_engine(db_path=None, read_only: bool = False) -> Engine:
+    """
+    Create a tuned SQLite engine.
+
+    Args:
+        db_path: Database file. Defaults to settings.DB_PATH.
+        read_only: Open the file read-only (mode=ro) for UI/reporting queries.
+    """
+    db_path = settings.DB_PATH if db_path is None else db_path
+
+    if _is_memory_db(db_path):
+        # Pragmas and pooling only matter for a shared file
+        return create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+
+    if read_only:
+        url = f"sqlite:///file:{db_path}?mode=ro&uri=true"
+    else:
+        url = f"sqlite:///{db_path}"
+
+    db_engine = create_engine(
+        url,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": settings.DB_BUSY_TIMEOUT_MS / 1000,
+        },
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+    )
+
+    @event.listens_for(db_engine, "connect")
+    def _on_connect(dbapi_conn, connection_record):
+        _apply_pragmas(dbapi_conn, read_only)
+
+    return db_engine
+
+def get_engine() -> Engine:
+    """The shared writer engine, created on first use."""
+    with _init_lock:
+        if "engine" not in globals():
+            _ensure_db_dir()
+            globals()["engine"] = create_db_engine()
+        return globals()["engine"]
+
+def get_read_engine() -> Engine:
+    """The shared read-only engine, created on first use."""
+    with _init_lock:
+        if "read_engine" not in globals():
+            # Separate read-only engine so UI polling never holds the write lock
+            writer = get_engine()
+            if _is_memory_db(settings.DB_PATH):
+                globals()["read_engine"] = writer
+            else:
+                globals()["read_engine"] = create_db_engine(read_only=True)
+        return globals()["read_engine"]
+
+def __getattr__(name):
+    # `engine` and `read_engine` stay importable module attributes, built lazily
+    if name == "engine":
+        return get_engine()
+    if name == "read_engine":
+        return get_read_engine()
+    if name == "DATABASE_URL":
+        return f"sqlite:///{settings.DB_PATH}"
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class LazySessionMaker(sessionmaker):
+    """sessionmaker that binds to its engine when the first session is opened."""
+
+    def __init__(self, engine_factory, **kw):
+        super().__init__(**kw)
+        self._engine_factory = engine_factory
 
-DATABASE_URL = f"sqlite:///{settings.DB_PATH}"
+    def __call__(self, **local_kw) -> Session:
+        if self.kw.get("bind") is None:
+            self.configure(bind=self._engine_factory())
+        return super().__call__(**local_kw)
 
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False}
-)
+SessionLocal = LazySessionMaker(get_engine, autocommit=False, autoflush=False)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = LazySessionMaker(get_read_engine, autocommit=False, autoflush=False)
 
 def init_db() -> None:
     """Initialize the database tables."""
     try:
+        engine = get_engine()
         Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Database initialization failed: {e}")
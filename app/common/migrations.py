@@ -0,0 +1,73 @@
+"""
+Lightweight schema migrations for existing deployments.
+
+create_all() only creates missing tables, so schema changes to existing
+tables (such as new indexes) are applied here. The applied version is kept
+in SQLite's PRAGMA user_version.
+"""
+import logging
+from typing import Callable, List, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from app.common.models import Base
+
+logger = logging.getLogger(__name__)
+
+def _create_model_indexes(conn: Connection) -> None:
+    """Create every index declared on the models that does not exist yet."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+def _merge_null_rollup_buckets(conn: Connection) -> None:
+    """
+    Rollup buckets with NULL key columns never hit the unique constraint, so the
+    same bucket could be stored several times. Coalesce the keys and sum the duplicates.
+    """
+    if not conn.dialect.has_table(conn, "traffic_rollups"):
+        return
+    conn.execute(text(
+        "CREATE TEMP TABLE rollup_merge AS "
+        "SELECT hour, process_name, COALESCE(remote_port, 0) AS remote_port, "
+        "COALESCE(remote_hostname, '') AS remote_hostname, COALESCE(direction, '') AS direction, "
+        "SUM(sample_count) AS sample_count "
+        "FROM traffic_rollups GROUP BY 1, 2, 3, 4, 5"
+    ))
+    conn.execute(text("DELETE FROM traffic_rollups"))
+    conn.execute(text(
+        "INSERT INTO traffic_rollups (hour, process_name, remote_port, remote_hostname, direction, sample_count) "
+        "SELECT hour, process_name, remote_port, remote_hostname, direction, sample_count FROM rollup_merge"
+    ))
+    conn.execute(text("DROP TABLE rollup_merge"))
+
+# (version, description, upgrade function) in ascending version order
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "Secondary indexes for hot query paths", _create_model_indexes),
+    (2, "Merge traffic rollup buckets with NULL key columns", _merge_null_rollup_buckets),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn: Connection) -> int:
+    return conn.execute(text("PRAGMA user_version")).scalar() or 0
+
+def run_migrations(engine: Engine) -> int:
+    """
+    Apply pending migrations in order, each in its own transaction.
+
+    Returns:
+        The schema version after migrating.
+    """
+    with engine.begin() as conn:
+        current = get_schema_version(conn)
+
+    for version, description, upgrade in MIGRATIONS:
+        if version <= current:
+            continue
+        logger.info(f"Applying schema migration {version}: {description}")
+        with engine.begin() as conn:
+            upgrade(conn)
+            conn.execute(text(f"PRAGMA user_version={version}"))
+        current = version
+
+    return current
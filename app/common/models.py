@@ -3,7 +3,7 @@ Data models for PortKodiakAIShield.
 """
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Float, Integer, DateTime
+from sqlalchemy import String, Float, Integer, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 class Base(DeclarativeBase):
@@ -14,6 +14,9 @@ class ConnectionEvent(Base):
     """Represents a network connection attempt."""
     
     __tablename__ = "connection_events"
+    __table_args__ = (
+        Index("ix_connection_events_timestamp", "timestamp"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -34,6 +37,10 @@ class ConnectionEvent(Base):
 class DnsLog(Base):
     """Represents a DNS resolution event."""
     __tablename__ = "dns_logs"
+    __table_args__ = (
+        # Latest resolution for an IP
+        Index("ix_dns_logs_ip_address_timestamp", "ip_address", "timestamp"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -49,7 +56,7 @@ class AppPolicy(Base):
     __tablename__ = "app_policies"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    process_path: Mapped[str] = mapped_column(String(512), unique=True) # Full path
+    process_path: Mapped[str] = mapped_column(String(512), unique=True) # Full path (UNIQUE index serves lookups)
     policy_type: Mapped[str] = mapped_column(String(20)) # ALLOW or BLOCK
     is_active: Mapped[bool] = mapped_column(default=True)
     
@@ -59,6 +66,10 @@ class AppPolicy(Base):
 class TrafficSample(Base):
     """Raw connection features for ML training."""
     __tablename__ = "traffic_samples"
+    __table_args__ = (
+        # Time-range export/training reads and retention
+        Index("ix_traffic_samples_timestamp", "timestamp"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -80,9 +91,48 @@ class TrafficSample(Base):
     def __repr__(self) -> str:
         return f"<TrafficSample(proc={self.process_name}, ip={self.remote_ip})>"
 
+class TrafficRollup(Base):
+    """Hourly traffic counts per process/port/host, kept after raw samples expire."""
+    __tablename__ = "traffic_rollups"
+    __table_args__ = (
+        UniqueConstraint("hour", "process_name", "remote_port", "remote_hostname", "direction",
+                         name="uq_traffic_rollups_bucket"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    hour: Mapped[datetime] = mapped_column(DateTime) # Start of the hour bucket
+
+    # Bucket key columns are NOT NULL ("" / 0 for unknown): SQLite never treats
+    # NULLs as equal, so a NULL would defeat uq_traffic_rollups_bucket
+    process_name: Mapped[str] = mapped_column(String(255))
+    remote_port: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    remote_hostname: Mapped[str] = mapped_column(String(255), default="", server_default="")
+    direction: Mapped[str] = mapped_column(String(10), default="", server_default="")
+
+    sample_count: Mapped[int] = mapped_column(Integer)
+
+    def __repr__(self) -> str:
+        return f"<TrafficRollup(hour={self.hour}, proc={self.process_name}, count={self.sample_count})>"
+
+class RollupWatermark(Base):
+    """Highest sample id per sample table already counted in traffic_rollups."""
+    __tablename__ = "rollup_watermarks"
+
+    table_name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    last_id: Mapped[int] = mapped_column(Integer)
+
+    def __repr__(self) -> str:
+        return f"<RollupWatermark(table={self.table_name}, last_id={self.last_id})>"
+
 class Alert(Base):
     """Represents a high-risk event/anomaly detected by the system."""
     __tablename__ = "alerts"
+    __table_args__ = (
+        # ActionManager: status IN (pending...) every few seconds
+        Index("ix_alerts_status_timestamp", "status", "timestamp"),
+        # UI: newest alerts first, LIMIT 50
+        Index("ix_alerts_timestamp", "timestamp"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,253 @@
+"""
+Time-partitioned storage, retention and hourly rollups for traffic samples.
+
+Samples are written into one table per UTC day (traffic_samples_YYYYMMDD), so
+expiring a day is a single DROP TABLE instead of a row-by-row DELETE over the
+whole history. Before raw data expires it is summarised into traffic_rollups
+(counts per hour/process/port/host/direction), which dashboards and training
+can read instead of raw rows. The original traffic_samples table is still read
+as the oldest "partition" so existing deployments keep their data.
+
+Samples can be committed well after their timestamp (collector retries, a
+stalled writer). Every table's highest rolled-up id is kept in
+rollup_watermarks, and rows above it that belong to an hour that was
+already rolled up are added to their buckets on the next pass.
+"""
+import logging
+import re
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Index, MetaData, Table, and_, delete, func, insert, or_, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Engine
+
+from app.common.models import RollupWatermark, TrafficRollup, TrafficSample
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "traffic_samples_"
+_PARTITION_RE = re.compile(r"^traffic_samples_(\d{8})$")
+
+# Partition tables live outside Base.metadata so create_all() never touches them
+partition_metadata = MetaData()
+_tables_lock = threading.Lock()
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+def partition_table(day: date) -> Table:
+    """Table object for one day's partition (same columns as TrafficSample)."""
+    name = partition_name(day)
+    with _tables_lock:
+        if name in partition_metadata.tables:
+            return partition_metadata.tables[name]
+        table = TrafficSample.__table__.to_metadata(partition_metadata, name=name)
+        # Index names are global in SQLite: replace the copied ones with per-partition names
+        table.indexes.clear()
+        Index(f"ix_{name}_timestamp", table.c.timestamp)
+        return table
+
+def list_partitions(conn: Connection) -> List[Tuple[date, str]]:
+    """Existing partitions as (day, table name), oldest first."""
+    names = conn.execute(
+        text("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'traffic_samples_%'")
+    ).scalars()
+    partitions = []
+    for name in names:
+        match = _PARTITION_RE.match(name)
+        if match:
+            partitions.append((datetime.strptime(match.group(1), "%Y%m%d").date(), name))
+    return sorted(partitions)
+
+def sample_tables(conn: Connection, since: Optional[datetime] = None,
+                  until: Optional[datetime] = None) -> List[Table]:
+    """
+    Tables that may hold samples in [since, until): the legacy traffic_samples
+    table first, then the matching day partitions in chronological order.
+    """
+    tables = [TrafficSample.__table__]
+    for day, _ in list_partitions(conn):
+        if since is not None and day < since.date():
+            continue
+        if until is not None and day > until.date():
+            continue
+        tables.append(partition_table(day))
+    return tables
+
+def _floor_hour(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+def _bucket_keys(table: Table) -> list:
+    """Rollup bucket columns of a sample table, NULLs coalesced so equal buckets conflict."""
+    return [
+        func.strftime("%Y-%m-%d %H:00:00.000000", table.c.timestamp),
+        func.coalesce(table.c.process_name, ""),
+        func.coalesce(table.c.remote_port, 0),
+        func.coalesce(table.c.remote_hostname, ""),
+        func.coalesce(table.c.direction, ""),
+    ]
+
+class SamplePartitions:
+    """Routes sample rows into their day partition, creating partitions on demand."""
+
+    def __init__(self) -> None:
+        self._created: set = set()
+        self._lock = threading.Lock()
+
+    def ensure(self, conn: Connection, day: date) -> Table:
+        table = partition_table(day)
+        with self._lock:
+            if table.name in self._created:
+                return table
+        table.create(bind=conn, checkfirst=True)
+        with self._lock:
+            self._created.add(table.name)
+        return table
+
+    def insert_rows(self, conn: Connection, rows: Iterable[dict]) -> int:
+        """Bulk-inserts rows (each with a 'timestamp') grouped by day. Returns rows written."""
+        by_day: Dict[date, list] = {}
+        for row in rows:
+            by_day.setdefault(row["timestamp"].date(), []).append(row)
+
+        for day, day_rows in by_day.items():
+            conn.execute(insert(self.ensure(conn, day)), day_rows)
+        return sum(len(r) for r in by_day.values())
+
+    def forget(self, name: str) -> None:
+        with self._lock:
+            self._created.discard(name)
+
+class RetentionManager:
+    """Rolls up completed hours and expires old partitions."""
+
+    def __init__(self, engine: Engine, retention_days: int = 30, rollup_retention_days: int = 365,
+                 archive_dir: Optional[Path] = None, partitions: Optional[SamplePartitions] = None,
+                 grace: timedelta = timedelta(minutes=5)) -> None:
+        """
+        Args:
+            engine: Writer engine
+            retention_days: Days of raw samples to keep
+            rollup_retention_days: Days of hourly rollups to keep
+            archive_dir: If set, expired partitions are copied into per-day SQLite files here
+            partitions: Shared SamplePartitions, so dropped tables are recreated when needed
+            grace: Hours are first rolled up once they ended this long ago; rows
+                committed later still reach their bucket on a later pass
+        """
+        self.engine = engine
+        self.retention_days = retention_days
+        self.rollup_retention_days = rollup_retention_days
+        self.archive_dir = Path(archive_dir) if archive_dir else None
+        self.partitions = partitions
+        self.grace = grace
+
+    def rollup(self, now: Optional[datetime] = None) -> int:
+        """
+        Aggregate every completed hour newer than the last rolled-up hour, plus
+        rows committed since the previous pass for hours already rolled up.
+        Returns the number of rollup rows inserted or updated.
+        """
+        now = now or datetime.utcnow()
+        until = _floor_hour(now - self.grace)
+        written = 0
+
+        with self.engine.begin() as conn:
+            last = conn.execute(select(func.max(TrafficRollup.hour))).scalar()
+            since = last + timedelta(hours=1) if last else None
+            watermarks = dict(conn.execute(select(RollupWatermark.table_name, RollupWatermark.last_id)).all())
+            in_range = {t.name for t in sample_tables(conn, since, until)}
+
+            rollup_cols = ["hour", "process_name", "remote_port", "remote_hostname",
+                           "direction", "sample_count"]
+            for table in sample_tables(conn):
+                top = conn.execute(select(func.max(table.c.id))).scalar() or 0
+                mark = watermarks.get(table.name, 0)
+                conditions = []
+                if table.name in in_range and (since is None or since < until):
+                    # Newly completed hours
+                    window = table.c.timestamp < until
+                    if since is not None:
+                        window = and_(window, table.c.timestamp >= since)
+                    conditions.append(window)
+                if since is not None and top > mark:
+                    # Committed since the last pass, for hours already rolled up
+                    conditions.append(and_(table.c.id > mark, table.c.timestamp < since))
+                if top != mark:
+                    # Rows above top are not visible to this transaction; the next pass sees them
+                    self._set_watermark(conn, table.name, top)
+                if not conditions:
+                    continue
+
+                keys = _bucket_keys(table)
+                query = select(*keys, func.count()).where(table.c.id <= top, or_(*conditions)).group_by(*keys)
+                stmt = sqlite_insert(TrafficRollup).from_select(rollup_cols, query)
+                # The same bucket can come from two tables (e.g. legacy table + first partition)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=rollup_cols[:-1],
+                    set_={"sample_count": TrafficRollup.sample_count + stmt.excluded.sample_count}
+                )
+                result = conn.execute(stmt)
+                written += max(result.rowcount, 0)
+
+        if written:
+            logger.info(f"Rolled up traffic samples before {until}: {written} rows")
+        return written
+
+    @staticmethod
+    def _set_watermark(conn: Connection, table_name: str, last_id: int) -> None:
+        stmt = sqlite_insert(RollupWatermark).values(table_name=table_name, last_id=last_id)
+        conn.execute(stmt.on_conflict_do_update(index_elements=["table_name"], set_={"last_id": last_id}))
+
+    def expire(self, now: Optional[datetime] = None) -> List[str]:
+        """Drop (optionally archive) partitions older than retention_days. Returns dropped names."""
+        now = now or datetime.utcnow()
+        cutoff_day = (now - timedelta(days=self.retention_days)).date()
+        dropped = []
+
+        with self.engine.connect() as conn:
+            expired = [(day, name) for day, name in list_partitions(conn) if day < cutoff_day]
+
+        for day, name in expired:
+            if self.archive_dir:
+                self._archive(day, name)
+            with self.engine.begin() as conn:
+                conn.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+                # A late row recreates the table with ids starting over
+                conn.execute(delete(RollupWatermark).where(RollupWatermark.table_name == name))
+            if self.partitions:
+                self.partitions.forget(name)
+            dropped.append(name)
+            logger.info(f"Expired sample partition {name}")
+
+        cutoff = datetime.combine(cutoff_day, datetime.min.time())
+        with self.engine.begin() as conn:
+            # Rows written before partitioning (index-assisted on timestamp)
+            conn.execute(delete(TrafficSample).where(TrafficSample.timestamp < cutoff))
+            rollup_cutoff = now - timedelta(days=self.rollup_retention_days)
+            conn.execute(delete(TrafficRollup).where(TrafficRollup.hour < rollup_cutoff))
+
+        return dropped
+
+    def _archive(self, day: date, name: str) -> None:
+        """Copy one partition into its own SQLite file before it is dropped."""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        archive_path = self.archive_dir / f"{name}.db"
+        with self.engine.connect() as conn:
+            conn.exec_driver_sql("ATTACH DATABASE ? AS archive", (str(archive_path),))
+            try:
+                conn.exec_driver_sql(f'DROP TABLE IF EXISTS archive."{name}"')
+                conn.exec_driver_sql(f'CREATE TABLE archive."{name}" AS SELECT * FROM main."{name}"')
+                conn.commit()
+            finally:
+                conn.exec_driver_sql("DETACH DATABASE archive")
+
+    def run(self, now: Optional[datetime] = None) -> None:
+        """One maintenance pass: roll up first so expiring data is never lost from rollups."""
+        try:
+            self.rollup(now)
+            self.expire(now)
+        except Exception as e:
+            logger.error(f"Retention maintenance failed: {e}")
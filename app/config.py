@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -15,10 +16,71 @@ class Settings(BaseSettings):
     
     # ML settings
     MODEL_DIR: Path = Path("ml/models")
+    ML_ENABLED: bool = True  # False: no model is loaded and pandas/sklearn are never imported
+    ML_BACKEND: str = "sklearn"  # sklearn or onnx (falls back to sklearn if the .onnx graph is missing)
+    ML_SCORE_CACHE_SIZE: int = 8192  # memoized scores per feature tuple (0 disables)
+    ML_SCORE_CACHE_TTL: int = 3600  # seconds
+    MODEL_WATCH_INTERVAL: float = 5.0  # seconds between checks for a retrained model file
+
+    # Incremental (sliding-window) retraining in a low-priority background process
+    INCREMENTAL_TRAINING: bool = False
+    TRAINING_INTERVAL: int = 6 * 3600  # seconds between refits
+    TRAINING_WINDOW_HOURS: int = 168  # samples from the last week
+    TRAINING_SAMPLE_SIZE: int = 100000
+    TRAINING_MIN_SAMPLES: int = 1000  # keep the current model below this
+    TRAINING_KEEP_VERSIONS: int = 5  # versioned model files kept in MODEL_DIR
+    TRAINING_NICE: int = 10  # POSIX nice value; below-normal class on Windows
+    TRAINING_CPU_LIMIT: int = 1  # cores the trainer may use
     
     # Data storage
     DB_PATH: Path = Path("C:/ProgramData/PortKodiakAIShield/data.db")
 
+    # SQLite tuning (applied to every pooled connection)
+    DB_JOURNAL_MODE: str = "WAL"  # readers no longer block the agent writers
+    DB_SYNCHRONOUS: str = "NORMAL"  # fsync at checkpoints only; safe with WAL
+    DB_BUSY_TIMEOUT_MS: int = 5000  # wait for the write lock instead of "database is locked"
+    DB_MMAP_SIZE: int = 256 * 1024 * 1024  # bytes
+    DB_CACHE_SIZE_KB: int = 16384  # page cache per connection
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # seconds
+
+    # WFP enumeration
+    WFP_ENUM_PAGE_SIZE: int = 500  # connections/filters requested per FwpmXxxEnum0 call
+    WFP_CAPTURE_MODE: str = "events"  # events (connection subscription, falls back to polling) or poll
+    WFP_EVENT_QUEUE_SIZE: int = 65536  # connection events buffered between pipeline steps
+    WFP_RECONCILE_INTERVAL: int = 60  # seconds between full polls in events mode
+
+    # Agent caches
+    HASH_CACHE_PATH: Path = Path("C:/ProgramData/PortKodiakAIShield/hash_cache.json")
+    HASH_CACHE_SIZE: int = 4096
+    DNS_CACHE_TTL: int = 300  # seconds, successful reverse lookups
+    DNS_NEGATIVE_TTL: int = 60  # seconds, failed reverse lookups
+    DNS_CACHE_SIZE: int = 4096
+    DNS_MAX_WORKERS: int = 5
+    DNS_LOG_FLUSH_INTERVAL: int = 10  # seconds
+    DNS_LOG_BATCH_SIZE: int = 100
+    DNS_LOG_DEDUP_WINDOW: int = 3600  # seconds an unchanged ip -> hostname pair is not re-logged
+
+    # Traffic sample collection
+    COLLECTOR_FLUSH_INTERVAL: int = 10  # seconds
+    COLLECTOR_BATCH_SIZE: int = 50
+    COLLECTOR_QUEUE_SIZE: int = 10000
+    COLLECTOR_OVERFLOW_POLICY: str = "drop-oldest"  # drop-oldest, drop-newest or sample
+
+    # Traffic sample retention
+    SAMPLE_PARTITIONING: bool = True  # write samples into per-day traffic_samples_YYYYMMDD tables
+    SAMPLE_RETENTION_DAYS: int = 30
+    SAMPLE_ARCHIVE_DIR: Optional[Path] = None  # copy expired partitions here before dropping
+    ROLLUP_RETENTION_DAYS: int = 365
+    RETENTION_INTERVAL: int = 3600  # seconds between rollup/expiry passes
+
+    # Agent runtime (one asyncio loop schedules all periodic agent work)
+    AGENT_POLL_INTERVAL: float = 1.0  # seconds between connection capture steps
+    ACTION_POLL_INTERVAL: int = 5  # seconds between checks for pending block/kill actions
+    RUNTIME_IO_WORKERS: int = 2  # threads for DB flushes, model checks and actions
+    RUNTIME_SHUTDOWN_TIMEOUT: int = 10  # seconds to drain queues on stop
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
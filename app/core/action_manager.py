@@ -7,6 +7,9 @@ from app.common.database import SessionLocal
 
 logger = logging.getLogger(__name__)
 
+# Alert statuses set by the UI that request an action from the agent
+PENDING_STATUSES = ("PENDING_BLOCK", "PENDING_KILL")
+
 class ActionManager:
     """
     Manages mitigation actions for detected anomalies.
@@ -14,6 +17,9 @@ class ActionManager:
     """
     def __init__(self, wfp_agent=None):
         self.wfp_agent = wfp_agent # Reference to WfpManager instance
+        self.running = False
+        self.thread = None
+        self._stop = threading.Event()
 
     def set_agent(self, agent):
         """Sets the WFP agent instance if not provided at init."""
@@ -21,15 +27,26 @@ class ActionManager:
 
     def start_polling(self, interval=5):
         """Starts a background thread to poll for pending actions."""
+        if self.thread and self.thread.is_alive():
+            return
         self.running = True
-        self.thread = threading.Thread(target=self._poll_loop, args=(interval,), daemon=True)
+        self._stop.clear()
+        self.thread = threading.Thread(target=self._poll_loop, args=(interval,), daemon=True, name="action-poller")
         self.thread.start()
 
+    def stop(self, timeout=5):
+        """Stops the polling thread, letting an action in progress finish."""
+        self.running = False
+        self._stop.set()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+
     def _poll_loop(self, interval):
         while self.running:
             self.process_queue()
-            import time
-            time.sleep(interval)
+            if self._stop.wait(interval):
+                break
 
     def process_queue(self):
         """Checks DB for pending actions and executes them."""
@@ -38,8 +55,8 @@ class ActionManager:
 
         try:
             with SessionLocal() as db:
-                # Find alerts with PENDING status
-                pending_alerts = db.query(Alert).filter(Alert.status.like("PENDING_%")).all()
+                # Find alerts with PENDING status (IN, unlike LIKE, can use ix_alerts_status_timestamp)
+                pending_alerts = db.query(Alert).filter(Alert.status.in_(PENDING_STATUSES)).all()
                 
                 for alert in pending_alerts:
                     success = False
@@ -63,10 +63,38 @@ class PortKodiakService(win32serviceutil.ServiceFramework):
             self.logger.error(f"Service error: {e}", exc_info=True)
             self.SvcStop()
 
+    def start_agent(self):
+        """
+        Opens the WFP session and schedules the agent's work on one asyncio
+        runtime. Returns the runtime, or None if the agent could not start.
+        """
+        from app.common.database import init_db
+
+        # Create new tables and run pending migrations before anything writes
+        init_db()
+        try:
+            from agent.runtime import AgentRuntime
+            from agent.wfp_wrapper import WfpManager
+
+            agent = WfpManager(start_threads=False)
+            agent.open_session()
+        except Exception as e:
+            self.logger.error(f"WFP agent unavailable: {e}", exc_info=True)
+            return None
+
+        runtime = AgentRuntime.for_agent(agent)
+        runtime.start()
+        return runtime
+
     def main(self) -> None:
         """Service logic."""
-        # TODO: Initialize WFP integration
         # TODO: Load ML models
+        runtime = self.start_agent()
+        trainer = None
+        if settings.INCREMENTAL_TRAINING:
+            from ml.incremental_trainer import TrainerProcess
+            trainer = TrainerProcess.from_settings()
+            trainer.start()
         
         while self.is_running:
             # Check for stop signal
@@ -76,6 +104,12 @@ class PortKodiakService(win32serviceutil.ServiceFramework):
                 
             # TODO: Process events
             self.logger.debug("Service heartbeat")
+
+        if runtime:
+            # Drains the sample/DNS queues and closes the WFP session
+            runtime.stop()
+        if trainer:
+            trainer.stop()
             
 
 def main() -> None:
@@ -3,6 +3,7 @@ Main UI application entry point.
 """
 import sys
 from PyQt6.QtWidgets import QApplication
+from app.common.database import init_db
 from app.ui.main_window import PortKodiakWindow
 from app.ui.styles import DARK_THEME_QSS
 
@@ -15,6 +16,9 @@ def run_ui():
     app.setApplicationName("PortKodiak AI Shield")
     app.setOrganizationName("KodiakAI")
     
+    # The UI may start before the service ever ran against this database
+    init_db()
+    
     window = PortKodiakWindow()
     window.show()
     
@@ -15,10 +15,11 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 try:
-    from app.common.database import SessionLocal
+    from app.common.database import SessionLocal, ReadSessionLocal
     from app.common.models import AppPolicy, Alert
 except ImportError:
     SessionLocal = None
+    ReadSessionLocal = None
     AppPolicy = None
     Alert = None
 
@@ -141,11 +142,11 @@ class PortKodiakWindow(QMainWindow):
     def load_policies(self):
         """Load policies from DB to Table."""
         self.policy_table.setRowCount(0)
-        if not SessionLocal:
+        if not ReadSessionLocal:
             return
             
         try:
-            with SessionLocal() as db:
+            with ReadSessionLocal() as db:
                 policies = db.query(AppPolicy).filter(AppPolicy.is_active == True).all()
                 self.policy_table.setRowCount(len(policies))
                 for i, p in enumerate(policies):
@@ -161,12 +162,6 @@ class PortKodiakWindow(QMainWindow):
         label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(label)
 
-                    if a.risk_score < -0.5: # Example threshold
-                         self.alerts_table.item(i, 3).setBackground(Qt.GlobalColor.red)
-                         
-        except Exception as e:
-            pass # Avoid popup spam on timer
-
     def setup_alerts(self):
         """Setup Alerts tab content."""
         layout = QVBoxLayout(self.alerts_tab)
@@ -231,11 +226,11 @@ class PortKodiakWindow(QMainWindow):
 
     def load_alerts(self):
         """Load alerts from DB."""
-        if not SessionLocal or not Alert:
+        if not ReadSessionLocal or not Alert:
             return
             
         try:
-            with SessionLocal() as db:
+            with ReadSessionLocal() as db:
                 alerts = db.query(Alert).order_by(Alert.timestamp.desc()).limit(50).all()
                 self.alerts_table.setRowCount(len(alerts))
                 for i, a in enumerate(alerts):
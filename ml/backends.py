@@ -0,0 +1,141 @@
+"""
+Scoring backends for InferenceEngine.
+
+sklearn: the joblib pipeline, fed a pandas DataFrame (reference implementation).
+onnx:    the exported ONNX graph run by onnxruntime on a float32 NumPy matrix.
+         String hashing and one-hot encoding happen in FeatureEncoder, because
+         the custom HashingTransformer has no ONNX converter; the numeric
+         scaling and the IsolationForest run inside the graph.
+"""
+import json
+import logging
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from ml.transformers import HashingTransformer
+
+logger = logging.getLogger(__name__)
+
+# Training columns expected by the pipeline, with the default used when a key is missing
+FEATURE_DEFAULTS = {
+    'remote_port': 0,
+    'process_name': 'Unknown',
+    'process_path': 'Unknown',
+    'direction': 'Outbound',
+}
+
+# Key of the ONNX metadata entry holding the FeatureEncoder spec
+FEATURE_SPEC_KEY = "portkodiak.feature_spec"
+
+SKLEARN = "sklearn"
+ONNX = "onnx"
+
+class SklearnBackend:
+    """Scores with the pickled sklearn pipeline."""
+    name = SKLEARN
+
+    def __init__(self, model_path):
+        self.model = joblib.load(model_path)
+
+    @staticmethod
+    def build_frame(connections):
+        """Builds one columnar DataFrame (training column order) for a batch of connections."""
+        data = {
+            column: [c.get(column, default) for c in connections]
+            for column, default in FEATURE_DEFAULTS.items()
+        }
+        return pd.DataFrame(data)
+
+    def score(self, connections):
+        """decision_function scores (negative = anomaly) for a batch of connections."""
+        return self.model.decision_function(self.build_frame(connections))
+
+class FeatureEncoder:
+    """
+    NumPy re-implementation of the pipeline's ColumnTransformer input side.
+
+    The spec is a list of blocks in output column order:
+      {"kind": "numeric", "column": ...}                  raw value (scaled in the graph)
+      {"kind": "hash", "column": ..., "n_features": n}    same as HashingTransformer
+      {"kind": "onehot", "column": ..., "categories": []} unknown values encode as zeros
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.n_features = 0
+        self._blocks = []
+        for block in spec:
+            kind = block["kind"]
+            if kind == "numeric":
+                width, state = 1, None
+            elif kind == "hash":
+                width = block["n_features"]
+                state = HashingTransformer(n_features=width).fit(None)
+            elif kind == "onehot":
+                width = len(block["categories"])
+                state = {category: i for i, category in enumerate(block["categories"])}
+            else:
+                raise ValueError(f"Unknown feature block kind '{kind}'")
+            self._blocks.append((kind, block["column"], self.n_features, width, state))
+            self.n_features += width
+
+    @property
+    def numeric_offsets(self):
+        """Output positions of the numeric blocks (scaled inside the graph)."""
+        return [offset for kind, _, offset, _, _ in self._blocks if kind == "numeric"]
+
+    def encode(self, connections):
+        """Returns a float32 (len(connections), n_features) matrix."""
+        X = np.zeros((len(connections), self.n_features), dtype=np.float32)
+        for kind, column, offset, width, state in self._blocks:
+            default = FEATURE_DEFAULTS.get(column)
+            values = [c.get(column, default) for c in connections]
+            if kind == "numeric":
+                X[:, offset] = np.asarray(values, dtype=np.float32)
+            elif kind == "hash":
+                # Cached per-string rows written straight into the float32 matrix
+                state.transform_into(values, X, offset)
+            else:
+                for row, value in enumerate(values):
+                    index = state.get(value)
+                    if index is not None:
+                        X[row, offset + index] = 1.0
+        return X
+
+class OnnxBackend:
+    """Scores with the exported ONNX graph through an onnxruntime session."""
+    name = ONNX
+
+    def __init__(self, onnx_path, intra_op_threads=1):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        # Batches are small and latency-bound: one thread avoids pool wake-up cost
+        options.intra_op_num_threads = intra_op_threads
+        self.model = ort.InferenceSession(
+            str(onnx_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        metadata = self.model.get_modelmeta().custom_metadata_map
+        self.encoder = FeatureEncoder(json.loads(metadata[FEATURE_SPEC_KEY]))
+        self._input = self.model.get_inputs()[0].name
+        self._output = "scores"
+
+    def score(self, connections):
+        X = self.encoder.encode(connections)
+        return self.model.run([self._output], {self._input: X})[0].ravel()
+
+def load_backend(name, model_path, onnx_path=None):
+    """
+    Loads the requested backend, falling back to sklearn when the ONNX graph or
+    onnxruntime is unavailable.
+    """
+    if name == ONNX:
+        try:
+            return OnnxBackend(onnx_path)
+        except Exception as e:
+            logger.warning(f"ONNX backend unavailable ({e}), falling back to sklearn")
+    elif name != SKLEARN:
+        logger.warning(f"Unknown ML backend '{name}', using sklearn")
+    return SklearnBackend(model_path)
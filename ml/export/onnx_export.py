@@ -0,0 +1,101 @@
+"""
+Export of the trained sklearn pipeline to ONNX.
+
+The graph takes the float32 matrix produced by ml.backends.FeatureEncoder and
+contains the numeric scaling plus the IsolationForest. The encoder spec is
+stored in the model metadata, so the .onnx file is self-contained.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+import numpy as np
+import onnx
+from skl2onnx import to_onnx
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from ml.backends import FEATURE_SPEC_KEY, FeatureEncoder
+from ml.transformers import HashingTransformer
+
+logger = logging.getLogger(__name__)
+
+TARGET_OPSET = {"": 17, "ai.onnx.ml": 3}
+
+def feature_spec(pipeline):
+    """Describes the fitted ColumnTransformer as FeatureEncoder blocks (output column order)."""
+    preprocessor = pipeline.named_steps["preprocessor"]
+    spec = []
+    for name, transformer, columns in preprocessor.transformers_:
+        if transformer == "drop" or name == "remainder":
+            continue
+        if len(columns) != 1:
+            raise ValueError(f"Transformer '{name}' must take exactly one column")
+        column = columns[0]
+        if isinstance(transformer, StandardScaler):
+            spec.append({"kind": "numeric", "column": column})
+        elif isinstance(transformer, HashingTransformer):
+            spec.append({"kind": "hash", "column": column, "n_features": transformer.n_features})
+        elif isinstance(transformer, OneHotEncoder):
+            spec.append({"kind": "onehot", "column": column,
+                         "categories": [str(c) for c in transformer.categories_[0]]})
+        else:
+            raise ValueError(f"No ONNX export for transformer '{name}' ({type(transformer).__name__})")
+    return spec
+
+def numeric_pipeline(pipeline, spec):
+    """
+    Equivalent pipeline over the encoded matrix: the fitted scalers on the numeric
+    positions, everything else passed through, then the fitted IsolationForest.
+    """
+    preprocessor = pipeline.named_steps["preprocessor"]
+    encoder = FeatureEncoder(spec)
+
+    scaling = ColumnTransformer(
+        [(f"scale_{p}", StandardScaler(), [p]) for p in encoder.numeric_offsets],
+        remainder="passthrough"
+    )
+    # Fit for the structure only, then copy the trained statistics over
+    scaling.fit(np.zeros((2, encoder.n_features), dtype=np.float32))
+    fitted = [t for t in preprocessor.transformers_ if isinstance(t[1], StandardScaler)]
+    for (name, _, _), (_, source, _) in zip(scaling.transformers_, fitted):
+        target = scaling.named_transformers_[name]
+        target.mean_, target.var_, target.scale_ = source.mean_, source.var_, source.scale_
+        target.n_samples_seen_ = source.n_samples_seen_
+
+    return Pipeline([("scaling", scaling), ("classifier", pipeline.named_steps["classifier"])])
+
+def export_onnx(pipeline, output_path):
+    """Converts a fitted pipeline to ONNX at output_path. Returns the feature spec."""
+    spec = feature_spec(pipeline)
+    surrogate = numeric_pipeline(pipeline, spec)
+    n_features = FeatureEncoder(spec).n_features
+
+    model = to_onnx(
+        surrogate,
+        np.zeros((1, n_features), dtype=np.float32),
+        target_opset=TARGET_OPSET
+    )
+    entry = model.metadata_props.add()
+    entry.key = FEATURE_SPEC_KEY
+    entry.value = json.dumps(spec)
+    onnx.save(model, str(output_path))
+    logger.info(f"Exported ONNX model to {output_path}")
+    return spec
+
+if __name__ == "__main__":
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Export a trained pipeline to ONNX.")
+    parser.add_argument("model", nargs="?", default=os.path.join(os.path.dirname(__file__), '..', 'models', 'portkodiak_model.pkl'))
+    parser.add_argument("-o", "--output", help="Output .onnx path (default: next to the model)")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.model)[0] + '.onnx'
+    export_onnx(joblib.load(args.model), output)
+    print(f"ONNX model saved to: {output}")
@@ -0,0 +1,183 @@
+"""
+Periodic sliding-window retraining.
+
+A separate, low-priority process refits the IsolationForest pipeline on a
+bounded sample of the most recent traffic samples every interval and
+publishes it as a new versioned model. The agent's ModelRegistry then
+hot-swaps it in, so the baseline follows each host's drift without a full
+retrain over all history. IsolationForest cannot be updated in place, so
+"incremental" means a refit on a recent window, which stays cheap because
+the sample size is capped.
+"""
+import logging
+import multiprocessing
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Optional
+
+import psutil
+
+from ml.model_registry import PublishedModel, publish_model
+from ml.models.isolation_forest import build_pipeline
+from ml.preprocessing.loader import load_training_data
+
+try:
+    from app.config import settings
+except ImportError:
+    settings = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(__file__), 'models')
+
+class IncrementalTrainer:
+    """Refits the pipeline on the last `window` of samples and publishes it."""
+
+    def __init__(self, model_dir=DEFAULT_MODEL_DIR, window=timedelta(days=7), sample_size=100000,
+                 min_samples=1000, keep_versions=5, db_engine=None, n_jobs=1, export_onnx=True):
+        """
+        Args:
+            window: Only samples newer than now - window are used
+            sample_size: Reservoir size the window is reduced to before fitting
+            min_samples: Skip the cycle (keep the current model) below this many samples
+            n_jobs: IsolationForest workers; 1 keeps the trainer on a single core
+        """
+        self.model_dir = model_dir
+        self.window = window
+        self.sample_size = sample_size
+        self.min_samples = min_samples
+        self.keep_versions = keep_versions
+        self.db_engine = db_engine
+        self.n_jobs = n_jobs
+        self.export_onnx = export_onnx
+
+    def train_once(self, now: Optional[datetime] = None) -> Optional[PublishedModel]:
+        """One retraining cycle. Returns the published model, or None if skipped."""
+        now = now or datetime.utcnow()
+        df = load_training_data(
+            "db", db_engine=self.db_engine, sample_size=self.sample_size,
+            since=now - self.window, until=now
+        )
+        if len(df) < self.min_samples:
+            logger.info(f"Incremental training skipped: {len(df)} samples in window (< {self.min_samples})")
+            return None
+
+        pipeline = build_pipeline(n_jobs=self.n_jobs)
+        pipeline.fit(df)
+        published = publish_model(
+            pipeline, self.model_dir, keep_versions=self.keep_versions, export_onnx=self.export_onnx
+        )
+        logger.info(f"Incremental training on {len(df)} samples published version {published.version}")
+        return published
+
+def lower_priority(nice=10, cpu_limit=1):
+    """
+    Demotes the current process so it never competes with the agent:
+    below-normal CPU priority, low I/O priority and at most cpu_limit cores
+    (the highest-numbered ones; the agent threads are not pinned).
+    """
+    p = psutil.Process()
+    try:
+        p.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS if sys.platform == "win32" else nice)
+    except (psutil.AccessDenied, AttributeError):
+        logger.warning("Could not lower trainer CPU priority")
+
+    if hasattr(p, "ionice"):
+        try:
+            if sys.platform == "win32":
+                p.ionice(psutil.IOPRIO_LOW)
+            else:
+                p.ionice(psutil.IOPRIO_CLASS_IDLE)
+        except (psutil.AccessDenied, OSError):
+            pass
+
+    if cpu_limit and hasattr(p, "cpu_affinity"):
+        cpus = p.cpu_affinity()
+        if len(cpus) > cpu_limit:
+            p.cpu_affinity(cpus[-cpu_limit:])
+
+def run_trainer(stop_event, interval, nice=10, cpu_limit=1, **trainer_kwargs):
+    """
+    Trainer process entry point: train once at startup, then every `interval`
+    seconds until stop_event is set (a service restarted more often than the
+    interval would otherwise never train).
+    """
+    from threadpoolctl import threadpool_limits
+
+    lower_priority(nice, cpu_limit)
+    trainer = IncrementalTrainer(**trainer_kwargs)
+    # Native BLAS/OpenMP pools would otherwise size themselves to every core
+    with threadpool_limits(limits=cpu_limit or None):
+        while True:
+            try:
+                trainer.train_once()
+            except Exception as e:
+                logger.error(f"Incremental training failed: {e}")
+            if stop_event.wait(interval):
+                break
+
+def python_executable():
+    """
+    Interpreter for spawned children. Inside a pywin32 service sys.executable
+    is pythonservice.exe, which cannot run a multiprocessing child.
+    """
+    if os.path.basename(sys.executable).lower() == "pythonservice.exe":
+        return os.path.join(sys.exec_prefix, "python.exe")
+    return sys.executable
+
+class TrainerProcess:
+    """Runs run_trainer in a spawned child process."""
+
+    def __init__(self, interval=6 * 3600, nice=10, cpu_limit=1, **trainer_kwargs):
+        # spawn on every platform: no forked DB connections or agent threads in the child
+        self._ctx = multiprocessing.get_context("spawn")
+        self.interval = interval
+        self.nice = nice
+        self.cpu_limit = cpu_limit
+        self.trainer_kwargs = trainer_kwargs
+        self.process = None
+        self._stop = None
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            interval=settings.TRAINING_INTERVAL,
+            nice=settings.TRAINING_NICE,
+            cpu_limit=settings.TRAINING_CPU_LIMIT,
+            window=timedelta(hours=settings.TRAINING_WINDOW_HOURS),
+            sample_size=settings.TRAINING_SAMPLE_SIZE,
+            min_samples=settings.TRAINING_MIN_SAMPLES,
+            keep_versions=settings.TRAINING_KEEP_VERSIONS,
+        )
+
+    def start(self):
+        if self.process and self.process.is_alive():
+            return
+        executable = python_executable()
+        if executable != sys.executable:
+            self._ctx.set_executable(executable)
+        self._stop = self._ctx.Event()
+        self.process = self._ctx.Process(
+            target=run_trainer,
+            args=(self._stop, self.interval, self.nice, self.cpu_limit),
+            kwargs=self.trainer_kwargs,
+            daemon=True,
+            name="model-trainer"
+        )
+        self.process.start()
+        logger.info(f"Started incremental trainer (pid {self.process.pid}, every {self.interval}s)")
+
+    def stop(self, timeout=10):
+        if not self.process:
+            return
+        self._stop.set()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            # Mid-fit: the active model is only switched by an atomic rename, so this is safe
+            self.process.terminate()
+            self.process.join(timeout)
+        self.process = None
+
+    def is_alive(self):
+        return bool(self.process and self.process.is_alive())
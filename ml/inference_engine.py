@@ -1,8 +1,7 @@
 import os
 import sys
-import pandas as pd
-import joblib
 import logging
+from typing import NamedTuple
 
 try:
     from ml.transformers import HashingTransformer
@@ -11,63 +10,182 @@ except ImportError:
     sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
     from ml.transformers import HashingTransformer
 
+from ml.backends import FEATURE_DEFAULTS, ONNX, SKLEARN, load_backend
+from app.common.cache import LRUCache
+
+try:
+    from app.config import settings
+except ImportError:
+    settings = None
+
 logger = logging.getLogger(__name__)
 
+class LoadedModel(NamedTuple):
+    """A scoring backend together with the file version it was loaded from."""
+    backend: object
+    version: tuple
+
 class InferenceEngine:
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, backend=None, onnx_path=None, cache_size=None, cache_ttl=None):
+        """
+        Args:
+            model_path: Pickled sklearn pipeline
+            backend: 'sklearn' or 'onnx'. Defaults to settings.ML_BACKEND.
+            onnx_path: Exported graph for the onnx backend. Defaults to model_path with .onnx suffix.
+            cache_size: Scores memoized per feature tuple (0 disables). Defaults to settings.
+            cache_ttl: Seconds a memoized score is reused. Defaults to settings.
+        """
         if model_path is None:
             model_path = os.path.join(os.path.dirname(__file__), 'models', 'portkodiak_model.pkl')
-        
-        self.model = None
+        if backend is None:
+            backend = settings.ML_BACKEND if settings else SKLEARN
+        if cache_size is None:
+            cache_size = settings.ML_SCORE_CACHE_SIZE if settings else 8192
+        if cache_ttl is None:
+            cache_ttl = settings.ML_SCORE_CACHE_TTL if settings else 3600
+
+        self.backend_name = backend
         self.model_path = model_path
+        self.onnx_path = onnx_path or os.path.splitext(model_path)[0] + '.onnx'
+        # Backend and version are swapped together as one reference, so a
+        # concurrent predict never pairs a new backend with the old version
+        self._loaded = None
+        # (model_version, feature tuple) -> score; the version in the key means
+        # a reloaded model never sees scores from the previous one
+        self._score_cache = LRUCache(maxsize=cache_size, ttl=cache_ttl) if cache_size else None
         self._load_model()
-        
+
+    @property
+    def backend(self):
+        return self._loaded.backend if self._loaded else None
+
+    @property
+    def model(self):
+        return self._loaded.backend.model if self._loaded else None
+
+    @property
+    def model_version(self):
+        """(mtime_ns, size) of the loaded model file(s)."""
+        return self._loaded.version if self._loaded else None
+
+    def file_version(self):
+        """Current on-disk version of the model; includes the graph for the onnx backend."""
+        paths = [self.model_path] + ([self.onnx_path] if self.backend_name == ONNX else [])
+        version = ()
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                if path == self.model_path:
+                    return None
+                continue
+            version += (st.st_mtime_ns, st.st_size)
+        return version
+
+    def load(self):
+        """Loads the model file into a LoadedModel without installing it."""
+        version = self.file_version()
+        backend = load_backend(self.backend_name, self.model_path, self.onnx_path)
+        return LoadedModel(backend, version)
+
+    def swap(self, loaded):
+        """Atomically installs a loaded model and returns the previous one."""
+        previous, self._loaded = self._loaded, loaded
+        if self._score_cache is not None:
+            self._score_cache.clear()
+        if loaded is not None:
+            logger.info(f"Activated ML model {self.model_path} version {loaded.version} ({loaded.backend.name} backend)")
+        return previous
+
     def _load_model(self):
         if not os.path.exists(self.model_path):
             logger.warning(f"ML Model not found at {self.model_path}. Inference disabled.")
             return
 
         try:
-            self.model = joblib.load(self.model_path)
-            logger.info(f"Loaded ML model from {self.model_path}")
+            self.swap(self.load())
         except Exception as e:
             logger.error(f"Failed to load ML model: {e}")
 
+    def reload(self):
+        """Reloads the model file and invalidates memoized scores."""
+        self._load_model()
+
+    def reload_if_changed(self):
+        """Reloads when the model file changed on disk. Returns True if it did."""
+        version = self.file_version()
+        if version is None or version == self.model_version:
+            return False
+        self.reload()
+        return True
+
+    @staticmethod
+    def feature_key(connection_info):
+        """The model's whole input: equal tuples always get the same score."""
+        return tuple(connection_info.get(column, default) for column, default in FEATURE_DEFAULTS.items())
+
+    def cache_stats(self):
+        """Hit/miss counters of the score cache."""
+        if self._score_cache is None:
+            return {"enabled": False}
+        stats = self._score_cache.stats()
+        stats["enabled"] = True
+        stats["model_version"] = self.model_version
+        return stats
+
     def predict(self, connection_info):
         """
         Predicts anomaly score for a connection.
         Returns: Score (float) and Label ("Normal"/"Anomaly")
         """
-        if self.model is None:
-            return 0.0, "Unknown (No Model)"
-            
+        return self.predict_batch([connection_info])[0]
+
+    def predict_batch(self, connections):
+        """
+        Predicts anomaly scores for a batch of connections in a single pipeline pass.
+        Memoized feature tuples are served from the cache; only the distinct
+        misses are scored.
+        Returns: List of (Score, Label) tuples, in input order.
+        """
+        if not connections:
+            return []
+
+        loaded = self._loaded
+        if loaded is None:
+            return [(0.0, "Unknown (No Model)")] * len(connections)
+
         try:
-            # Prepare DataFrame for pipeline
-            # Keys must match training columns
-            # remote_port, process_name, process_path, direction
-            
-            data = {
-                'remote_port': [connection_info.get('remote_port', 0)],
-                'process_name': [connection_info.get('process_name', 'Unknown')],
-                'process_path': [connection_info.get('process_path', 'Unknown')],
-                'direction': [connection_info.get('direction', 'Outbound')]
-            }
-            
-            df = pd.DataFrame(data)
-            
-            # Predict
-            # score_samples: opposite of anomaly score. Lower is more anomalous. 
-            # predict: -1 for outlier, 1 for inlier
-            
-            # Use predict first
-            label_code = self.model.predict(df)[0]
-            label = "Anomaly" if label_code == -1 else "Normal"
-            
-            # Get raw score
-            score = self.model.decision_function(df)[0]
-            
-            return score, label
+            scores = self._scores(loaded, connections)
+
+            # decision_function: negative for outliers, positive for inliers.
+            # IsolationForest.predict is defined as (decision_function < 0) -> -1,
+            # so the label is derived from the same scores instead of a second pass.
+            return [
+                (float(score), "Anomaly" if score < 0 else "Normal")
+                for score in scores
+            ]
             
         except Exception as e:
             logger.error(f"Prediction failed: {e}")
-            return 0.0, "Error"
+            return [(0.0, "Error")] * len(connections)
+
+    def _scores(self, loaded, connections):
+        cache = self._score_cache
+        if cache is None:
+            return loaded.backend.score(connections)
+
+        version = loaded.version
+        keys = [(version, self.feature_key(c)) for c in connections]
+        scores = [cache.get(key) for key in keys]
+
+        misses = {} # key -> connection, deduplicated within the batch
+        for key, score, conn in zip(keys, scores, connections):
+            if score is None and key not in misses:
+                misses[key] = conn
+
+        if misses:
+            fresh = dict(zip(misses, loaded.backend.score(list(misses.values()))))
+            for key, score in fresh.items():
+                cache.put(key, float(score))
+            scores = [fresh[key] if score is None else score for key, score in zip(keys, scores)]
+        return scores
@@ -0,0 +1,212 @@
+"""
+Hot model reload for a running InferenceEngine.
+
+A watcher thread polls the model file(s). When a new version has been stable
+for one poll (the writer has finished), it is loaded, warmed and validated on
+a canary batch on that thread, then swapped into the engine in one reference
+assignment. The enumeration loop keeps scoring with the current model the
+whole time. The replaced model is kept for rollback().
+
+publish_model() is the writer side, used by train_local.py and the
+incremental trainer: versioned files first, then an atomic switch of the
+active file the watcher polls.
+"""
+import glob
+import logging
+import math
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "portkodiak_model"
+
+class PublishedModel(NamedTuple):
+    version: str
+    model_path: str # active pickle (what InferenceEngine/ModelRegistry watch)
+    onnx_path: Optional[str] # active ONNX graph, None if the export was unavailable
+
+def _activate(versioned_path, active_path):
+    """Atomically points active_path at versioned_path (hard link, or copy if unsupported)."""
+    tmp_path = active_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(versioned_path, tmp_path)
+    except OSError:
+        shutil.copyfile(versioned_path, tmp_path)
+    os.replace(tmp_path, active_path)
+
+def publish_model(pipeline, model_dir, keep_versions=5, export_onnx=True):
+    """
+    Saves a fitted pipeline as <MODEL_NAME>.<version>.pkl (+ .onnx) in model_dir,
+    then atomically replaces the active <MODEL_NAME>.pkl/.onnx. The slow writes
+    happen before the switch, so a watcher never sees a half-written model.
+    Only the newest keep_versions versioned files are kept.
+    """
+    import joblib
+
+    os.makedirs(model_dir, exist_ok=True)
+    version = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    versioned = os.path.join(model_dir, f"{MODEL_NAME}.{version}")
+    joblib.dump(pipeline, versioned + '.pkl')
+
+    onnx_ok = False
+    if export_onnx:
+        try:
+            from ml.export.onnx_export import export_onnx as to_onnx
+            to_onnx(pipeline, versioned + '.onnx')
+            onnx_ok = True
+        except ImportError as e:
+            logger.info(f"ONNX export skipped ({e})")
+        except Exception as e:
+            # The pickle is already written and still gets published
+            logger.warning(f"ONNX export failed, publishing the pickle only: {e}")
+            if os.path.exists(versioned + '.onnx'):
+                os.remove(versioned + '.onnx')
+
+    active = os.path.join(model_dir, MODEL_NAME)
+    if onnx_ok:
+        _activate(versioned + '.onnx', active + '.onnx')
+    _activate(versioned + '.pkl', active + '.pkl')
+
+    if keep_versions:
+        prune_versions(model_dir, keep_versions)
+    logger.info(f"Published ML model version {version}")
+    return PublishedModel(version, active + '.pkl', active + '.onnx' if onnx_ok else None)
+
+def list_versions(model_dir):
+    """Published version ids in model_dir, oldest first."""
+    prefix = f"{MODEL_NAME}."
+    versions = set()
+    for path in glob.glob(os.path.join(model_dir, f"{MODEL_NAME}.*.pkl")):
+        versions.add(os.path.basename(path)[len(prefix):-len('.pkl')])
+    return sorted(versions)
+
+def prune_versions(model_dir, keep_versions):
+    for version in list_versions(model_dir)[:-keep_versions]:
+        for ext in ('.pkl', '.onnx'):
+            path = os.path.join(model_dir, f"{MODEL_NAME}.{version}{ext}")
+            if os.path.exists(path):
+                os.remove(path)
+
+# Representative connections scored before a new model goes live
+CANARY_CONNECTIONS = [
+    {"remote_port": 443, "process_name": "chrome.exe",
+     "process_path": "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe", "direction": "Outbound"},
+    {"remote_port": 53, "process_name": "svchost.exe (NetworkService)",
+     "process_path": "C:\\Windows\\System32\\svchost.exe", "direction": "Outbound"},
+    {"remote_port": 4444, "process_name": "nc.exe", "process_path": "C:\\Temp\\nc.exe", "direction": "Inbound"},
+    {},
+]
+
+class ModelValidationError(Exception):
+    """A candidate model failed the canary check."""
+
+class ModelRegistry:
+    """Watches the engine's model file and hot-swaps validated new versions."""
+
+    def __init__(self, engine, poll_interval=5.0, canary=None):
+        """
+        Args:
+            engine: InferenceEngine to keep up to date
+            poll_interval: Seconds between file checks
+            canary: Connections every candidate must score (finite, one per input)
+        """
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self.canary = canary or CANARY_CONNECTIONS
+        self.previous = None # LoadedModel replaced by the last swap
+        self.last_error = None
+        self.swaps = 0
+        self._seen_version = engine.model_version # last on-disk version observed
+        self._rejected_version = None # failed candidates are not retried until the file changes
+        self._lock = threading.Lock() # serialises swaps and rollbacks
+        self._stop = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self._stop.clear()
+        self.thread = threading.Thread(target=self._watch_loop, daemon=True, name="model-watcher")
+        self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+
+    def _watch_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Model watch failed: {e}")
+
+    def check(self):
+        """
+        One poll. Returns True if a new model was activated.
+        A version is only loaded once it is unchanged since the previous poll.
+        """
+        version = self.engine.file_version()
+        if version is None or version == self.engine.model_version or version == self._rejected_version:
+            self._seen_version = version
+            return False
+        if version != self._seen_version:
+            # Still being written (or just appeared): wait for it to settle
+            self._seen_version = version
+            return False
+        return self.activate_candidate()
+
+    def activate_candidate(self):
+        """Loads, warms and validates the on-disk model, then swaps it in. Returns True on success."""
+        start = time.perf_counter()
+        try:
+            candidate = self.engine.load()
+            self.validate(candidate)
+        except Exception as e:
+            self._rejected_version = self.engine.file_version()
+            self.last_error = str(e)
+            logger.error(f"Rejected new ML model {self._rejected_version}: {e}")
+            return False
+
+        with self._lock:
+            self.previous = self.engine.swap(candidate)
+            self.swaps += 1
+            self.last_error = None
+        logger.info(f"Hot-swapped ML model in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return True
+
+    def validate(self, candidate):
+        """Scores the canary batch (which also warms the backend) and checks the output."""
+        scores = list(candidate.backend.score(self.canary))
+        if len(scores) != len(self.canary):
+            raise ModelValidationError(f"Canary returned {len(scores)} scores for {len(self.canary)} inputs")
+        if not all(math.isfinite(float(score)) for score in scores):
+            raise ModelValidationError("Canary produced non-finite scores")
+        return scores
+
+    def rollback(self):
+        """Re-activates the model replaced by the last swap. Returns True if there was one."""
+        with self._lock:
+            if self.previous is None:
+                return False
+            rejected = self.engine.model_version
+            self.previous = self.engine.swap(self.previous)
+            # Do not pick the rolled-back file up again on the next poll
+            self._rejected_version = rejected
+        logger.warning(f"Rolled back ML model to version {self.engine.model_version}")
+        return True
+
+    def stats(self):
+        return {
+            "active_version": self.engine.model_version,
+            "previous_version": self.previous.version if self.previous else None,
+            "swaps": self.swaps,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,41 @@
+"""
+Isolation Forest anomaly detection pipeline.
+"""
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import IsolationForest
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from ml.transformers import HashingTransformer
+
+def build_pipeline(n_estimators=100, contamination=0.01, n_jobs=-1, random_state=42,
+                   proc_features=16, path_features=32):
+    """
+    Unfitted preprocessing + IsolationForest pipeline over the traffic sample columns.
+    proc_features/path_features are the hashed widths of process_name/process_path.
+    """
+    # Preprocessor
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('port', StandardScaler(), ['remote_port']),
+            ('proc', HashingTransformer(n_features=proc_features), ['process_name']),
+            ('path', HashingTransformer(n_features=path_features), ['process_path']),
+            # 'direction' is categorical strings 'Inbound'/'Outbound'
+            ('dir', OneHotEncoder(handle_unknown='ignore', sparse_output=False), ['direction'])
+        ],
+        remainder='drop'
+    )
+
+    # Model
+    # contamination=0.01 implies we expect ~1% anomalies in training data
+    clf = IsolationForest(
+        n_estimators=n_estimators,
+        contamination=contamination,
+        random_state=random_state,
+        n_jobs=n_jobs
+    )
+
+    return Pipeline([
+        ('preprocessor', preprocessor),
+        ('classifier', clf)
+    ])
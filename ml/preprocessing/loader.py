@@ -0,0 +1,281 @@
+"""
+Out-of-core training data loader.
+
+Streams traffic samples in chunks from the database (legacy table + day
+partitions), Parquet exports or CSV exports, and keeps a bounded random
+sample of them. IsolationForest is fitted on a few hundred thousand rows at
+most, so the full history never has to fit in memory.
+"""
+import glob
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import psutil
+from sqlalchemy import select
+
+logger = logging.getLogger(__name__)
+
+# Columns read from every source, with the value used for missing entries
+TRAINING_COLUMNS = {
+    'process_name': 'Unknown',
+    'process_path': 'Unknown',
+    'remote_port': 0,
+    'direction': 'Outbound',
+    'is_malicious': False,
+}
+CATEGORICAL_COLUMNS = ['process_name', 'process_path', 'direction']
+
+DEFAULT_CHUNK_SIZE = 50000
+DEFAULT_SAMPLE_SIZE = 200000
+
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fills missing values and shrinks column dtypes: strings become categoricals
+    (a few hundred distinct paths repeated millions of times) and ports uint16.
+    """
+    df = df.fillna(TRAINING_COLUMNS)
+    for column in CATEGORICAL_COLUMNS:
+        df[column] = df[column].astype(str).astype('category')
+    # Ports go up to 65535, so int16 would overflow: uint16 is the 2-byte type that fits
+    df['remote_port'] = df['remote_port'].astype('uint16')
+    df['is_malicious'] = df['is_malicious'].astype(bool)
+    return df
+
+class PhaseReport:
+    """Collects wall time and process RSS for each named phase of a run."""
+
+    def __init__(self) -> None:
+        self.phases: List[Dict] = []
+        self._process = psutil.Process()
+
+    @contextmanager
+    def phase(self, name: str):
+        rss_before = self._process.memory_info().rss
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            rss_after = self._process.memory_info().rss
+            self.phases.append({
+                "phase": name,
+                "seconds": time.perf_counter() - start,
+                "rss_mb": rss_after / 2**20,
+                "rss_delta_mb": (rss_after - rss_before) / 2**20,
+            })
+
+    def format(self) -> str:
+        lines = [f"{'phase':<12}{'time (s)':>10}{'rss (MiB)':>12}{'delta':>10}"]
+        for p in self.phases:
+            lines.append(f"{p['phase']:<12}{p['seconds']:>10.2f}{p['rss_mb']:>12.1f}{p['rss_delta_mb']:>+10.1f}")
+        return "\n".join(lines)
+
+class Reservoir:
+    """
+    Uniform random sample of at most `size` rows over a stream of DataFrame chunks
+    (Algorithm R, vectorised per chunk). Rows are kept as per-column numpy arrays.
+    """
+
+    def __init__(self, size: int, seed: Optional[int] = None) -> None:
+        self.size = size
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+        self._columns: Optional[Dict[str, np.ndarray]] = None
+        self._filled = 0
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        n = len(chunk)
+        if n == 0:
+            return
+        if self._columns is None:
+            self._columns = {
+                c: np.empty(self.size, dtype=chunk[c].to_numpy().dtype) for c in chunk.columns
+            }
+
+        # Fill empty slots first
+        take = min(self.size - self._filled, n)
+        if take:
+            for c, values in self._columns.items():
+                values[self._filled:self._filled + take] = chunk[c].to_numpy()[:take]
+            self._filled += take
+
+        # Row with stream position t replaces a random slot with probability size / (t + 1)
+        if take < n:
+            positions = np.arange(self.seen + take, self.seen + n)
+            slots = (self._rng.random(len(positions)) * (positions + 1)).astype(np.int64)
+            accepted = np.flatnonzero(slots < self.size)
+            if len(accepted):
+                # Later rows win when several land on the same slot, as in the sequential algorithm
+                slots = slots[accepted]
+                rev_unique, rev_idx = np.unique(slots[::-1], return_index=True)
+                src = take + accepted[::-1][rev_idx]
+                for c, values in self._columns.items():
+                    values[rev_unique] = chunk[c].to_numpy()[src]
+
+        self.seen += n
+
+    def to_frame(self) -> pd.DataFrame:
+        if self._columns is None:
+            return pd.DataFrame(columns=list(TRAINING_COLUMNS))
+        return pd.DataFrame({c: v[:self._filled] for c, v in self._columns.items()})
+
+class StratifiedReservoir:
+    """
+    One reservoir per value of `column`, combined with proportional allocation
+    at the end. Every stratum seen keeps at least `min_per_stratum` rows, so rare
+    classes (e.g. labelled malicious traffic) are not sampled away.
+    """
+
+    def __init__(self, size: int, column: str, min_per_stratum: int = 100,
+                 seed: Optional[int] = None) -> None:
+        self.size = size
+        self.column = column
+        self.min_per_stratum = min_per_stratum
+        self._rng = np.random.default_rng(seed)
+        self._strata: Dict = {}
+
+    @property
+    def seen(self) -> int:
+        return sum(r.seen for r in self._strata.values())
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        for value, group in chunk.groupby(self.column, observed=True, sort=False):
+            reservoir = self._strata.get(value)
+            if reservoir is None:
+                reservoir = self._strata[value] = Reservoir(self.size, seed=self._rng.integers(2**32))
+            reservoir.add(group)
+
+    def allocation(self) -> Dict:
+        """
+        Rows kept per stratum: min_per_stratum (or all its rows) first, then the
+        rest of the budget proportional to the remaining rows seen.
+        """
+        seen = {value: min(r.seen, self.size) for value, r in self._strata.items()}
+        alloc = {value: min(n, self.min_per_stratum) for value, n in seen.items()}
+        budget = self.size - sum(alloc.values())
+        rest = {value: seen[value] - alloc[value] for value in seen}
+        total_rest = sum(rest.values())
+        if budget <= 0 or total_rest == 0:
+            return alloc
+
+        extra = {value: min(n, budget * n // total_rest) for value, n in rest.items()}
+        # Hand out the rounding remainder to the largest strata
+        leftover = min(budget, total_rest) - sum(extra.values())
+        for value, n in extra.items():
+            alloc[value] += n
+        for value in sorted(rest, key=rest.get, reverse=True):
+            if leftover <= 0:
+                break
+            if alloc[value] < seen[value]:
+                alloc[value] += 1
+                leftover -= 1
+        return alloc
+
+    def to_frame(self) -> pd.DataFrame:
+        frames = []
+        for value, n in self.allocation().items():
+            frame = self._strata[value].to_frame()
+            if n < len(frame):
+                frame = frame.sample(n=n, random_state=self._rng.integers(2**32))
+            frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=list(TRAINING_COLUMNS))
+        return pd.concat(frames, ignore_index=True)
+
+def iter_db_chunks(db_engine, chunk_size: int = DEFAULT_CHUNK_SIZE, since=None,
+                   until=None) -> Iterator[pd.DataFrame]:
+    """Streams training columns from traffic_samples and its day partitions."""
+    from app.common.retention import sample_tables
+
+    with db_engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True)
+        for table in sample_tables(conn, since, until):
+            query = select(*[table.c[c] for c in TRAINING_COLUMNS])
+            if since is not None:
+                query = query.where(table.c.timestamp > since)
+            if until is not None:
+                query = query.where(table.c.timestamp < until)
+            for chunk in pd.read_sql(query, conn, chunksize=chunk_size):
+                # Labels come back as SQLAlchemy quoted_name; sklearn only records plain str feature names
+                chunk.columns = [str(c) for c in chunk.columns]
+                yield chunk
+
+def _expand_paths(paths, pattern: str) -> List[str]:
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    files = []
+    for path in map(str, paths):
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, pattern))))
+        else:
+            files.extend(sorted(glob.glob(path)) or [path])
+    return files
+
+def iter_parquet_chunks(paths, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Streams record batches from Parquet files (files, globs or directories of *.parquet)."""
+    import pyarrow.parquet as pq
+
+    for path in _expand_paths(paths, "*.parquet"):
+        parquet = pq.ParquetFile(path)
+        columns = [c for c in TRAINING_COLUMNS if c in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+
+def iter_csv_chunks(paths, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Streams chunks from CSV exports (files, globs or directories of *.csv)."""
+    for path in _expand_paths(paths, "*.csv"):
+        yield from pd.read_csv(
+            path,
+            usecols=lambda c: c in TRAINING_COLUMNS,
+            chunksize=chunk_size
+        )
+
+def sample_chunks(chunks: Iterable[pd.DataFrame], sample_size: int = DEFAULT_SAMPLE_SIZE,
+                  stratify: Optional[str] = None, seed: Optional[int] = 42) -> pd.DataFrame:
+    """
+    Reduces a chunk stream to a random sample of at most sample_size rows with
+    optimised dtypes. Only one chunk plus the sample is ever held in memory.
+    """
+    if stratify:
+        reservoir = StratifiedReservoir(sample_size, stratify, seed=seed)
+    else:
+        reservoir = Reservoir(sample_size, seed=seed)
+
+    for chunk in chunks:
+        for column, default in TRAINING_COLUMNS.items():
+            if column not in chunk:
+                chunk[column] = default
+        reservoir.add(chunk[list(TRAINING_COLUMNS)].fillna(TRAINING_COLUMNS))
+
+    logger.info(f"Sampled {min(reservoir.seen, sample_size)} of {reservoir.seen} rows")
+    return optimize_dtypes(reservoir.to_frame())
+
+def load_training_data(source: str = "db", paths=None, db_engine=None,
+                       sample_size: int = DEFAULT_SAMPLE_SIZE, stratify: Optional[str] = None,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE, seed: Optional[int] = 42,
+                       since=None, until=None) -> pd.DataFrame:
+    """
+    Loads a training sample from the given source.
+
+    Args:
+        source: 'db', 'parquet' or 'csv'
+        paths: Files/globs/directories for the parquet and csv sources
+        db_engine: Engine for the db source (defaults to the read-only engine)
+        since / until: Time window for the db source (exclusive bounds)
+    """
+    if source == "db":
+        if db_engine is None:
+            from app.common.database import read_engine as db_engine
+        chunks = iter_db_chunks(db_engine, chunk_size, since=since, until=until)
+    elif source == "parquet":
+        chunks = iter_parquet_chunks(paths, chunk_size)
+    elif source == "csv":
+        chunks = iter_csv_chunks(paths, chunk_size)
+    else:
+        raise ValueError(f"Unknown training data source '{source}'")
+
+    return sample_chunks(chunks, sample_size=sample_size, stratify=stratify, seed=seed)
@@ -1,23 +1,90 @@
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.feature_extraction.text import HashingVectorizer
+import numpy as np
 import pandas as pd
 
 class HashingTransformer(BaseEstimator, TransformerMixin):
+    """
+    Hashes one string column into n_features token counts (HashingVectorizer).
+
+    Process names and paths repeat heavily, so each distinct string is hashed
+    once and its row cached; a batch is encoded by factorizing the column and
+    gathering the cached rows into a float32 matrix. Counts are small integers,
+    so float32 holds exactly the values the float64 HashingVectorizer output did.
+    """
+    CACHE_SIZE = 4096 # distinct strings kept per transformer
+    SMALL_BATCH = 64 # below this, factorize in Python instead of pandas
+
     def __init__(self, n_features=32):
         self.n_features = n_features
         self.vec = None
-        
+
     def fit(self, X, y=None):
         # Stateless
         self.vec = HashingVectorizer(n_features=self.n_features, alternate_sign=False, norm=None)
         return self
-        
-    def transform(self, X):
+
+    def __getstate__(self):
+        # The row cache is rebuilt on demand; keep pickles the same shape as before
+        state = super().__getstate__()
+        state.pop('_row_cache', None)
+        return state
+
+    def _rows_for(self, strings):
+        """Returns a (len(strings), n_features) float32 matrix, hashing only uncached strings."""
+        # Created lazily: models pickled before the cache existed have no such attribute
+        cache = getattr(self, '_row_cache', None)
+        if cache is None:
+            cache = self._row_cache = {}
         if self.vec is None:
             self.vec = HashingVectorizer(n_features=self.n_features, alternate_sign=False, norm=None)
-            
+
+        rows = np.empty((len(strings), self.n_features), dtype=np.float32)
+        missing = []
+        for i, s in enumerate(strings):
+            row = cache.get(s)
+            if row is None:
+                missing.append(i)
+            else:
+                rows[i] = row
+
+        if missing:
+            hashed = self.vec.transform([strings[i] for i in missing]).toarray()
+            rows[missing] = hashed
+            if len(cache) + len(missing) > self.CACHE_SIZE:
+                cache.clear()
+            for i in missing[:self.CACHE_SIZE]:
+                cache[strings[i]] = rows[i].copy()
+        return rows
+
+    def transform_into(self, values, out, offset=0):
+        """
+        Writes the hashed features of `values` (a sequence of strings) into
+        out[:, offset:offset + n_features]. Missing values hash as "Unknown".
+        """
+        if len(values) <= self.SMALL_BATCH:
+            # Per-connection inference: a dict is cheaper than building a Series
+            index = {}
+            codes = np.fromiter(
+                (index.setdefault("Unknown" if pd.isna(v) else str(v), len(index)) for v in values),
+                dtype=np.intp, count=len(values)
+            )
+            strings = list(index)
+        else:
+            codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+            strings = [str(u) for u in uniques]
+            if (codes < 0).any():
+                # Handle nan/non-string like fillna("Unknown")
+                codes = np.where(codes < 0, len(strings), codes)
+                strings.append("Unknown")
+        if strings:
+            out[:, offset:offset + self.n_features] = self._rows_for(strings)[codes]
+        return out
+
+    def transform(self, X):
         if isinstance(X, pd.DataFrame):
             X = X.iloc[:, 0]
-        # Handle nan/non-string
-        X = X.fillna("Unknown").astype(str)
-        return self.vec.transform(X).toarray()
+        elif isinstance(X, np.ndarray) and X.ndim == 2:
+            X = X[:, 0]
+        out = np.zeros((len(X), self.n_features), dtype=np.float32)
+        return self.transform_into(X, out)
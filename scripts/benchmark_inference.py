@@ -0,0 +1,116 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Path setup
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ml.inference_engine import InferenceEngine
+
+PROCESSES = ["chrome.exe", "firefox.exe", "svchost.exe (netsvcs)", "python.exe", "nc.exe", "Teams.exe"]
+
+def make_connections(n, seed=0):
+    rng = random.Random(seed)
+    conns = []
+    for _ in range(n):
+        name = rng.choice(PROCESSES)
+        conns.append({
+            "remote_port": rng.choice([53, 80, 443, 8080, rng.randint(1024, 65535)]),
+            "process_name": name,
+            "process_path": f"C:\\Program Files\\{name}",
+            "direction": rng.choice(["Outbound", "Inbound"]),
+        })
+    return conns
+
+def time_batches(engine, conns, repeat):
+    """Median and p95 milliseconds per predict_batch call."""
+    engine.predict_batch(conns) # warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        engine.predict_batch(conns)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+def run_benchmark(model_path, onnx_path=None, batch_sizes=(1, 10, 100, 1000), repeat=50):
+    if onnx_path is None or not os.path.exists(onnx_path):
+        # Export on the fly so the comparison always uses the current pickle
+        import joblib
+        from ml.export.onnx_export import export_onnx
+        onnx_path = os.path.join(tempfile.mkdtemp(), "benchmark.onnx")
+        export_onnx(joblib.load(model_path), onnx_path)
+
+    engines = {
+        # Score cache off: measure the backends themselves
+        "sklearn": InferenceEngine(model_path, backend="sklearn", cache_size=0),
+        "onnx": InferenceEngine(model_path, backend="onnx", onnx_path=onnx_path, cache_size=0),
+    }
+
+    print(f"{'batch':>6} {'backend':>8} {'median ms':>10} {'p95 ms':>8} {'us/conn':>8}")
+    for size in batch_sizes:
+        conns = make_connections(size)
+        for name, engine in engines.items():
+            median, p95 = time_batches(engine, conns, repeat)
+            print(f"{size:>6} {name:>8} {median:>10.3f} {p95:>8.3f} {median * 1000 / size:>8.1f}")
+
+def make_trace(polls, per_poll, distinct=300, seed=0):
+    """
+    Production-like replay: a few hundred (process, path, port, direction)
+    tuples with Zipf-distributed popularity, scored in per-poll batches.
+    """
+    rng = random.Random(seed)
+    universe = make_connections(distinct, seed=seed)
+    weights = [1 / (rank + 1) for rank in range(distinct)]
+    return [rng.choices(universe, weights, k=per_poll) for _ in range(polls)]
+
+def load_trace(path, per_poll):
+    """Replays an export_data.py CSV in timestamp order, per_poll rows per batch."""
+    import csv
+
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = [{
+            "remote_port": int(r["remote_port"] or 0),
+            "process_name": r["process_name"],
+            "process_path": r["process_path"],
+            "direction": r["direction"],
+        } for r in csv.DictReader(f)]
+    return [rows[i:i + per_poll] for i in range(0, len(rows), per_poll)]
+
+def run_cache_benchmark(model_path, trace):
+    """Replays the trace with and without the score cache."""
+    total = sum(len(batch) for batch in trace)
+    print(f"Replaying {len(trace)} polls, {total} connections")
+    print(f"{'cache':>8} {'total ms':>10} {'us/conn':>8} {'hit rate':>9}")
+    for label, cache_size in (("off", 0), ("on", 8192)):
+        engine = InferenceEngine(model_path, cache_size=cache_size)
+        start = time.perf_counter()
+        for batch in trace:
+            engine.predict_batch(batch)
+        elapsed = (time.perf_counter() - start) * 1000
+        stats = engine.cache_stats()
+        lookups = stats.get("hits", 0) + stats.get("misses", 0)
+        hit_rate = f"{stats['hits'] / lookups:.1%}" if lookups else "-"
+        print(f"{label:>8} {elapsed:>10.1f} {elapsed * 1000 / total:>8.1f} {hit_rate:>9}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark inference latency (sklearn vs onnxruntime, score cache).")
+    parser.add_argument("--model", default=os.path.join(os.path.dirname(__file__), '..', 'ml', 'models', 'portkodiak_model.pkl'))
+    parser.add_argument("--onnx", help="Exported graph (default: export the model to a temp file)")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--cache", action="store_true", help="Benchmark the score cache on a replayed trace instead")
+    parser.add_argument("--trace", help="CSV export to replay (default: synthetic Zipf trace)")
+    parser.add_argument("--polls", type=int, default=500)
+    parser.add_argument("--per-poll", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.cache:
+        trace = load_trace(args.trace, args.per_poll) if args.trace else make_trace(args.polls, args.per_poll)
+        run_cache_benchmark(args.model, trace)
+    else:
+        run_benchmark(args.model, args.onnx, args.batch_sizes, args.repeat)
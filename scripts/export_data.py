@@ -1,61 +1,246 @@
 import csv
+import json
 import sys
 import os
 import argparse
 from datetime import datetime
 
+from sqlalchemy import func, select, tuple_
+
 # Path setup
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app.common.database import SessionLocal
-from app.common.models import TrafficSample
+from app.common.database import get_read_engine
+from app.common.retention import sample_tables
+
+EXPORT_COLUMNS = [
+    "timestamp", "process_name", "process_path", "process_hash",
+    "parent_info", "remote_ip", "remote_port", "remote_hostname",
+    "protocol", "direction", "is_malicious"
+]
+
+DEFAULT_CHUNK_SIZE = 10000
+DEFAULT_ROW_GROUP_SIZE = 100000
+
+def iter_sample_chunks(conn, since=None, until=None, chunk_size=DEFAULT_CHUNK_SIZE, after_ids=None):
+    """
+    Yields lists of up to chunk_size sample rows (EXPORT_COLUMNS order), oldest first.
+
+    Each table (legacy traffic_samples, then the day partitions) is walked with
+    keyset pagination on (timestamp, id), so memory stays bounded by one chunk
+    and every query is an index range scan rather than a growing OFFSET.
+
+    Args:
+        since: Only rows strictly after this timestamp
+        until: Only rows strictly before this timestamp
+        after_ids: Incremental export: {table name: last exported id}. Only rows
+            above it are read, in id (= commit) order, and the dict is advanced
+            to each table's highest id as the table is finished.
+    """
+    incremental = after_ids is not None
+    tables = sample_tables(conn, since, until)
+    if incremental:
+        existing = sample_tables(conn)
+        walked = {t.name for t in tables}
+        for name in list(after_ids):
+            if name not in {t.name for t in existing}:
+                del after_ids[name] # dropped partition
+        for table in existing:
+            if table.name not in walked:
+                # Entirely before `since`: nothing in it to export
+                after_ids[table.name] = _max_id(conn, table)
+
+    chunk = []
+    for table in tables:
+        columns = [table.c[name] for name in EXPORT_COLUMNS]
+        if incremental:
+            top = _max_id(conn, table) # rows committed while exporting wait for the next run
+            last_id = after_ids.get(table.name, 0)
+            if last_id > top:
+                last_id = 0 # table was dropped and recreated: ids started over
+            order = [table.c.id]
+            last_key = (last_id,)
+        else:
+            order = [table.c.timestamp, table.c.id]
+            last_key = None
+        while True:
+            query = select(table.c.id, *columns)
+            if incremental:
+                query = query.where(table.c.id <= top)
+            if since is not None:
+                query = query.where(table.c.timestamp > since)
+            if until is not None:
+                query = query.where(table.c.timestamp < until)
+            if last_key is not None:
+                query = query.where(tuple_(*order) > last_key)
+            limit = chunk_size - len(chunk)
+            query = query.order_by(*order).limit(limit)
+
+            rows = conn.execute(query).all()
+            for row in rows:
+                chunk.append(tuple(row[1:]))
+            if rows:
+                last_key = tuple(rows[-1]._mapping[col] for col in order)
+
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+            if len(rows) < limit:
+                break
+        if incremental:
+            after_ids[table.name] = top
+    if chunk:
+        yield chunk
+
+def _max_id(conn, table):
+    return conn.execute(select(func.max(table.c.id))).scalar() or 0
+
+def write_csv(chunks, output_file):
+    """Writes chunks to CSV. Returns (row count, max timestamp)."""
+    count = 0
+    last_ts = None
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_COLUMNS)
+        for chunk in chunks:
+            writer.writerows(chunk)
+            count += len(chunk)
+            last_ts = chunk[-1][0]
+    return count, last_ts
+
+def write_parquet(chunks, output_file, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+    """Writes chunks to a Parquet file, one row group per chunk. Returns (row count, max timestamp)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("timestamp", pa.timestamp("us")),
+        ("process_name", pa.string()),
+        ("process_path", pa.string()),
+        ("process_hash", pa.string()),
+        ("parent_info", pa.string()),
+        ("remote_ip", pa.string()),
+        ("remote_port", pa.int32()),
+        ("remote_hostname", pa.string()),
+        ("protocol", pa.string()),
+        ("direction", pa.string()),
+        ("is_malicious", pa.bool_()),
+    ])
 
-def export_traffic_data(output_file=None):
-    """Exports TrafficSample table to CSV."""
+    count = 0
+    last_ts = None
+    with pq.ParquetWriter(output_file, schema, compression="snappy") as writer:
+        for chunk in chunks:
+            # Transpose rows to columns; the chunk is dropped once written
+            table = pa.Table.from_arrays(
+                [pa.array(col, type=field.type) for col, field in zip(zip(*chunk), schema)],
+                schema=schema
+            )
+            writer.write_table(table, row_group_size=row_group_size)
+            count += len(chunk)
+            last_ts = chunk[-1][0]
+    return count, last_ts
+
+def read_watermark(path):
+    """
+    Returns the last exported sample id per table stored in a watermark file
+    ({} if there is none).
+
+    Ids rather than timestamps: a sample is timestamped when it is queued but
+    may be committed minutes later (flush interval, retries), behind rows
+    that were already exported. A file from before ids were tracked holds an
+    ISO timestamp, which is returned as a datetime.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        value = f.read().strip()
+    if not value:
+        return {}
+    if value.startswith("{"):
+        return json.loads(value)
+    return datetime.fromisoformat(value)
+
+def write_watermark(path, last_ids):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(last_ids, f, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def export_traffic_data(output_file=None, fmt=None, since=None, until=None, watermark_file=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE, row_group_size=DEFAULT_ROW_GROUP_SIZE,
+                        db_engine=None):
+    """
+    Streams traffic samples to CSV or Parquet without loading them all in memory.
+
+    Args:
+        fmt: 'csv' or 'parquet'. Defaults from the output file extension.
+        since / until: Export only samples in this (exclusive) time range
+        watermark_file: Incremental export: only samples committed after the last
+            run (tracked per table by id, see read_watermark); advanced on success
+    Returns:
+        Number of exported rows
+    """
+    if not fmt:
+        fmt = "parquet" if output_file and output_file.endswith(".parquet") else "csv"
     if not output_file:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_file = f"traffic_export_{timestamp}.csv"
+        output_file = f"traffic_export_{timestamp}.{fmt}"
+
+    if watermark_file and until is not None:
+        raise ValueError("until cannot be combined with an incremental (watermark) export")
+
+    after_ids = None
+    if watermark_file:
+        after_ids = read_watermark(watermark_file)
+        if isinstance(after_ids, datetime):
+            # Old timestamp watermark: resume after it this once, then track ids
+            since = since or after_ids
+            after_ids = {}
 
     print(f"Exporting traffic data to {output_file}...")
-    
+
     try:
-        with SessionLocal() as db:
-            samples = db.query(TrafficSample).all()
-            
-            if not samples:
-                print("No samples found in database.")
-                return
-
-            # Open CSV
-            with open(output_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                
-                # Header
-                header = [
-                    "timestamp", "process_name", "process_path", "process_hash",
-                    "parent_info", "remote_ip", "remote_port", "remote_hostname",
-                    "protocol", "direction", "is_malicious"
-                ]
-                writer.writerow(header)
-                
-                # Rows
-                count = 0
-                for s in samples:
-                    writer.writerow([
-                        s.timestamp, s.process_name, s.process_path, s.process_hash,
-                        s.parent_info, s.remote_ip, s.remote_port, s.remote_hostname,
-                        s.protocol, s.direction, s.is_malicious
-                    ])
-                    count += 1
-            
-            print(f"Successfully exported {count} records to {output_file}")
-            
+        with (db_engine or get_read_engine()).connect() as conn:
+            if fmt == "parquet":
+                # One chunk per row group keeps the row groups evenly sized
+                chunks = iter_sample_chunks(conn, since, until, chunk_size=row_group_size, after_ids=after_ids)
+                count, _ = write_parquet(chunks, output_file, row_group_size)
+            else:
+                chunks = iter_sample_chunks(conn, since, until, chunk_size=chunk_size, after_ids=after_ids)
+                count, _ = write_csv(chunks, output_file)
+
+        if watermark_file:
+            write_watermark(watermark_file, after_ids)
+
+        if not count:
+            print("No samples found in database.")
+            return 0
+
+        print(f"Successfully exported {count} records to {output_file}")
+        return count
+
     except Exception as e:
         print(f"Export failed: {e}")
+        return 0
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Export traffic training data.")
-    parser.add_argument("-o", "--output", help="Output CSV file path")
+    parser.add_argument("-o", "--output", help="Output file path (.csv or .parquet)")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="Output format (default: from extension)")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Only samples after this ISO timestamp")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="Only samples before this ISO timestamp")
+    parser.add_argument("--watermark-file", help="Only export samples committed since the last run recorded in this file")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows fetched per query")
+    parser.add_argument("--row-group-size", type=int, default=DEFAULT_ROW_GROUP_SIZE, help="Rows per Parquet row group")
     args = parser.parse_args()
-    
-    export_traffic_data(args.output)
+
+    export_traffic_data(
+        args.output,
+        fmt=args.format,
+        since=args.since,
+        until=args.until,
+        watermark_file=args.watermark_file,
+        chunk_size=args.chunk_size,
+        row_group_size=args.row_group_size
+    )
@@ -0,0 +1,72 @@
+import argparse
+import os
+import sys
+import time
+
+# Path setup
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.connection_source import ProcNetSource, ReplaySource, record_trace
+from agent.hash_cache import FileHashCache
+from agent.pipeline import EnrichmentPipeline
+from agent.process_cache import ProcessInfoCache
+
+def build_pipeline(source, ml=True):
+    """Pipeline without the DB-backed stages (policy, alerts, collector) or live DNS."""
+    inference_engine = None
+    if ml:
+        from ml.inference_engine import InferenceEngine
+        inference_engine = InferenceEngine()
+    return EnrichmentPipeline(
+        source,
+        hash_cache=FileHashCache(),
+        inference_engine=inference_engine,
+        alerts=False,
+    )
+
+def run_profile(pipeline, polls, interval=0.0):
+    """Polls the pipeline and prints throughput and per-stage time."""
+    start = time.perf_counter()
+    for poll in range(polls):
+        if poll and interval:
+            time.sleep(interval)
+        pipeline.poll()
+        if isinstance(pipeline.source, ReplaySource) and pipeline.source.exhausted:
+            break
+    elapsed = time.perf_counter() - start
+
+    stats = pipeline.stats()
+    enriched = stats["enriched"]
+    print(f"Source {stats['source']}: {stats['polls']} polls, {enriched} connections enriched in {elapsed:.2f}s "
+          f"({enriched / elapsed if elapsed else 0:.0f} conn/s)")
+    print(f"{'stage':>10} {'total ms':>10} {'us/conn':>8}")
+    for stage, seconds in stats["stage_seconds"].items():
+        print(f"{stage:>10} {seconds * 1000:>10.1f} {seconds * 1e6 / max(enriched, 1):>8.1f}")
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive and profile the enrichment pipeline off-Windows.")
+    parser.add_argument("--source", choices=["replay", "procnet"], default="replay")
+    parser.add_argument("--trace", help="Trace to replay (JSON lines from --record, or an export_data.py CSV)")
+    parser.add_argument("--rate", type=float, help="Replay rate in connections/second (default: as fast as possible)")
+    parser.add_argument("--batch-size", type=int, default=100, help="Replayed connections per poll")
+    parser.add_argument("--loop", action="store_true", help="Restart the trace when it ends")
+    parser.add_argument("--polls", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=0.0, help="Seconds between polls")
+    parser.add_argument("--no-ml", action="store_true", help="Skip model scoring")
+    parser.add_argument("--record", help="Instead of profiling, append the source's connections to this trace")
+    args = parser.parse_args()
+
+    if args.source == "procnet":
+        source = ProcNetSource()
+    else:
+        if not args.trace:
+            parser.error("--trace is required for the replay source")
+        source = ReplaySource.from_file(args.trace, rate=args.rate, batch_size=args.batch_size, loop=args.loop)
+
+    if args.record:
+        count = record_trace(source, args.record, polls=args.polls, interval=args.interval or 1.0,
+                             process_cache=ProcessInfoCache())
+        print(f"Recorded {count} connections to {args.record}")
+    else:
+        run_profile(build_pipeline(source, ml=not args.no_ml), args.polls, args.interval)
@@ -0,0 +1,213 @@
+import argparse
+import csv
+import itertools
+import os
+import pickle
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import NamedTuple
+
+import joblib
+import numpy as np
+
+# Path setup
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ml.models.isolation_forest import build_pipeline
+from ml.preprocessing.loader import DEFAULT_CHUNK_SIZE, DEFAULT_SAMPLE_SIZE, load_training_data
+
+class SweepConfig(NamedTuple):
+    n_estimators: int
+    contamination: float
+    proc_features: int
+    path_features: int
+
+RESULT_COLUMNS = [
+    "n_estimators", "contamination", "proc_features", "path_features",
+    "fit_s", "us_per_row", "size_kb", "roc_auc", "avg_precision", "precision", "recall", "f1"
+]
+
+def make_grid(n_estimators=(50, 100, 200), contamination=(0.005, 0.01, 0.05), hash_widths=((16, 32),)):
+    """Every combination of the given values; hash_widths are (process_name, process_path) pairs."""
+    return [
+        SweepConfig(n, c, proc, path)
+        for n, c, (proc, path) in itertools.product(n_estimators, contamination, hash_widths)
+    ]
+
+def split_holdout(df, holdout=0.2, seed=42):
+    """Train/eval split, stratified on is_malicious when both classes are present."""
+    from sklearn.model_selection import train_test_split
+
+    labels = df["is_malicious"].astype(bool)
+    stratify = labels if labels.value_counts().min() >= 2 and labels.nunique() == 2 else None
+    train, test = train_test_split(df, test_size=holdout, random_state=seed, stratify=stratify)
+    return train.reset_index(drop=True), test.reset_index(drop=True)
+
+def _to_memmap(path, array):
+    mm = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=array.shape)
+    mm[:] = array
+    mm.flush()
+    del mm
+    return path
+
+def prepare_features(train, test, hash_widths, workdir):
+    """
+    Fits one preprocessor per hashing layout and writes the encoded train/eval
+    matrices as float32 .npy files. Workers open them with mmap_mode='r', so
+    every process fitting that layout shares the same page-cache copy
+    (IsolationForest fits on float32 and does not copy a C-contiguous float32 input).
+
+    Returns {(proc, path): (preprocessor, train_path, eval_path)}.
+    """
+    layouts = {}
+    for proc, path in sorted(set(hash_widths)):
+        preprocessor = build_pipeline(proc_features=proc, path_features=path).named_steps['preprocessor']
+        x_train = preprocessor.fit_transform(train)
+        x_eval = preprocessor.transform(test)
+        layouts[(proc, path)] = (
+            preprocessor,
+            _to_memmap(os.path.join(workdir, f"train_{proc}_{path}.npy"), x_train),
+            _to_memmap(os.path.join(workdir, f"eval_{proc}_{path}.npy"), x_eval),
+        )
+    return layouts
+
+def detection_quality(labels, scores, predicted):
+    """Ranking (ROC AUC, average precision) and thresholded metrics; None without both classes."""
+    from sklearn.metrics import average_precision_score, precision_recall_fscore_support, roc_auc_score
+
+    if len(set(labels)) < 2:
+        return {"roc_auc": None, "avg_precision": None, "precision": None, "recall": None, "f1": None}
+    # Lower decision_function = more anomalous
+    precision, recall, f1, _ = precision_recall_fscore_support(
+        labels, predicted, average='binary', zero_division=0
+    )
+    return {
+        "roc_auc": roc_auc_score(labels, -scores),
+        "avg_precision": average_precision_score(labels, -scores),
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+    }
+
+def evaluate_config(config, preprocessor, train_path, eval_path, eval_file, latency_rows=1000, seed=42):
+    """Pool worker: fits one configuration on the shared matrix and measures it."""
+    x_train = np.load(train_path, mmap_mode='r')
+    x_eval = np.load(eval_path, mmap_mode='r')
+    test, labels = joblib.load(eval_file)
+
+    # One core per worker: the pool provides the parallelism
+    pipeline = build_pipeline(config.n_estimators, config.contamination, n_jobs=1, random_state=seed)
+    pipeline.steps[0] = ('preprocessor', preprocessor)
+    clf = pipeline.named_steps['classifier']
+
+    start = time.perf_counter()
+    clf.fit(x_train)
+    fit_s = time.perf_counter() - start
+
+    # End-to-end latency, raw rows through the preprocessor as in InferenceEngine
+    sample = test.head(latency_rows)
+    pipeline.decision_function(sample) # warm-up
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        pipeline.decision_function(sample)
+        timings.append(time.perf_counter() - start)
+
+    scores = clf.decision_function(x_eval)
+    result = config._asdict()
+    result.update({
+        "fit_s": fit_s,
+        "us_per_row": min(timings) * 1e6 / max(len(sample), 1),
+        "size_kb": len(pickle.dumps(pipeline)) / 1024,
+    })
+    result.update(detection_quality(labels, scores, scores < 0))
+    return result
+
+def run_sweep(df, configs, workers=None, holdout=0.2, latency_rows=1000, seed=42):
+    """
+    Fits every config in a process pool and returns one result dict per config
+    (RESULT_COLUMNS), in config order.
+    """
+    train, test = split_holdout(df, holdout, seed)
+    labels = test["is_malicious"].astype(bool).to_numpy()
+
+    with tempfile.TemporaryDirectory(prefix="sweep_") as workdir:
+        layouts = prepare_features(train, test, [(c.proc_features, c.path_features) for c in configs], workdir)
+        eval_file = os.path.join(workdir, "eval.pkl")
+        joblib.dump((test, labels), eval_file)
+
+        # spawn: no forked BLAS/OpenMP thread state in the workers
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+            futures = [
+                pool.submit(
+                    evaluate_config, config, *layouts[(config.proc_features, config.path_features)],
+                    eval_file, latency_rows, seed
+                )
+                for config in configs
+            ]
+            return [future.result() for future in futures]
+
+def _fmt(value, spec):
+    return "-" if value is None else format(value, spec)
+
+def format_results(results):
+    """Side-by-side table, best average precision (then fastest fit) first."""
+    ordered = sorted(results, key=lambda r: (-(r["avg_precision"] or 0), r["fit_s"]))
+    lines = [
+        f"{'trees':>5} {'contam':>7} {'hash':>7} {'fit s':>7} {'us/row':>7} {'size KB':>8} "
+        f"{'ROC AUC':>8} {'AP':>6} {'prec':>6} {'recall':>6} {'F1':>6}"
+    ]
+    for r in ordered:
+        lines.append(
+            f"{r['n_estimators']:>5} {r['contamination']:>7.3f} {r['proc_features']:>3}/{r['path_features']:<3} "
+            f"{r['fit_s']:>7.2f} {r['us_per_row']:>7.1f} {r['size_kb']:>8.0f} "
+            f"{_fmt(r['roc_auc'], '>8.3f')} {_fmt(r['avg_precision'], '>6.3f')} {_fmt(r['precision'], '>6.3f')} "
+            f"{_fmt(r['recall'], '>6.3f')} {_fmt(r['f1'], '>6.3f')}"
+        )
+    return "\n".join(lines)
+
+def write_results(results, output_file):
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(results)
+
+def _hash_width(value):
+    proc, path = value.split(":")
+    return int(proc), int(path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep anomaly model hyperparameters against labelled samples.")
+    parser.add_argument("--source", choices=["db", "parquet", "csv"], default="db", help="Training data source")
+    parser.add_argument("--path", nargs="*", help="Parquet/CSV files, globs or directories")
+    parser.add_argument("--sample-size", type=int, default=DEFAULT_SAMPLE_SIZE, help="Rows loaded for the sweep")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows read per chunk")
+    parser.add_argument("--n-estimators", type=int, nargs="+", default=[50, 100, 200])
+    parser.add_argument("--contamination", type=float, nargs="+", default=[0.005, 0.01, 0.05])
+    parser.add_argument("--hash-widths", type=_hash_width, nargs="+", default=[(8, 16), (16, 32), (32, 64)],
+                        help="process_name:process_path hashed widths, e.g. 16:32")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction held out for scoring")
+    parser.add_argument("--latency-rows", type=int, default=1000, help="Held-out rows timed end to end")
+    parser.add_argument("--workers", type=int, help="Pool size (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", help="Also write the results to this CSV")
+    args = parser.parse_args()
+
+    # Stratified so the rare is_malicious rows survive the sampling
+    df = load_training_data(
+        args.source, paths=args.path, sample_size=args.sample_size, stratify="is_malicious",
+        chunk_size=args.chunk_size, seed=args.seed
+    )
+    if df["is_malicious"].astype(bool).nunique() < 2:
+        print("WARNING: no labelled malicious samples; detection quality will be blank.")
+
+    configs = make_grid(args.n_estimators, args.contamination, args.hash_widths)
+    print(f"Sweeping {len(configs)} configurations on {len(df)} samples...")
+    results = run_sweep(df, configs, args.workers, args.holdout, args.latency_rows, args.seed)
+    print(format_results(results))
+    if args.output:
+        write_results(results, args.output)
+        print(f"Results written to {args.output}")
@@ -1,83 +1,83 @@
-import pandas as pd
-import numpy as np
-import joblib
+import argparse
 import glob
 import os
 import sys
-from sklearn.ensemble import IsolationForest
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import StandardScaler, OneHotEncoder, FunctionTransformer
-from sklearn.feature_extraction.text import HashingVectorizer
+
+# Import from shared module to ensure pickle compatibility
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from ml.models.isolation_forest import build_pipeline
+from ml.model_registry import publish_model
+from ml.preprocessing.loader import (
+    DEFAULT_CHUNK_SIZE, DEFAULT_SAMPLE_SIZE, PhaseReport, load_training_data
+)
 
 # Ensure ml/models dir exists
 MODEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'ml', 'models')
 os.makedirs(MODEL_DIR, exist_ok=True)
 
-def load_latest_export():
+def find_latest_export():
     """Finds the latest traffic_export csv."""
     pattern = os.path.join(os.path.dirname(__file__), '..', 'traffic_export_*.csv')
     files = glob.glob(pattern)
     if not files:
         print("No traffic_export csv found!")
         return None
-    latest_file = max(files, key=os.path.getctime)
-    print(f"Loading data from {latest_file}...")
-    return pd.read_csv(latest_file)
+    return max(files, key=os.path.getctime)
 
-from sklearn.base import BaseEstimator, TransformerMixin
-# Import from shared module to ensure pickle compatibility
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from ml.transformers import HashingTransformer
+def train_model(source="db", paths=None, sample_size=DEFAULT_SAMPLE_SIZE, stratify=None,
+                chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Fits the anomaly pipeline on a bounded sample streamed from the DB,
+    Parquet or CSV exports, and prints time and memory per phase.
+    """
+    if source == "csv" and not paths:
+        paths = find_latest_export()
+        if paths is None:
+            return
+
+    report = PhaseReport()
+    with report.phase("load"):
+        print(f"Loading training sample from {source}{f' ({paths})' if paths else ''}...")
+        df = load_training_data(
+            source, paths=paths, sample_size=sample_size, stratify=stratify, chunk_size=chunk_size
+        )
 
-def train_model():
-    df = load_latest_export()
-    if df is None:
+    if len(df) == 0:
+        print("No samples found.")
         return
-    
+
     if len(df) < 5:
         print("WARNING: Not enough data points to train meaningfully (need > 5).")
         # Proceed anyway for POC but result will be junk
     
     print(f"Training on {len(df)} samples...")
 
-    # Preprocessor
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('port', StandardScaler(), ['remote_port']),
-            ('proc', HashingTransformer(n_features=16), ['process_name']),
-            ('path', HashingTransformer(n_features=32), ['process_path']),
-            # 'direction' is categorical strings 'Inbound'/'Outbound'
-            ('dir', OneHotEncoder(handle_unknown='ignore', sparse_output=False), ['direction']) 
-        ],
-        remainder='drop'
-    )
-
-    # Model
-    # contamination=0.01 implies we expect ~1% anomalies in training data
-    clf = IsolationForest(
-        n_estimators=100, 
-        contamination=0.01, 
-        random_state=42, 
-        n_jobs=-1
-    )
-
-    pipeline = Pipeline([
-        ('preprocessor', preprocessor),
-        ('classifier', clf)
-    ])
+    pipeline = build_pipeline()
 
     try:
-        pipeline.fit(df)
+        with report.phase("fit"):
+            pipeline.fit(df)
         print("Training successful.")
-        
-        # Save
-        model_path = os.path.join(MODEL_DIR, 'portkodiak_model.pkl')
-        joblib.dump(pipeline, model_path)
-        print(f"Model saved to: {model_path}")
-        
+
+        with report.phase("publish"):
+            # Versioned copy + atomic switch of the active pickle (and ONNX graph)
+            published = publish_model(pipeline, MODEL_DIR)
+        print(f"Model saved to: {published.model_path} (version {published.version})")
+        if not published.onnx_path:
+            print("ONNX export skipped (skl2onnx/onnx not installed)")
+
     except Exception as e:
         print(f"Training failed: {e}")
 
+    print(report.format())
+
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Train the local anomaly model.")
+    parser.add_argument("--source", choices=["db", "parquet", "csv"], default="db", help="Training data source")
+    parser.add_argument("--path", nargs="*", help="Parquet/CSV files, globs or directories (csv defaults to the latest export)")
+    parser.add_argument("--sample-size", type=int, default=DEFAULT_SAMPLE_SIZE, help="Rows kept for fitting")
+    parser.add_argument("--stratify", help="Column to stratify the sample on (e.g. is_malicious)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows read per chunk")
+    args = parser.parse_args()
+
+    train_model(args.source, args.path, args.sample_size, args.stratify, args.chunk_size)
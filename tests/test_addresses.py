@@ -0,0 +1,69 @@
+import sys
+import os
+import socket
+
+import pytest
+
+# Setup path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.addresses import (
+    UNSPECIFIED, format_address, from_v4, from_v4_bytes, from_v6_bytes, is_v4, parse_address
+)
+from agent.wfp_enum import connection_info
+from agent.wfp_types import FWP_IP_VERSION_V4, FWP_IP_VERSION_V6, FWPM_CONNECTION0, UINT8
+
+def v6_array(text):
+    return (UINT8 * 16)(*socket.inet_pton(socket.AF_INET6, text))
+
+def v4_connection(local, remote):
+    conn = FWPM_CONNECTION0()
+    conn.ipVersion = FWP_IP_VERSION_V4
+    # Host byte order, as WFP fills the union
+    conn.localV4Address = int.from_bytes(socket.inet_aton(local), "big")
+    conn.remoteV4Address = int.from_bytes(socket.inet_aton(remote), "big")
+    return conn
+
+def v6_connection(local, remote):
+    conn = FWPM_CONNECTION0()
+    conn.ipVersion = FWP_IP_VERSION_V6
+    conn.localV6Address = v6_array(local)
+    conn.remoteV6Address = v6_array(remote)
+    return conn
+
+@pytest.mark.parametrize("text", ["10.0.0.1", "255.255.255.255", "0.0.0.0", "2001:db8::1", "fe80::1", "::1", "::"])
+def test_round_trip(text):
+    assert format_address(parse_address(text)) == text
+
+def test_families():
+    assert is_v4(parse_address("192.168.1.10"))
+    assert not is_v4(parse_address("2001:db8::1"))
+    # IPv4-mapped IPv6 is the same key as the plain IPv4 address
+    assert parse_address("::ffff:192.168.1.10") == parse_address("192.168.1.10")
+    assert from_v4(0x0A000001) == from_v4_bytes(b"\x0a\x00\x00\x01") == parse_address("10.0.0.1")
+
+def test_unparseable_is_unspecified():
+    assert parse_address("IPv6") == UNSPECIFIED
+    assert parse_address("") == UNSPECIFIED
+
+def test_keys_are_ints():
+    key = parse_address("2001:db8::1")
+    assert type(key) is int
+    assert key == from_v6_bytes(socket.inet_pton(socket.AF_INET6, "2001:db8::1"))
+
+def test_v4_struct_decoding():
+    info = connection_info(v4_connection("10.0.2.15", "93.184.216.34"))
+    assert format_address(info["local_addr"]) == "10.0.2.15"
+    assert format_address(info["remote_addr"]) == "93.184.216.34"
+
+def test_v6_struct_decoding():
+    info = connection_info(v6_connection("fe80::1", "2606:4700::6810:84e5"))
+    assert format_address(info["local_addr"]) == "fe80::1"
+    assert format_address(info["remote_addr"]) == "2606:4700::6810:84e5"
+
+def test_distinct_v6_peers_stay_distinct():
+    # Previously every IPv6 peer became the string "IPv6"
+    a = connection_info(v6_connection("::1", "2001:db8::1"))
+    b = connection_info(v6_connection("::1", "2001:db8::2"))
+    assert a["remote_addr"] != b["remote_addr"]
+    assert len({(a["remote_addr"], 443), (b["remote_addr"], 443)}) == 2
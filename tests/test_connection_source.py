@@ -0,0 +1,161 @@
+import sys
+import os
+import json
+import socket
+
+import pytest
+
+# Setup path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.addresses import format_address, parse_address
+from agent.connection_source import (
+    ProcNetSource, ReplaySource, decode_proc_address, load_trace, record_trace
+)
+
+TCP_HEADER = "  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode\n"
+
+def tcp_line(sl, local, remote, state, inode):
+    return f"   {sl}: {local} {remote} {state} 00000000:00000000 00:00000000 00000000  1000        0 {inode} 1 0000000000000000 20 4 30 10 -1\n"
+
+@pytest.fixture
+def proc_root(tmp_path):
+    (tmp_path / "net").mkdir()
+    (tmp_path / "net" / "tcp").write_text(TCP_HEADER + "".join([
+        tcp_line(0, "0100007F:1F90", "00000000:0000", "0A", 100), # 127.0.0.1:8080 LISTEN
+        tcp_line(1, "0100007F:1F90", "0100007F:D431", "01", 101), # inbound to 8080
+        tcp_line(2, "0F02000A:C350", "08080808:0035", "01", 102), # 10.0.2.15:50000 -> 8.8.8.8:53
+        tcp_line(3, "0F02000A:C351", "08080808:01BB", "06", 0), # TIME_WAIT, no socket
+    ]))
+    (tmp_path / "net" / "tcp6").write_text(TCP_HEADER + tcp_line(
+        0, "00000000000000000000000001000000:C352", "B80D0120000000000000000001000000:01BB", "01", 103
+    ))
+    # PID 42 owns two of the sockets, the third is not ours to inspect
+    fd_dir = tmp_path / "42" / "fd"
+    fd_dir.mkdir(parents=True)
+    os.symlink("socket:[101]", fd_dir / "3")
+    os.symlink("socket:[102]", fd_dir / "4")
+    os.symlink("/dev/null", fd_dir / "0")
+    return tmp_path
+
+def test_decode_proc_address():
+    assert decode_proc_address("0100007F:0050") == (parse_address("127.0.0.1"), 80)
+    assert decode_proc_address("B80D0120000000000000000001000000:01BB") == (parse_address("2001:db8::1"), 443)
+    # An IPv4-mapped tcp6 socket gets the same key as the IPv4 address
+    assert decode_proc_address("0000000000000000FFFF00000100007F:0016") == (parse_address("127.0.0.1"), 22)
+
+def test_proc_net_source(proc_root):
+    source = ProcNetSource(proc_root=str(proc_root))
+    conns = {c["id"]: c for c in source.iter_connections()}
+
+    assert set(conns) == {101, 102, 103}
+    assert conns[101]["direction"] == "Inbound"
+    assert conns[101]["process_id"] == 42
+    assert conns[102] == {
+        "id": 102, "process_id": 42, "local_addr": parse_address("10.0.2.15"), "local_port": 50000,
+        "remote_addr": parse_address("8.8.8.8"), "remote_port": 53, "direction": "Outbound",
+    }
+    assert format_address(conns[103]["remote_addr"]) == "2001:db8::1"
+    assert conns[103]["process_id"] == 0
+
+def test_proc_net_source_only_rescans_new_sockets(proc_root, monkeypatch):
+    source = ProcNetSource(proc_root=str(proc_root))
+    list(source.iter_connections())
+
+    scans = []
+    original = source._scan_owners
+    monkeypatch.setattr(source, "_scan_owners", lambda wanted: scans.append(set(wanted)) or original(wanted))
+    list(source.iter_connections())
+    # Only the unowned socket is looked up again
+    assert scans == [{103}]
+
+@pytest.mark.skipif(not os.path.exists("/proc/net/tcp"), reason="Linux only")
+def test_proc_net_source_sees_own_connection():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    client = socket.create_connection(server.getsockname())
+    accepted, _ = server.accept()
+    try:
+        port = client.getsockname()[1]
+        conns = [c for c in ProcNetSource().iter_connections() if c["local_port"] == port]
+        assert conns and conns[0]["process_id"] == os.getpid()
+        assert conns[0]["direction"] == "Outbound"
+    finally:
+        for s in (accepted, client, server):
+            s.close()
+
+RECORDS = [
+    {"process_id": 7, "remote_ip": "1.1.1.1", "remote_port": 443, "process_name": "chrome.exe",
+     "process_path": "C:\\chrome.exe"},
+    {"process_id": 8, "remote_ip": "8.8.8.8", "remote_port": 53},
+    {"process_id": 9, "remote_ip": "10.0.0.5", "remote_port": 4444, "direction": "Inbound"},
+]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def test_replay_batches_and_unique_ids():
+    source = ReplaySource(RECORDS, batch_size=2, loop=True)
+
+    first = list(source.iter_connections())
+    second = list(source.iter_connections())
+
+    assert [r["remote_port"] for r in first + second] == [443, 53, 4444, 443]
+    assert [r["id"] for r in first + second] == [0, 1, 2, 3]
+    assert first[0]["process_path"] == "C:\\chrome.exe"
+    assert "process_path" not in first[1]
+    assert second[0]["direction"] == "Inbound"
+
+def test_replay_without_loop_is_exhausted():
+    source = ReplaySource(RECORDS)
+    assert len(list(source.iter_connections())) == 3
+    assert source.exhausted
+    assert list(source.iter_connections()) == []
+
+def test_replay_rate_is_paced_across_polls():
+    clock = FakeClock()
+    source = ReplaySource(RECORDS, rate=10, batch_size=2, loop=True, clock=clock, sleep=clock.sleep)
+
+    list(source.iter_connections())
+    clock.now += 0.5 # pipeline work between polls counts against the schedule
+    list(source.iter_connections())
+    list(source.iter_connections())
+
+    # Six records at 10/s: the last is due at t=0.5, which had already passed
+    assert clock.sleeps == pytest.approx([0.1])
+    assert clock.now == pytest.approx(0.6)
+
+def test_trace_round_trip(tmp_path):
+    trace = tmp_path / "trace.jsonl"
+    count = record_trace(ReplaySource(RECORDS), str(trace), polls=1)
+
+    assert count == 3
+    records = load_trace(str(trace))
+    assert [r["remote_port"] for r in records] == [443, 53, 4444]
+    assert records[0]["remote_addr"] == parse_address("1.1.1.1")
+    # Addresses are text in the file
+    first = json.loads(trace.read_text().splitlines()[0])
+    assert first["process_name"] == "chrome.exe"
+    assert first["remote_ip"] == "1.1.1.1"
+
+def test_load_export_csv(tmp_path):
+    path = tmp_path / "traffic_export.csv"
+    path.write_text(
+        "timestamp,process_name,process_path,remote_ip,remote_port,direction\n"
+        "2024-03-10 00:00:00,nc.exe,C:\\Temp\\nc.exe,10.0.0.5,4444,Inbound\n"
+    )
+    [record] = load_trace(str(path))
+    assert record["process_path"] == "C:\\Temp\\nc.exe"
+    assert record["remote_port"] == 4444
+    assert record["remote_addr"] == parse_address("10.0.0.5")
+    assert record["id"] == 0
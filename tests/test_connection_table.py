@@ -0,0 +1,57 @@
+import sys
+import os
+
+# Setup path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.connection_table import ConnectionTable
+
+def make_info(conn_id, pid=100):
+    return {"id": conn_id, "process_id": pid, "remote_port": 443}
+
+def test_first_poll_adds_everything():
+    table = ConnectionTable()
+    delta = table.apply([], [make_info(1), make_info(2)])
+
+    assert [c["id"] for c in delta.added] == [1, 2]
+    assert delta.removed == []
+    assert len(delta.active) == 2
+    assert len(table) == 2
+
+def test_known_connections_are_reused():
+    table = ConnectionTable()
+    first = make_info(1)
+    table.apply([], [first])
+
+    # Same id and owner -> cached info is returned, no re-enrichment needed
+    assert table.lookup(1, 100) is first
+    assert table.lookup(2, 100) is None
+
+    delta = table.apply([1], [])
+    assert delta.added == []
+    assert delta.removed == []
+    assert delta.active == [first]
+
+def test_closed_connections_are_removed():
+    table = ConnectionTable()
+    table.apply([], [make_info(1), make_info(2)])
+
+    delta = table.apply([2], [make_info(3)])
+
+    assert [c["id"] for c in delta.added] == [3]
+    assert [c["id"] for c in delta.removed] == [1]
+    assert sorted(c["id"] for c in delta.active) == [2, 3]
+    assert table.lookup(1) is None
+
+def test_reused_id_with_new_owner_is_new():
+    table = ConnectionTable()
+    old = make_info(7, pid=100)
+    table.apply([], [old])
+
+    assert table.lookup(7, 200) is None
+
+    new = make_info(7, pid=200)
+    delta = table.apply([], [new])
+    assert delta.added == [new]
+    assert delta.removed == [old]
+    assert delta.active == [new]
@@ -0,0 +1,122 @@
+import sys
+import os
+import threading
+from unittest.mock import MagicMock
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Setup path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.common.models import Base, TrafficSample
+from agent.data_collector import DataCollector
+
+def make_session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def sample(i):
+    return {
+        "process_name": f"proc_{i}.exe",
+        "process_path": f"C:\\Apps\\proc_{i}.exe",
+        "remote_ip": f"10.0.0.{i}",
+        "remote_port": 443,
+        "direction": "Outbound",
+        "ml_score": 0.1, # extra keys are ignored
+    }
+
+def test_bulk_insert_and_counters():
+    Session = make_session_factory()
+    collector = DataCollector(flush_interval=60, batch_size=1000, session_factory=Session)
+
+    for i in range(10):
+        collector.add_sample(sample(i))
+    collector.flush()
+
+    with Session() as db:
+        rows = db.query(TrafficSample).order_by(TrafficSample.id).all()
+        assert len(rows) == 10
+        assert rows[0].process_name == "proc_0.exe"
+        assert rows[0].protocol == "TCP"
+        assert rows[0].process_hash is None
+
+    stats = collector.get_stats()
+    assert stats["rows_written"] == 10
+    assert stats["batches"] == 1
+    assert stats["queued"] == 0
+    assert stats["last_flush_ms"] > 0
+    collector.shutdown()
+
+def test_failed_batch_is_requeued_then_written():
+    Session = make_session_factory()
+    broken = MagicMock(side_effect=RuntimeError("database is locked"))
+    collector = DataCollector(flush_interval=60, batch_size=1000, session_factory=broken)
+
+    for i in range(3):
+        collector.add_sample(sample(i))
+    collector.flush()
+
+    stats = collector.get_stats()
+    assert stats["failed_batches"] == 1
+    assert stats["queued"] == 3 # back on the queue, not lost
+
+    collector.session_factory = Session
+    collector.flush()
+    with Session() as db:
+        assert db.query(TrafficSample).count() == 3
+    assert collector.get_stats()["rows_written"] == 3
+    collector.shutdown()
+
+def test_retries_are_bounded():
+    broken = MagicMock(side_effect=RuntimeError("disk I/O error"))
+    collector = DataCollector(flush_interval=60, batch_size=1000, max_retries=2, session_factory=broken)
+
+    collector.add_sample(sample(0))
+    for _ in range(3):
+        collector.flush()
+
+    stats = collector.get_stats()
+    assert stats["failed_batches"] == 3
+    assert stats["dropped"] == 1
+    assert stats["queued"] == 0
+    collector.running = False
+
+def test_add_sample_never_flushes_on_caller_thread():
+    flushed_on = []
+    Session = make_session_factory()
+
+    class RecordingCollector(DataCollector):
+        def flush(self):
+            flushed_on.append(threading.current_thread().name)
+            super().flush()
+
+    collector = RecordingCollector(flush_interval=60, batch_size=2, session_factory=Session)
+    collector.add_sample(sample(0))
+    collector.add_sample(sample(1)) # batch full -> wakes the writer thread
+
+    collector.thread.join(timeout=0.5) # give the writer a moment to wake
+    assert flushed_on[0] == "sample-writer"
+
+    collector.shutdown()
+    with Session() as db:
+        assert db.query(TrafficSample).count() == 2
+
+def test_overflow_drops_are_reported():
+    Session = make_session_factory()
+    collector = DataCollector(flush_interval=60, batch_size=1000, max_queue=5,
+                              overflow="drop-newest", session_factory=Session)
+    for i in range(8):
+        collector.add_sample(sample(i))
+
+    stats = collector.get_stats()
+    assert stats["queued"] == 5
+    assert stats["overflow_dropped"] == 3
+    assert stats["overflow_policy"] == "drop-newest"
+    collector.shutdown()
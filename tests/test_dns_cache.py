@@ -0,0 +1,98 @@
+import sys
+import os
+import socket
+import threading
+import time
+from unittest.mock import patch
+
+# Setup path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.dns_resolver import DnsResolver
+
+def wait_idle(resolver, timeout=2.0):
+    deadline = time.time() + timeout
+    while resolver.pending_count and time.time() < deadline:
+        time.sleep(0.01)
+
+def test_cache_miss_does_not_block():
+    release = threading.Event()
+
+    def slow_lookup(ip):
+        release.wait(2)
+        return ("slow.example.com", [], [ip])
+
+    resolver = DnsResolver()
+    with patch("socket.gethostbyaddr", side_effect=slow_lookup), \
+         patch.object(DnsResolver, "_log_resolution"):
+        start = time.time()
+        assert resolver.resolve_ip("10.1.2.3") == "10.1.2.3"
+        assert time.time() - start < 0.05
+
+        release.set()
+        wait_idle(resolver)
+        assert resolver.resolve_ip("10.1.2.3") == "slow.example.com"
+    resolver.shutdown()
+
+def test_in_flight_lookups_are_deduplicated():
+    release = threading.Event()
+    calls = []
+
+    def slow_lookup(ip):
+        calls.append(ip)
+        release.wait(2)
+        return ("dedup.example.com", [], [ip])
+
+    resolver = DnsResolver(max_workers=4)
+    with patch("socket.gethostbyaddr", side_effect=slow_lookup), \
+         patch.object(DnsResolver, "_log_resolution"):
+        for _ in range(20):
+            resolver.resolve_ip("10.9.9.9")
+        assert resolver.pending_count == 1
+
+        release.set()
+        wait_idle(resolver)
+    assert calls == ["10.9.9.9"]
+    resolver.shutdown()
+
+def test_failed_lookups_use_negative_ttl():
+    resolver = DnsResolver(cache_ttl=60, negative_ttl=0.05)
+    with patch("socket.gethostbyaddr", side_effect=socket.herror) as lookup, \
+         patch.object(DnsResolver, "_log_resolution"):
+        resolver.resolve_ip("192.0.2.1")
+        wait_idle(resolver)
+
+        # Negative result is served from cache without another lookup...
+        assert resolver.resolve_ip("192.0.2.1") == "192.0.2.1"
+        assert lookup.call_count == 1
+
+        # ...until the negative TTL expires
+        time.sleep(0.1)
+        resolver.resolve_ip("192.0.2.1")
+        wait_idle(resolver)
+        assert lookup.call_count == 2
+    resolver.shutdown()
+
+def test_cache_is_bounded():
+    resolver = DnsResolver(cache_size=2)
+    with patch("socket.gethostbyaddr", side_effect=lambda ip: (f"h-{ip}", [], [ip])), \
+         patch.object(DnsResolver, "_log_resolution"):
+        for ip in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+            resolver.resolve_ip(ip)
+            wait_idle(resolver)
+    assert resolver.stats()["size"] == 2
+    resolver.shutdown()
+
+def test_local_addresses_are_not_looked_up():
+    resolver = DnsResolver()
+    with patch("socket.gethostbyaddr", side_effect=lambda ip: (f"h-{ip}", [], [ip])) as lookup, \
+         patch.object(DnsResolver, "_log_resolution"):
+        for ip in ("0.0.0.0", "0.1.2.3", "127.0.0.1", "169.254.10.1",
+                   "::", "::1", "fe80::1c2a:3bff:fe4d:5e6f", "fe80::1%12", "::ffff:127.0.0.1", "not-an-ip"):
+            assert resolver.resolve_ip(ip) == ip
+        assert resolver.pending_count == 0
+
+        resolver.resolve_ip("2606:4700:4700::1111")
+        wait_idle(resolver)
+    assert [call.args[0] for call in lookup.call_args_list] == ["2606:4700:4700::1111"]
+    resolver.shutdown()
@@ -0,0 +1,114 @@
+import sys
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Setup path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.common.models import Base, DnsLog
+from agent.dns_resolver import DnsLogWriter
+
+def make_session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def test_batched_insert():
+    Session = make_session_factory()
+    writer = DnsLogWriter(flush_interval=60, session_factory=Session)
+
+    for i in range(5):
+        writer.log(f"10.0.0.{i}", f"host{i}.example.com")
+
+    with Session() as db:
+        assert db.query(DnsLog).count() == 0 # buffered, not one commit per lookup
+
+    writer.flush()
+    with Session() as db:
+        rows = db.query(DnsLog).order_by(DnsLog.id).all()
+        assert [r.ip_address for r in rows] == [f"10.0.0.{i}" for i in range(5)]
+        assert all(r.timestamp is not None for r in rows)
+    writer.shutdown()
+
+def test_unchanged_pairs_are_deduplicated():
+    Session = make_session_factory()
+    writer = DnsLogWriter(flush_interval=60, session_factory=Session)
+
+    writer.log("192.0.2.1", "192.0.2.1") # failed lookup
+    writer.log("192.0.2.1", "192.0.2.1") # negative TTL expired, failed again
+    writer.log("8.8.8.8", "dns.google")
+    writer.log("8.8.8.8", "dns.google.alias") # hostname changed -> logged
+    writer.shutdown()
+
+    with Session() as db:
+        pairs = [(r.ip_address, r.hostname) for r in db.query(DnsLog).order_by(DnsLog.id)]
+    assert pairs == [
+        ("192.0.2.1", "192.0.2.1"),
+        ("8.8.8.8", "dns.google"),
+        ("8.8.8.8", "dns.google.alias"),
+    ]
+
+def test_full_batch_wakes_writer_thread():
+    Session = make_session_factory()
+    writer = DnsLogWriter(flush_interval=60, batch_size=3, session_factory=Session)
+
+    for i in range(3):
+        writer.log(f"10.1.0.{i}", f"h{i}")
+
+    writer.thread.join(timeout=0.5) # writer stays alive, just give it time to flush
+    with Session() as db:
+        assert db.query(DnsLog).count() == 3
+    writer.shutdown()
+
+def test_failed_flush_is_retried_and_not_deduplicated():
+    Session = make_session_factory()
+    fail = {"calls": 2}
+
+    def flaky():
+        if fail["calls"]:
+            fail["calls"] -= 1
+            raise RuntimeError("database is locked")
+        return Session()
+
+    writer = DnsLogWriter(flush_interval=60, session_factory=flaky, max_retries=2)
+    writer.log("8.8.8.8", "dns.google")
+    writer.flush()
+    writer.flush()
+    # Not committed yet, but still queued: logging it again adds no duplicate
+    writer.log("8.8.8.8", "dns.google")
+    assert len(writer.queue) == 1
+
+    writer.flush()
+    with Session() as db:
+        assert [(r.ip_address, r.hostname) for r in db.query(DnsLog)] == [("8.8.8.8", "dns.google")]
+    writer.log("8.8.8.8", "dns.google") # now deduplicated
+    assert writer.queue == []
+    writer.shutdown()
+
+def test_dropped_batch_is_logged_again():
+    Session = make_session_factory()
+    fail = {"on": True}
+
+    def broken():
+        if fail["on"]:
+            raise RuntimeError("disk full")
+        return Session()
+
+    writer = DnsLogWriter(flush_interval=60, session_factory=broken, max_retries=0)
+    writer.log("192.0.2.1", "host.example")
+    writer.flush() # dropped after max_retries
+    assert writer.queue == []
+
+    fail["on"] = False
+    writer.log("192.0.2.1", "host.example")
+    writer.flush()
+    with Session() as db:
+        assert db.query(DnsLog).count() == 1
+    writer.shutdown()
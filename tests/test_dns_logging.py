@@ -25,8 +25,9 @@ def test_dns_logging():
     hostname = resolver.resolve_ip(ip)
     print(f"Resolved: {hostname}")
     
-    # Give time for background thread log
+    # Give time for background resolution, then push the batched log to DB
     time.sleep(1) 
+    resolver.log_writer.flush()
     
     # 4. Check DB
     try:
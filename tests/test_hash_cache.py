@@ -0,0 +1,56 @@
+import sys
+import os
+import hashlib
+from unittest.mock import patch
+
+# Setup path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.hash_cache import FileHashCache, UNVERIFIED_HASH
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+def test_hash_matches_sha256(tmp_path):
+    exe = tmp_path / "app.exe"
+    data = os.urandom(3 * 1024 * 1024 + 17) # spans several read blocks
+    write(exe, data)
+
+    assert FileHashCache.hash_file(str(exe)) == hashlib.sha256(data).hexdigest()
+
+def test_unchanged_file_is_not_rehashed(tmp_path):
+    exe = tmp_path / "app.exe"
+    write(exe, b"v1")
+    cache = FileHashCache()
+
+    first = cache.get_hash(str(exe))
+    with patch.object(FileHashCache, "hash_file", side_effect=AssertionError("rehashed")):
+        assert cache.get_hash(str(exe)) == first
+
+def test_changed_file_is_rehashed(tmp_path):
+    exe = tmp_path / "app.exe"
+    write(exe, b"v1")
+    cache = FileHashCache()
+    cache.get_hash(str(exe))
+
+    write(exe, b"version 2")
+    assert cache.get_hash(str(exe)) == hashlib.sha256(b"version 2").hexdigest()
+
+def test_missing_and_unknown(tmp_path):
+    cache = FileHashCache()
+    assert cache.get_hash("Unknown") is None
+    assert cache.get_hash(str(tmp_path / "gone.exe")) == UNVERIFIED_HASH
+
+def test_persistence_across_restarts(tmp_path):
+    exe = tmp_path / "app.exe"
+    store = tmp_path / "hash_cache.json"
+    write(exe, b"payload")
+
+    cache = FileHashCache(store_path=str(store))
+    digest = cache.get_hash(str(exe))
+    cache.save()
+
+    restarted = FileHashCache(store_path=str(store))
+    with patch.object(FileHashCache, "hash_file", side_effect=AssertionError("rehashed")):
+        assert restarted.get_hash(str(exe)) == digest
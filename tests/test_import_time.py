@@ -0,0 +1,95 @@
+import sys
+import os
+import importlib.util
+import subprocess
+
+import pytest
+
+# Setup path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+# Cold-import budget per entry point (cumulative, as reported by -X importtime)
+BUDGET_MS = 1500
+
+# Must not be imported until a model is loaded / data is encrypted
+HEAVY_MODULES = ("pandas", "sklearn", "joblib", "onnxruntime", "cryptography")
+
+def _available(*modules):
+    return all(importlib.util.find_spec(m) is not None for m in modules)
+
+# Run before the measured import: off Windows / without pywin32, fwpuclnt.dll and
+# the win32 modules are stubbed so the entry points still import everywhere
+WINDOWS_STUBS = """
+import ctypes, importlib.util, sys, types
+
+class _Stub:
+    # Any attribute is another stub: DLL functions, win32 constants and calls
+    def __getattr__(self, name):
+        value = _Stub()
+        setattr(self, name, value)
+        return value
+
+    def __call__(self, *args, **kwargs):
+        return _Stub()
+
+if not hasattr(ctypes, "windll"):
+    ctypes.windll = _Stub()
+for name in ("win32serviceutil", "win32service", "win32event", "servicemanager"):
+    if importlib.util.find_spec(name) is None:
+        module = types.ModuleType(name)
+        module.__getattr__ = lambda attr: _Stub()
+        module.ServiceFramework = object
+        sys.modules[name] = module
+"""
+
+ENTRY_POINTS = [
+    "agent.wfp_wrapper",
+    "app.service.main",
+    pytest.param("app.ui.app", marks=pytest.mark.skipif(not _available("PyQt6"), reason="PyQt6 not installed")),
+    # Shared by the entry points above, importable everywhere
+    "app.common.database",
+    "app.common.crypto",
+    "app.core.action_manager",
+    "agent.data_collector",
+    "agent.dns_resolver",
+    "agent.policy_engine",
+]
+
+def import_profile(module, env=None):
+    """Runs `import module` in a fresh interpreter; returns {top-level package: cumulative us}."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"{WINDOWS_STUBS}\nimport {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    profile = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        profile[name] = max(profile.get(name, 0), int(cumulative))
+    return profile
+
+@pytest.mark.parametrize("module", ENTRY_POINTS)
+def test_entry_point_import_is_lean(module):
+    profile = import_profile(module)
+
+    heavy = [name for name in HEAVY_MODULES if name in profile]
+    assert not heavy, f"{module} imports {heavy} at load time"
+    assert profile[module] / 1000 < BUDGET_MS
+
+def test_database_and_crypto_do_not_touch_disk_on_import(tmp_path):
+    env = dict(os.environ, DB_PATH=str(tmp_path / "data" / "test.db"), LOG_DIR=str(tmp_path / "logs"))
+    code = (
+        "import os, sys; import app.common.database as db, app.common.crypto as crypto; "
+        "print(os.path.exists(sys.argv[1])); "
+        "db.get_engine(); print(os.path.exists(sys.argv[1])); "
+        "print(crypto.decrypt_data(crypto.encrypt_data('x')))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code, str(tmp_path / "data")],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    assert out.stdout.split() == ["False", "True", "x"]
+    assert (tmp_path / "secret.key").exists()
@@ -0,0 +1,150 @@
+import sys
+import os
+import subprocess
+import threading
+import types
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+
+# Setup path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from app.common.models import Base
+from app.common.retention import SamplePartitions
+import ml.incremental_trainer as incremental_trainer
+from ml.incremental_trainer import IncrementalTrainer, TrainerProcess, python_executable, run_trainer
+from ml.inference_engine import InferenceEngine
+from ml.model_registry import MODEL_NAME, list_versions, publish_model
+
+NOW = datetime(2024, 3, 10, 12, 0)
+
+def rows(start, count, step=timedelta(minutes=1)):
+    rng = np.random.default_rng(0)
+    return [{
+        "timestamp": start + i * step,
+        "process_name": str(rng.choice(["chrome.exe", "svchost.exe", "Teams.exe"])),
+        "process_path": "C:\\Apps\\app.exe",
+        "remote_ip": "10.0.0.1",
+        "remote_port": int(rng.choice([53, 443, 8080])),
+        "direction": "Outbound",
+        "protocol": "TCP",
+    } for i in range(count)]
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'train.db'}")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+def insert(engine, data):
+    with engine.begin() as conn:
+        SamplePartitions().insert_rows(conn, data)
+
+def test_train_once_publishes_loadable_model(engine, tmp_path):
+    model_dir = str(tmp_path / "models")
+    insert(engine, rows(NOW - timedelta(hours=10), 300))
+    trainer = IncrementalTrainer(model_dir, window=timedelta(days=1), min_samples=100,
+                                 db_engine=engine, export_onnx=False)
+
+    published = trainer.train_once(NOW)
+
+    assert published is not None
+    assert published.onnx_path is None
+    assert list_versions(model_dir) == [published.version]
+    inference = InferenceEngine(published.model_path, backend="sklearn", cache_size=0)
+    score, label = inference.predict({"remote_port": 443, "process_name": "chrome.exe"})
+    assert label in ("Normal", "Anomaly")
+
+def test_only_the_window_is_used(engine, tmp_path):
+    model_dir = str(tmp_path / "models")
+    insert(engine, rows(NOW - timedelta(days=30), 500)) # outside the window
+    insert(engine, rows(NOW - timedelta(hours=1), 50))
+    trainer = IncrementalTrainer(model_dir, window=timedelta(days=1), min_samples=100,
+                                 db_engine=engine, export_onnx=False)
+
+    assert trainer.train_once(NOW) is None
+    assert not os.path.exists(os.path.join(model_dir, f"{MODEL_NAME}.pkl"))
+
+def test_publish_keeps_newest_versions(tmp_path):
+    from ml.models.isolation_forest import build_pipeline
+    import pandas as pd
+
+    model_dir = str(tmp_path / "models")
+    df = pd.DataFrame(rows(NOW, 50))
+    pipeline = build_pipeline(n_estimators=5, n_jobs=1).fit(df)
+
+    versions = [publish_model(pipeline, model_dir, keep_versions=2, export_onnx=False).version for _ in range(3)]
+
+    assert list_versions(model_dir) == versions[1:]
+    # The active file is the newest version
+    active = os.stat(os.path.join(model_dir, f"{MODEL_NAME}.pkl"))
+    newest = os.stat(os.path.join(model_dir, f"{MODEL_NAME}.{versions[-1]}.pkl"))
+    assert active.st_size == newest.st_size
+
+def test_failed_onnx_conversion_still_publishes_pickle(tmp_path, monkeypatch):
+    from ml.models.isolation_forest import build_pipeline
+    import pandas as pd
+
+    def to_onnx(pipeline, path):
+        with open(path, 'wb') as f:
+            f.write(b"partial")
+        raise RuntimeError("Unable to find a shape calculator for type IsolationForest")
+
+    monkeypatch.setitem(sys.modules, "ml.export.onnx_export", types.SimpleNamespace(export_onnx=to_onnx))
+    model_dir = str(tmp_path / "models")
+    pipeline = build_pipeline(n_estimators=5, n_jobs=1).fit(pd.DataFrame(rows(NOW, 50)))
+
+    published = publish_model(pipeline, model_dir)
+
+    assert published.onnx_path is None
+    assert os.path.exists(published.model_path)
+    assert list_versions(model_dir) == [published.version]
+    assert not [name for name in os.listdir(model_dir) if name.endswith('.onnx')]
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX nice values")
+def test_lower_priority_in_child_process():
+    code = (
+        "import psutil; from ml.incremental_trainer import lower_priority; "
+        "lower_priority(nice=7, cpu_limit=1); p = psutil.Process(); "
+        "print(p.nice(), len(p.cpu_affinity()))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    nice, cpus = map(int, out.stdout.split())
+    assert nice >= 7
+    assert cpus == 1
+
+def test_trainer_process_starts_and_stops(tmp_path):
+    trainer = TrainerProcess(interval=3600, model_dir=str(tmp_path), export_onnx=False)
+    trainer.start()
+    try:
+        assert trainer.is_alive()
+    finally:
+        trainer.stop(timeout=30)
+    assert not trainer.is_alive()
+
+def test_run_trainer_fits_before_the_first_wait(monkeypatch):
+    fits = []
+
+    class FakeTrainer:
+        def __init__(self, **kwargs):
+            pass
+
+        def train_once(self):
+            fits.append(1)
+
+    monkeypatch.setattr(incremental_trainer, "IncrementalTrainer", FakeTrainer)
+    monkeypatch.setattr(incremental_trainer, "lower_priority", lambda nice, cpu_limit: None)
+    stop_event = threading.Event()
+    stop_event.set() # e.g. stopped before the first 6 h interval elapsed
+
+    run_trainer(stop_event, interval=3600)
+    assert fits == [1]
+
+def test_python_executable_inside_service(monkeypatch):
+    monkeypatch.setattr(sys, "executable", os.path.join("C:\\Python311", "pythonservice.exe"))
+    monkeypatch.setattr(sys, "exec_prefix", "C:\\Python311")
+    assert python_executable() == os.path.join("C:\\Python311", "python.exe")
@@ -1,12 +1,17 @@
 import sys
 import os
+import shutil
+import tempfile
 import unittest
+from unittest.mock import patch
 
 # Setup path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from ml.inference_engine import InferenceEngine
 
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'ml', 'models', 'portkodiak_model.pkl')
+
 class TestInferenceEngine(unittest.TestCase):
     def setUp(self):
         self.engine = InferenceEngine()
@@ -33,5 +38,121 @@ class TestInferenceEngine(unittest.TestCase):
         self.assertIsInstance(score, float)
         self.assertIn(label, ["Normal", "Anomaly", "Unknown (No Model)", "Error"])
 
+    def test_predict_batch_matches_predict(self):
+        conns = [
+            {
+                "remote_port": 443,
+                "process_name": "chrome.exe",
+                "process_path": "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
+                "direction": "Outbound"
+            },
+            {
+                "remote_port": 4444,
+                "process_name": "nc.exe",
+                "process_path": "C:\\Temp\\nc.exe",
+                "direction": "Inbound"
+            },
+            {}, # Missing keys fall back to training defaults
+        ]
+
+        import joblib
+        import pandas as pd
+        from ml.models.isolation_forest import build_pipeline
+
+        # Small model trained on one browser's ports 400-599, so nc.exe on 4444 scores below 0
+        train = pd.DataFrame({
+            "remote_port": list(range(400, 600)),
+            "process_name": ["chrome.exe"] * 200,
+            "process_path": [conns[0]["process_path"]] * 200,
+            "direction": ["Outbound"] * 200,
+        })
+        pipeline = build_pipeline(n_estimators=20, n_jobs=1).fit(train)
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        model_path = os.path.join(tmpdir, "model.pkl")
+        joblib.dump(pipeline, model_path)
+        engine = InferenceEngine(model_path, backend="sklearn", cache_size=0)
+
+        # The frame the pipeline expects, built independently of the engine
+        frame = pd.DataFrame({
+            "remote_port": [443, 4444, 0],
+            "process_name": ["chrome.exe", "nc.exe", "Unknown"],
+            "process_path": [conns[0]["process_path"], conns[1]["process_path"], "Unknown"],
+            "direction": ["Outbound", "Inbound", "Outbound"],
+        })
+        expected_scores = pipeline.decision_function(frame)
+        expected_labels = ["Anomaly" if p == -1 else "Normal" for p in pipeline.predict(frame)]
+        self.assertEqual(expected_labels[:2], ["Normal", "Anomaly"])
+
+        batch = engine.predict_batch(conns)
+        self.assertEqual(len(batch), len(conns))
+        for (score, label), expected_score, expected_label in zip(batch, expected_scores, expected_labels):
+            self.assertAlmostEqual(score, expected_score, places=9)
+            self.assertEqual(label, expected_label)
+            self.assertEqual(label, "Anomaly" if expected_score < 0 else "Normal")
+
+    def test_predict_batch_empty(self):
+        self.assertEqual(self.engine.predict_batch([]), [])
+
+@unittest.skipUnless(os.path.exists(MODEL_PATH), "No trained model")
+class TestScoreCache(unittest.TestCase):
+    CONN = {
+        "remote_port": 443,
+        "process_name": "chrome.exe",
+        "process_path": "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
+        "direction": "Outbound"
+    }
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.model_path = os.path.join(self.tmpdir, "model.pkl")
+        shutil.copy(MODEL_PATH, self.model_path)
+        self.engine = InferenceEngine(self.model_path, backend="sklearn", cache_size=128, cache_ttl=60)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_repeated_tuples_are_scored_once(self):
+        other = dict(self.CONN, remote_port=4444)
+        with patch.object(self.engine.backend, "score", wraps=self.engine.backend.score) as score:
+            first = self.engine.predict_batch([self.CONN, other, dict(self.CONN)])
+            second = self.engine.predict_batch([other, self.CONN])
+
+        # Duplicates within a batch are deduplicated, the second batch is all hits
+        self.assertEqual(score.call_count, 1)
+        self.assertEqual(len(score.call_args[0][0]), 2)
+        self.assertEqual(first[0], first[2])
+        self.assertEqual(second, [first[1], first[0]])
+
+        stats = self.engine.cache_stats()
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 3)
+        self.assertEqual(stats["size"], 2)
+
+    def test_extra_keys_do_not_split_the_cache(self):
+        self.engine.predict(self.CONN)
+        self.engine.predict(dict(self.CONN, pid=1234, remote_ip="10.0.0.1"))
+        self.assertEqual(self.engine.cache_stats()["hits"], 1)
+
+    def test_model_reload_invalidates(self):
+        self.engine.predict(self.CONN)
+        old_version = self.engine.model_version
+        self.assertFalse(self.engine.reload_if_changed())
+
+        st = os.stat(self.model_path)
+        os.utime(self.model_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertTrue(self.engine.reload_if_changed())
+        self.assertNotEqual(self.engine.model_version, old_version)
+        self.assertEqual(self.engine.cache_stats()["size"], 0)
+
+        with patch.object(self.engine.backend, "score", wraps=self.engine.backend.score) as score:
+            self.engine.predict(self.CONN)
+        self.assertEqual(score.call_count, 1)
+
+    def test_cache_disabled(self):
+        engine = InferenceEngine(self.model_path, backend="sklearn", cache_size=0)
+        self.assertEqual(engine.cache_stats(), {"enabled": False})
+        self.assertEqual(engine.predict(self.CONN), self.engine.predict(self.CONN))
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,49 @@
+import sys
+import os
+import pytest
+
+# Setup path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.ingest_queue import BoundedIngestQueue, DROP_OLDEST, DROP_NEWEST, SAMPLE
+
+def test_drop_oldest_keeps_most_recent():
+    q = BoundedIngestQueue(maxsize=3, overflow=DROP_OLDEST)
+    for i in range(5):
+        assert q.put(i)
+    assert q.drain() == [2, 3, 4]
+    assert q.dropped == 2
+
+def test_drop_newest_keeps_backlog():
+    q = BoundedIngestQueue(maxsize=3, overflow=DROP_NEWEST)
+    results = [q.put(i) for i in range(5)]
+    assert results == [True, True, True, False, False]
+    assert q.drain() == [0, 1, 2]
+    assert q.dropped == 2
+
+def test_sample_stays_bounded():
+    q = BoundedIngestQueue(maxsize=10, overflow=SAMPLE)
+    for i in range(1000):
+        q.put(i)
+    items = q.drain()
+    assert len(items) == 10
+    assert q.dropped == 990
+    # Later items get a chance to displace early ones
+    assert max(items) >= 10
+
+def test_drain_in_chunks_and_requeue():
+    q = BoundedIngestQueue(maxsize=4)
+    for i in range(4):
+        q.put(i)
+    head = q.drain(2)
+    assert head == [0, 1]
+    q.put(4)
+
+    # Failed batch goes back in front; only what fits is kept
+    assert q.requeue(head) == 1
+    assert q.drain() == [1, 2, 3, 4]
+    assert q.dropped == 1
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        BoundedIngestQueue(overflow="block")
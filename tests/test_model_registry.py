@@ -0,0 +1,126 @@
+import sys
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pytest
+
+# Setup path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ml.inference_engine import InferenceEngine, LoadedModel
+from ml.model_registry import ModelRegistry
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'ml', 'models', 'portkodiak_model.pkl')
+
+pytestmark = pytest.mark.skipif(not os.path.exists(MODEL_PATH), reason="No trained model")
+
+CONN = {"remote_port": 443, "process_name": "chrome.exe", "process_path": "C:\\chrome.exe", "direction": "Outbound"}
+
+class FakeBackend:
+    name = "fake"
+    model = None
+
+    def __init__(self, score=0.5):
+        self.value = score
+
+    def score(self, connections):
+        return np.full(len(connections), self.value)
+
+@pytest.fixture
+def engine(tmp_path):
+    model_path = str(tmp_path / "model.pkl")
+    shutil.copy(MODEL_PATH, model_path)
+    return InferenceEngine(model_path, backend="sklearn", cache_size=64)
+
+def touch(path, seconds=1):
+    """Simulates train_local.py replacing the model file."""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + seconds * 10**9))
+
+def test_new_version_is_swapped_after_settling(engine):
+    registry = ModelRegistry(engine, poll_interval=60)
+    old = engine._loaded
+    engine.predict(CONN)
+
+    assert registry.check() is False # unchanged
+    touch(engine.model_path)
+    assert registry.check() is False # first sighting: may still be written
+    assert registry.check() is True
+
+    assert engine.model_version == engine.file_version()
+    assert registry.previous is old
+    assert registry.swaps == 1
+    assert engine.cache_stats()["size"] == 0
+    assert registry.check() is False
+
+def test_invalid_model_is_rejected_and_not_retried(engine):
+    registry = ModelRegistry(engine, poll_interval=60)
+    old_version = engine.model_version
+    expected = engine.predict(CONN)
+
+    with open(engine.model_path, "wb") as f:
+        f.write(b"not a pickle")
+    registry.check()
+    assert registry.check() is False
+    assert registry.last_error
+    assert engine.model_version == old_version
+    assert engine.predict(CONN) == expected
+
+    # Same broken file: no reload attempt on later polls
+    engine.load = lambda: pytest.fail("rejected version reloaded")
+    assert registry.check() is False
+
+def test_canary_failure_keeps_current_model(engine, monkeypatch):
+    registry = ModelRegistry(engine, poll_interval=60)
+    old = engine._loaded
+    monkeypatch.setattr(engine, "load", lambda: LoadedModel(FakeBackend(float("nan")), ("new",)))
+
+    assert registry.activate_candidate() is False
+    assert "non-finite" in registry.last_error
+    assert engine._loaded is old
+
+def test_rollback(engine, monkeypatch):
+    registry = ModelRegistry(engine, poll_interval=60)
+    old = engine._loaded
+    expected = engine.predict(CONN)
+    monkeypatch.setattr(engine, "load", lambda: LoadedModel(FakeBackend(-1.0), ("new",)))
+
+    assert registry.activate_candidate() is True
+    assert engine.predict(CONN) == (-1.0, "Anomaly")
+
+    assert registry.rollback() is True
+    assert engine._loaded is old
+    assert engine.predict(CONN) == expected
+
+def test_loading_does_not_block_scoring(engine, monkeypatch):
+    registry = ModelRegistry(engine, poll_interval=0.01)
+    expected = engine.predict(CONN)
+    loading = threading.Event()
+    release = threading.Event()
+
+    def slow_load():
+        loading.set()
+        release.wait(5)
+        return LoadedModel(FakeBackend(-1.0), engine.file_version())
+
+    monkeypatch.setattr(engine, "load", slow_load)
+    touch(engine.model_path)
+    registry.start()
+    try:
+        assert loading.wait(5)
+        # The watcher thread is stuck loading; predictions still use the current model
+        start = time.perf_counter()
+        assert engine.predict(CONN) == expected
+        assert time.perf_counter() - start < 1
+        release.set()
+
+        deadline = time.time() + 5
+        while registry.swaps == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        assert engine.predict(CONN) == (-1.0, "Anomaly")
+    finally:
+        release.set()
+        registry.stop()
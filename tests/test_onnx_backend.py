@@ -0,0 +1,76 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Setup path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("skl2onnx")
+
+import joblib
+
+from ml.backends import FeatureEncoder, SklearnBackend
+from ml.export.onnx_export import export_onnx, feature_spec
+from ml.inference_engine import InferenceEngine
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'ml', 'models', 'portkodiak_model.pkl')
+
+pytestmark = pytest.mark.skipif(not os.path.exists(MODEL_PATH), reason="No trained model")
+
+def connections():
+    conns = []
+    for port in (0, 80, 443, 4444, 65535):
+        for name in ("chrome.exe", "svchost.exe (netsvcs)", "nc.exe", None):
+            for direction in ("Outbound", "Inbound"):
+                conns.append({
+                    "remote_port": port,
+                    "process_name": name,
+                    "process_path": f"C:\\Program Files\\{name}",
+                    "direction": direction,
+                })
+    conns.append({}) # Missing keys fall back to training defaults
+    return conns
+
+@pytest.fixture(scope="module")
+def onnx_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("onnx") / "model.onnx"
+    export_onnx(joblib.load(MODEL_PATH), path)
+    return str(path)
+
+def test_encoder_matches_sklearn_preprocessor():
+    pipeline = joblib.load(MODEL_PATH)
+    preprocessor = pipeline.named_steps["preprocessor"]
+    encoder = FeatureEncoder(feature_spec(pipeline))
+    conns = connections()
+
+    expected = preprocessor.transform(SklearnBackend.build_frame(conns))
+    encoded = encoder.encode(conns)
+
+    # Numeric columns are scaled inside the graph; everything else must match exactly
+    offsets = encoder.numeric_offsets
+    mask = np.ones(encoder.n_features, dtype=bool)
+    mask[offsets] = False
+    np.testing.assert_array_equal(encoded[:, mask], expected[:, mask])
+
+def test_onnx_scores_match_sklearn(onnx_path):
+    sklearn_engine = InferenceEngine(MODEL_PATH, backend="sklearn")
+    onnx_engine = InferenceEngine(MODEL_PATH, backend="onnx", onnx_path=onnx_path)
+    assert onnx_engine.backend.name == "onnx"
+
+    conns = connections()
+    expected = sklearn_engine.predict_batch(conns)
+    actual = onnx_engine.predict_batch(conns)
+
+    np.testing.assert_allclose(
+        [score for score, _ in actual], [score for score, _ in expected], atol=1e-5
+    )
+    assert [label for _, label in actual] == [label for _, label in expected]
+
+def test_missing_onnx_falls_back_to_sklearn(tmp_path):
+    engine = InferenceEngine(MODEL_PATH, backend="onnx", onnx_path=str(tmp_path / "missing.onnx"))
+    assert engine.backend.name == "sklearn"
+    score, label = engine.predict({"remote_port": 443})
+    assert isinstance(score, float)
@@ -0,0 +1,59 @@
+import sys
+import os
+from unittest.mock import patch
+
+import psutil
+
+# Setup path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.process_cache import ProcessInfoCache, UNKNOWN_PROCESS
+
+def test_current_process_resolution():
+    cache = ProcessInfoCache()
+    info = cache.get(os.getpid())
+
+    me = psutil.Process(os.getpid())
+    assert info.name == me.name()
+    assert info.path == me.exe()
+    assert info.parent_info == f"{me.parent().name()} (PID: {me.ppid()})"
+    assert info.create_time == me.create_time()
+
+def test_cache_hit_skips_rebuild():
+    cache = ProcessInfoCache()
+    first = cache.get(os.getpid())
+
+    with patch.object(ProcessInfoCache, "_build", side_effect=AssertionError("rebuilt")):
+        assert cache.get(os.getpid()) is first
+    assert cache.stats()["hits"] == 1
+
+def test_pid_reuse_invalidates_entry():
+    cache = ProcessInfoCache()
+    first = cache.get(os.getpid())
+
+    # Same PID, different create time -> a different process owns it now
+    with patch.object(psutil.Process, "create_time", return_value=first.create_time + 1):
+        second = cache.get(os.getpid())
+    assert second is not first
+    assert second.create_time == first.create_time + 1
+
+def test_missing_process():
+    cache = ProcessInfoCache()
+    with patch("psutil.Process", side_effect=psutil.NoSuchProcess(999999)):
+        assert cache.get(999999) == UNKNOWN_PROCESS
+
+def test_resolve_many_uses_single_sweep():
+    cache = ProcessInfoCache(prime_threshold=2)
+    pids = [os.getpid(), os.getppid(), 999999]
+
+    with patch("psutil.process_iter", wraps=psutil.process_iter) as sweep:
+        result = cache.resolve_many(pids)
+    assert sweep.call_count == 1
+
+    assert set(result) == set(pids)
+    assert result[os.getpid()].path == psutil.Process(os.getpid()).exe()
+    assert result[999999] == UNKNOWN_PROCESS
+
+    # Primed entries are served from the cache afterwards
+    with patch.object(ProcessInfoCache, "_build", side_effect=AssertionError("rebuilt")):
+        assert cache.get(os.getpid()) == result[os.getpid()]
@@ -0,0 +1,189 @@
+import sys
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, inspect, select
+from sqlalchemy.orm import sessionmaker
+
+# Setup path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.common.models import Base, TrafficRollup, TrafficSample
+from app.common.retention import (
+    SamplePartitions, RetentionManager, list_partitions, partition_name, sample_tables
+)
+from agent.data_collector import DataCollector
+
+NOW = datetime(2024, 3, 10, 12, 30)
+
+def make_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'retention.db'}")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+def row(ts, process="chrome.exe", port=443):
+    return {
+        "timestamp": ts,
+        "process_name": process,
+        "process_path": f"C:\\Apps\\{process}",
+        "remote_ip": "10.0.0.1",
+        "remote_port": port,
+        "remote_hostname": "example.com",
+        "direction": "Outbound",
+        "protocol": "TCP",
+    }
+
+def count(conn, table):
+    return conn.execute(select(func.count()).select_from(table)).scalar()
+
+def test_rows_are_routed_to_day_partitions(tmp_path):
+    engine = make_engine(tmp_path)
+    partitions = SamplePartitions()
+
+    with engine.begin() as conn:
+        written = partitions.insert_rows(conn, [
+            row(NOW), row(NOW - timedelta(hours=1)), row(NOW - timedelta(days=1))
+        ])
+        days = [day for day, _ in list_partitions(conn)]
+        tables = {t.name: count(conn, t) for t in sample_tables(conn)}
+
+    assert written == 3
+    assert days == [NOW.date() - timedelta(days=1), NOW.date()]
+    assert tables == {
+        "traffic_samples": 0,
+        partition_name(NOW.date() - timedelta(days=1)): 1,
+        partition_name(NOW.date()): 2,
+    }
+    # Each partition gets its own timestamp index
+    indexes = inspect(engine).get_indexes(partition_name(NOW.date()))
+    assert [ix["name"] for ix in indexes] == [f"ix_{partition_name(NOW.date())}_timestamp"]
+
+def test_sample_tables_filters_by_range(tmp_path):
+    engine = make_engine(tmp_path)
+    partitions = SamplePartitions()
+
+    with engine.begin() as conn:
+        partitions.insert_rows(conn, [row(NOW - timedelta(days=d)) for d in range(5)])
+        tables = sample_tables(conn, since=NOW - timedelta(days=2), until=NOW - timedelta(days=1))
+
+    assert [t.name for t in tables] == [
+        "traffic_samples",
+        partition_name(NOW.date() - timedelta(days=2)),
+        partition_name(NOW.date() - timedelta(days=1)),
+    ]
+
+def test_rollup_counts_completed_hours_once(tmp_path):
+    engine = make_engine(tmp_path)
+    partitions = SamplePartitions()
+    manager = RetentionManager(engine, partitions=partitions)
+    hour = datetime(2024, 3, 10, 10)
+
+    with engine.begin() as conn:
+        partitions.insert_rows(conn, [
+            row(hour + timedelta(minutes=1)),
+            row(hour + timedelta(minutes=2)),
+            row(hour + timedelta(minutes=3), port=80),
+            row(NOW), # current hour: not rolled up yet
+        ])
+        # Pre-partitioning rows in the legacy table are included too
+        conn.execute(TrafficSample.__table__.insert(), [row(hour + timedelta(minutes=4))])
+
+    # 2 buckets inserted from the partition, 1 updated from the legacy table
+    assert manager.rollup(NOW) == 3
+
+    with engine.connect() as conn:
+        rollups = conn.execute(
+            select(TrafficRollup.hour, TrafficRollup.remote_port, TrafficRollup.sample_count)
+            .order_by(TrafficRollup.remote_port)
+        ).all()
+    assert rollups == [(hour, 80, 1), (hour, 443, 3)]
+
+    # Nothing new completed: a second pass is a no-op
+    assert manager.rollup(NOW) == 0
+
+def test_rollup_adds_rows_committed_after_their_hour(tmp_path):
+    engine = make_engine(tmp_path)
+    partitions = SamplePartitions()
+    manager = RetentionManager(engine, partitions=partitions)
+    hour = datetime(2024, 3, 10, 10)
+
+    with engine.begin() as conn:
+        partitions.insert_rows(conn, [row(hour + timedelta(minutes=1)), row(NOW)])
+    manager.rollup(NOW)
+
+    # Queued at 10:05, committed two hours later (flush retries, stalled writer)
+    with engine.begin() as conn:
+        partitions.insert_rows(conn, [row(hour + timedelta(minutes=5))])
+        conn.execute(TrafficSample.__table__.insert(), [row(hour + timedelta(minutes=6))])
+    later = NOW + timedelta(hours=1)
+    manager.rollup(later)
+    manager.rollup(later)
+
+    with engine.connect() as conn:
+        rollups = conn.execute(
+            select(TrafficRollup.hour, TrafficRollup.sample_count).order_by(TrafficRollup.hour)
+        ).all()
+    # The late rows are counted once; the 12:30 row once its hour completed
+    assert rollups == [(hour, 3), (datetime(2024, 3, 10, 12), 1)]
+
+def test_rollup_merges_buckets_without_hostname(tmp_path):
+    engine = make_engine(tmp_path)
+    partitions = SamplePartitions()
+    manager = RetentionManager(engine, partitions=partitions)
+    hour = datetime(2024, 3, 10, 10)
+    unresolved = dict(row(hour + timedelta(minutes=1)), remote_hostname=None)
+
+    with engine.begin() as conn:
+        partitions.insert_rows(conn, [unresolved, unresolved])
+        conn.execute(TrafficSample.__table__.insert(), [unresolved])
+
+    manager.rollup(NOW)
+
+    with engine.connect() as conn:
+        rollups = conn.execute(select(TrafficRollup.remote_hostname, TrafficRollup.sample_count)).all()
+    # One bucket summed over both tables, not one per table
+    assert rollups == [("", 3)]
+
+def test_expire_archives_and_drops_old_partitions(tmp_path):
+    engine = make_engine(tmp_path)
+    partitions = SamplePartitions()
+    archive_dir = tmp_path / "archive"
+    manager = RetentionManager(engine, retention_days=7, archive_dir=archive_dir, partitions=partitions)
+    old_day = NOW - timedelta(days=10)
+
+    with engine.begin() as conn:
+        partitions.insert_rows(conn, [row(old_day), row(old_day), row(NOW)])
+        conn.execute(TrafficSample.__table__.insert(), [row(old_day), row(NOW)])
+
+    manager.run(NOW)
+
+    old_name = partition_name(old_day.date())
+    with engine.connect() as conn:
+        assert [name for _, name in list_partitions(conn)] == [partition_name(NOW.date())]
+        assert count(conn, TrafficSample.__table__) == 1
+        # Expired data survives in the rollups
+        assert conn.execute(select(func.sum(TrafficRollup.sample_count))).scalar() == 3
+
+    archive = create_engine(f"sqlite:///{archive_dir / (old_name + '.db')}")
+    with archive.connect() as conn:
+        assert conn.exec_driver_sql(f'SELECT COUNT(*) FROM "{old_name}"').scalar() == 2
+
+    # A late row for the dropped day recreates its partition
+    with engine.begin() as conn:
+        partitions.insert_rows(conn, [row(old_day)])
+        assert old_name in [name for _, name in list_partitions(conn)]
+
+def test_collector_writes_into_partitions(tmp_path):
+    engine = make_engine(tmp_path)
+    Session = sessionmaker(bind=engine)
+    collector = DataCollector(flush_interval=60, batch_size=1000, session_factory=Session,
+                              partitions=SamplePartitions())
+
+    collector.add_sample({"process_name": "chrome.exe", "remote_ip": "10.0.0.1", "remote_port": 443})
+    collector.flush()
+    collector.shutdown()
+
+    with engine.connect() as conn:
+        tables = {t.name: count(conn, t) for t in sample_tables(conn)}
+    assert tables.pop("traffic_samples") == 0
+    assert list(tables.values()) == [1]
@@ -0,0 +1,156 @@
+import sys
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Setup path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.data_collector import DataCollector
+from agent.dns_resolver import DnsLogWriter
+from agent.runtime import CAPTURE, AgentRuntime, PeriodicTask
+from app.common.models import Base, TrafficSample
+from app.core.action_manager import ActionManager
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def test_tasks_run_periodically_and_stop():
+    calls = []
+    runtime = AgentRuntime([PeriodicTask("tick", 0.01, lambda: calls.append(1))])
+    runtime.start()
+    assert wait_until(lambda: len(calls) >= 3)
+    runtime.stop()
+
+    assert not runtime.thread.is_alive()
+    assert runtime.stats()["tick"]["runs"] == len(calls)
+
+def test_wake_runs_a_task_early():
+    calls = []
+    runtime = AgentRuntime([PeriodicTask("flush", 3600, lambda: calls.append(1))])
+    runtime.start()
+    assert wait_until(lambda: calls == [1])
+
+    runtime.wake("flush")
+    assert wait_until(lambda: calls == [1, 1])
+    runtime.stop()
+
+def test_failing_task_keeps_running():
+    def fail():
+        raise RuntimeError("boom")
+
+    runtime = AgentRuntime([PeriodicTask("bad", 0.01, fail)])
+    runtime.start()
+    assert wait_until(lambda: runtime.stats()["bad"]["errors"] >= 2)
+    runtime.stop()
+    assert not runtime.thread.is_alive()
+
+def test_capture_runs_on_one_thread_apart_from_io():
+    threads = {"capture": set(), "io": set()}
+    runtime = AgentRuntime([
+        PeriodicTask("capture", 0.001, lambda: threads["capture"].add(threading.current_thread().name), CAPTURE),
+        PeriodicTask("io", 0.001, lambda: threads["io"].add(threading.current_thread().name)),
+    ])
+    runtime.start()
+    assert wait_until(lambda: runtime.stats()["capture"]["runs"] >= 20)
+    runtime.stop()
+
+    assert len(threads["capture"]) == 1
+    assert threads["capture"].isdisjoint(threads["io"])
+
+def test_stop_lets_in_flight_work_finish_before_hooks():
+    order = []
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(0.2)
+        order.append("task done")
+
+    runtime = AgentRuntime(
+        [PeriodicTask("slow", 3600, slow)],
+        shutdown_hooks=[("flush", lambda: order.append("flush")), ("close", lambda: order.append("close"))]
+    )
+    runtime.start()
+    assert started.wait(5)
+    runtime.stop()
+
+    assert order == ["task done", "flush", "close"]
+
+def test_stop_right_after_start():
+    hooks = []
+    runtime = AgentRuntime([PeriodicTask("tick", 3600, lambda: None)], shutdown_hooks=[("hook", lambda: hooks.append(1))])
+    # The loop may not be running yet when stop() arrives
+    runtime.start()
+    runtime.stop()
+
+    assert not runtime.thread.is_alive()
+    assert hooks == [1]
+
+def make_agent(Session):
+    collector = DataCollector(flush_interval=3600, batch_size=5, session_factory=Session, autostart=False)
+    writer = DnsLogWriter(flush_interval=3600, session_factory=Session, autostart=False)
+    agent = SimpleNamespace(
+        collector=collector,
+        dns_resolver=SimpleNamespace(log_writer=writer, shutdown=writer.shutdown),
+        action_manager=SimpleNamespace(process_queue=lambda: None),
+        model_registry=None,
+        closed=False,
+        polls=0,
+    )
+
+    def poll_connections():
+        agent.polls += 1
+        if agent.polls == 2:
+            for port in range(5):
+                collector.add_sample({"process_name": "app.exe", "remote_ip": "1.2.3.4", "remote_port": port})
+
+    def close_session():
+        agent.closed = True
+
+    agent.poll_connections = poll_connections
+    agent.close_session = close_session
+    return agent
+
+def count_samples(Session):
+    with Session() as db:
+        return db.scalar(select(func.count()).select_from(TrafficSample))
+
+def test_agent_runtime_flushes_full_batches_and_drains_on_stop():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    agent = make_agent(Session)
+    assert agent.collector.thread is None
+
+    runtime = AgentRuntime.for_agent(agent)
+    runtime.tasks[0] = runtime.tasks[0]._replace(interval=0.01)
+    runtime.start()
+    # A full batch is written right away, not after COLLECTOR_FLUSH_INTERVAL
+    assert wait_until(lambda: count_samples(Session) == 5)
+
+    agent.collector.add_sample({"process_name": "late.exe", "remote_ip": "5.6.7.8", "remote_port": 1})
+    runtime.stop()
+
+    assert count_samples(Session) == 6
+    assert agent.closed
+    assert set(runtime.stats()) == {"capture", "samples", "dns_log", "actions"}
+
+def test_action_manager_stop():
+    manager = ActionManager()
+    manager.start_polling(interval=3600)
+    start = time.monotonic()
+    manager.stop()
+
+    assert time.monotonic() - start < 5
+    assert manager.thread is None
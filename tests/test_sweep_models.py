@@ -0,0 +1,59 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+# Setup path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.sweep_models import SweepConfig, format_results, make_grid, prepare_features, run_sweep, split_holdout
+
+def labelled_frame(n=400, malicious=20, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "process_name": rng.choice(["chrome.exe", "svchost.exe", "Teams.exe"], n),
+        "process_path": "C:\\Apps\\app.exe",
+        "remote_port": rng.choice([53, 443], n),
+        "direction": "Outbound",
+        "is_malicious": False,
+    })
+    bad = df.index[:malicious]
+    df.loc[bad, ["process_name", "process_path", "remote_port", "direction", "is_malicious"]] = \
+        ["nc.exe", "C:\\Temp\\nc.exe", 4444, "Inbound", True]
+    return df
+
+def test_make_grid():
+    grid = make_grid([50, 100], [0.01], [(16, 32), (8, 16)])
+    assert len(grid) == 4
+    assert SweepConfig(100, 0.01, 8, 16) in grid
+
+def test_holdout_keeps_both_classes():
+    train, test = split_holdout(labelled_frame(), holdout=0.25)
+    assert len(test) == 100
+    assert test["is_malicious"].sum() == 5
+    assert train["is_malicious"].sum() == 15
+
+def test_features_are_shared_float32_memmaps(tmp_path):
+    train, test = split_holdout(labelled_frame())
+    layouts = prepare_features(train, test, [(16, 32), (16, 32), (8, 16)], str(tmp_path))
+
+    assert set(layouts) == {(16, 32), (8, 16)}
+    _, train_path, eval_path = layouts[(8, 16)]
+    x = np.load(train_path, mmap_mode='r')
+    assert isinstance(x, np.memmap)
+    assert x.dtype == np.float32 and x.flags['C_CONTIGUOUS']
+    # port + 8 + 16 hashed + 2 direction columns
+    assert x.shape == (len(train), 1 + 8 + 16 + 2)
+    assert np.load(eval_path).shape[0] == len(test)
+
+def test_run_sweep_reports_every_config():
+    configs = make_grid([10, 20], [0.05], [(8, 16)])
+    results = run_sweep(labelled_frame(), configs, workers=2, latency_rows=50)
+
+    assert [(r["n_estimators"], r["proc_features"]) for r in results] == [(10, 8), (20, 8)]
+    for r in results:
+        assert r["fit_s"] > 0 and r["us_per_row"] > 0 and r["size_kb"] > 0
+        # The planted outliers are trivially separable
+        assert r["roc_auc"] > 0.9
+    assert "ROC AUC" in format_results(results)
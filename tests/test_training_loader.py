@@ -0,0 +1,113 @@
+import sys
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+# Setup path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.common.models import Base, TrafficSample
+from app.common.retention import SamplePartitions
+from ml.preprocessing.loader import (
+    PhaseReport, Reservoir, StratifiedReservoir, load_training_data, optimize_dtypes, sample_chunks
+)
+
+def make_chunks(n_chunks, chunk_size, malicious_every=None):
+    for i in range(n_chunks):
+        ids = np.arange(i * chunk_size, (i + 1) * chunk_size)
+        yield pd.DataFrame({
+            "process_name": [f"proc_{x % 7}.exe" for x in ids],
+            "process_path": "C:\\Apps\\proc.exe",
+            "remote_port": ids % 65536,
+            "direction": "Outbound",
+            "is_malicious": (ids % malicious_every == 0) if malicious_every else False,
+        })
+
+def test_reservoir_is_bounded_and_uniform():
+    reservoir = Reservoir(2000, seed=1)
+    for i in range(50):
+        reservoir.add(pd.DataFrame({"x": np.arange(i * 2000, (i + 1) * 2000)}))
+
+    sample = reservoir.to_frame()["x"]
+    assert reservoir.seen == 100000
+    assert len(sample) == 2000
+    assert sample.is_unique
+    # A uniform sample covers the stream evenly, not just the first/last chunks
+    assert abs(sample.mean() - 50000) < 3000
+    assert (sample < 50000).mean() == pytest.approx(0.5, abs=0.05)
+
+def test_reservoir_keeps_everything_below_size():
+    reservoir = Reservoir(100, seed=1)
+    reservoir.add(pd.DataFrame({"x": range(30)}))
+    reservoir.add(pd.DataFrame({"x": range(30, 60)}))
+    assert reservoir.to_frame()["x"].tolist() == list(range(60))
+
+def test_stratified_sample_keeps_rare_class():
+    reservoir = StratifiedReservoir(1000, "is_malicious", min_per_stratum=50, seed=1)
+    for chunk in make_chunks(20, 1000, malicious_every=1000):
+        reservoir.add(chunk)
+
+    # 20 malicious rows in 20000: a plain 5% sample would keep about one
+    sample = reservoir.to_frame()
+    assert sample["is_malicious"].sum() == 20
+    assert len(sample) == 1000
+
+def test_optimize_dtypes():
+    df = optimize_dtypes(pd.DataFrame({
+        "process_name": ["a.exe", None],
+        "process_path": ["C:\\a.exe", "C:\\a.exe"],
+        "remote_port": [443, 65535],
+        "direction": ["Outbound", "Inbound"],
+        "is_malicious": [0, 1],
+    }))
+
+    assert df["process_name"].dtype == "category"
+    assert df["process_name"].tolist() == ["a.exe", "Unknown"]
+    assert df["remote_port"].dtype == np.uint16
+    assert df["remote_port"].tolist() == [443, 65535]
+    assert df["is_malicious"].dtype == bool
+
+def test_sample_chunks_respects_target_size():
+    df = sample_chunks(make_chunks(10, 5000), sample_size=3000)
+    assert len(df) == 3000
+    assert df["remote_port"].dtype == np.uint16
+
+def test_load_from_db_partitions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'train.db'}")
+    Base.metadata.create_all(bind=engine)
+    start = datetime(2024, 3, 10)
+    rows = [{
+        "timestamp": start + timedelta(minutes=i),
+        "process_name": "chrome.exe",
+        "process_path": "C:\\chrome.exe",
+        "remote_ip": "10.0.0.1",
+        "remote_port": 443,
+        "direction": "Outbound",
+    } for i in range(3000)]
+    with engine.begin() as conn:
+        conn.execute(TrafficSample.__table__.insert(), rows[:1000])
+        SamplePartitions().insert_rows(conn, rows[1000:])
+
+    df = load_training_data("db", db_engine=engine, sample_size=500, chunk_size=400)
+    assert len(df) == 500
+    assert set(df["process_name"]) == {"chrome.exe"}
+
+def test_load_from_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    for i, chunk in enumerate(make_chunks(3, 1000)):
+        chunk.to_parquet(tmp_path / f"part_{i}.parquet")
+
+    df = load_training_data("parquet", paths=tmp_path, sample_size=10000, chunk_size=256)
+    assert len(df) == 3000
+    assert sorted(df["remote_port"].tolist()) == list(range(3000))
+
+def test_phase_report():
+    report = PhaseReport()
+    with report.phase("load"):
+        pass
+    assert [p["phase"] for p in report.phases] == ["load"]
+    assert "load" in report.format()
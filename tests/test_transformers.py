@@ -0,0 +1,81 @@
+import sys
+import os
+import pickle
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import HashingVectorizer
+
+# Setup path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ml.transformers import HashingTransformer
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'ml', 'models', 'portkodiak_model.pkl')
+
+VALUES = [
+    "chrome.exe", "svchost.exe (netsvcs)", "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
+    None, np.nan, "Unknown", "a b a b", "", 443, 1.5,
+]
+
+def reference_transform(X, n_features):
+    """The original HashingTransformer.transform, kept as the compatibility oracle."""
+    vec = HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None)
+    if isinstance(X, pd.DataFrame):
+        X = X.iloc[:, 0]
+    X = X.astype(object).fillna("Unknown").astype(str)
+    return vec.transform(X).toarray()
+
+@pytest.mark.parametrize("size", [1, 5, HashingTransformer.SMALL_BATCH + 1, 5000])
+def test_matches_reference(size):
+    rng = np.random.default_rng(size)
+    X = pd.DataFrame({"col": [VALUES[i] for i in rng.integers(0, len(VALUES), size)]})
+    transformer = HashingTransformer(n_features=16).fit(X)
+
+    # Twice: once hashing, once from the row cache
+    for _ in range(2):
+        result = transformer.transform(X)
+        assert result.dtype == np.float32
+        np.testing.assert_array_equal(result, reference_transform(X, 16))
+
+def test_transform_into_writes_at_offset():
+    transformer = HashingTransformer(n_features=8).fit(None)
+    out = np.full((2, 12), -1, dtype=np.float32)
+    transformer.transform_into(["chrome.exe", None], out, offset=2)
+
+    np.testing.assert_array_equal(out[:, 2:10], reference_transform(pd.Series(["chrome.exe", None]), 8))
+    assert (out[:, :2] == -1).all() and (out[:, 10:] == -1).all()
+
+def test_cache_is_bounded():
+    transformer = HashingTransformer(n_features=8).fit(None)
+    transformer.CACHE_SIZE = 10
+    for i in range(5):
+        transformer.transform(pd.DataFrame({"col": [f"proc_{i}_{j}.exe" for j in range(7)]}))
+    assert len(transformer._row_cache) <= 10
+
+def test_cache_is_not_pickled():
+    transformer = HashingTransformer(n_features=8).fit(None)
+    transformer.transform(pd.DataFrame({"col": ["chrome.exe"]}))
+    restored = pickle.loads(pickle.dumps(transformer))
+    assert not hasattr(restored, "_row_cache")
+    np.testing.assert_array_equal(
+        restored.transform(pd.DataFrame({"col": ["chrome.exe"]})),
+        reference_transform(pd.Series(["chrome.exe"]), 8)
+    )
+
+@pytest.mark.skipif(not os.path.exists(MODEL_PATH), reason="No trained model")
+def test_pickled_model_scores_unchanged(monkeypatch):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "remote_port": rng.integers(0, 65536, 500),
+        "process_name": rng.choice(["chrome.exe", "nc.exe", "svchost.exe (netsvcs)", None], 500),
+        "process_path": rng.choice(["C:\\Apps\\a.exe", "D:\\tools\\nc.exe", "Unknown"], 500),
+        "direction": rng.choice(["Outbound", "Inbound"], 500),
+    })
+    model = joblib.load(MODEL_PATH)
+    scores = model.decision_function(df)
+
+    monkeypatch.setattr(HashingTransformer, "transform", lambda self, X: reference_transform(X, self.n_features))
+    np.testing.assert_array_equal(scores, joblib.load(MODEL_PATH).decision_function(df))
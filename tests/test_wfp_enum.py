@@ -0,0 +1,154 @@
+import sys
+import os
+import ctypes
+
+import pytest
+
+# Setup path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.wfp_enum import connection_info, filter_info, iter_enum
+from agent.wfp_types import (
+    FWP_DIRECTION_INBOUND, FWP_DIRECTION_OUTBOUND, FWPM_CONNECTION0, FWPM_FILTER0, HANDLE, UINT32
+)
+
+class FakeFwpuclnt:
+    """
+    ctypes-level stand-in for fwpuclnt.dll: real function pointers with the
+    WFP prototypes, handing out heap arrays of entry pointers like the DLL.
+    """
+
+    def __init__(self, kind, entry_type, entries, fail_on_call=None):
+        self.entries = entries
+        self.fail_on_call = fail_on_call
+        self.enum_calls = []
+        self.cursors = {}
+        self.pages = {} # live (not yet freed) page address -> array
+        self.destroyed = []
+        self._next_handle = 1
+
+        entries_out = ctypes.POINTER(ctypes.POINTER(ctypes.POINTER(entry_type)))
+        self._callbacks = {
+            f"Fwpm{kind}CreateEnumHandle0": ctypes.CFUNCTYPE(
+                UINT32, HANDLE, ctypes.c_void_p, ctypes.POINTER(HANDLE))(self._create),
+            f"Fwpm{kind}Enum0": ctypes.CFUNCTYPE(
+                UINT32, HANDLE, HANDLE, UINT32, entries_out, ctypes.POINTER(UINT32))(self._enum),
+            f"Fwpm{kind}DestroyEnumHandle0": ctypes.CFUNCTYPE(UINT32, HANDLE, HANDLE)(self._destroy),
+            "FwpmFreeMemory0": ctypes.CFUNCTYPE(None, ctypes.c_void_p)(self._free),
+        }
+        self.entry_type = entry_type
+
+    def __getattr__(self, name):
+        try:
+            return self._callbacks[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def _create(self, engine, template, handle_out):
+        handle = self._next_handle
+        self._next_handle += 1
+        self.cursors[handle] = 0
+        handle_out[0] = handle
+        return 0
+
+    def _enum(self, engine, handle, requested, entries_out, returned_out):
+        self.enum_calls.append(requested)
+        if self.fail_on_call == len(self.enum_calls):
+            return 0x80320001 # FWP_E_CALLOUT_NOT_FOUND, any non-zero error
+        start = self.cursors[handle]
+        chunk = self.entries[start:start + requested]
+        self.cursors[handle] = start + len(chunk)
+        returned_out[0] = len(chunk)
+        if chunk:
+            array = (ctypes.POINTER(self.entry_type) * len(chunk))(*[ctypes.pointer(e) for e in chunk])
+            self.pages[ctypes.addressof(array)] = array
+            entries_out[0] = ctypes.cast(array, ctypes.POINTER(ctypes.POINTER(self.entry_type)))
+        return 0
+
+    def _destroy(self, engine, handle):
+        self.destroyed.append(handle)
+        return 0
+
+    def _free(self, address_of_pointer):
+        # Like FwpmFreeMemory0: receives the address of the caller's pointer
+        page = ctypes.c_void_p.from_address(address_of_pointer).value
+        del self.pages[page]
+
+def make_connections(n):
+    conns = []
+    for i in range(n):
+        conn = FWPM_CONNECTION0()
+        conn.connectionId = 1000 + i
+        conn.processId = 4 + i % 7
+        conn.remoteV4Address = 0x0A000001
+        conn.localPort = 50000 + i % 1000
+        conn.remotePort = 443
+        conn.direction = FWP_DIRECTION_OUTBOUND if i % 2 == 0 else FWP_DIRECTION_INBOUND
+        conns.append(conn)
+    return conns
+
+def make_filters(n):
+    filters = []
+    for i in range(n):
+        flt = FWPM_FILTER0()
+        flt.filterId = i
+        flt.displayData.name = f"filter-{i}"
+        flt.displayData.description = "desc"
+        filters.append(flt)
+    return filters
+
+def enumerate_connections(lib, page_size):
+    return iter_enum(lib, "Connection", HANDLE(1), FWPM_CONNECTION0, connection_info, page_size=page_size)
+
+def test_enumerates_past_the_first_page():
+    lib = FakeFwpuclnt("Connection", FWPM_CONNECTION0, make_connections(1234))
+
+    conns = list(enumerate_connections(lib, page_size=100))
+
+    assert [c["id"] for c in conns] == list(range(1000, 2234))
+    assert conns[1]["direction"] == "Inbound"
+    assert conns[0]["remote_port"] == 443
+    assert len(lib.enum_calls) == 13
+    assert set(lib.enum_calls) == {100}
+    assert lib.pages == {} # every page freed
+    assert lib.destroyed == [1]
+
+def test_exact_multiple_of_page_size_ends_on_empty_page():
+    lib = FakeFwpuclnt("Filter", FWPM_FILTER0, make_filters(200))
+
+    filters = list(iter_enum(lib, "Filter", HANDLE(1), FWPM_FILTER0, filter_info, page_size=100))
+
+    assert [f["name"] for f in filters[:2]] == ["filter-0", "filter-1"]
+    assert len(filters) == 200
+    assert len(lib.enum_calls) == 3
+    assert lib.pages == {}
+
+def test_empty_enumeration():
+    lib = FakeFwpuclnt("Connection", FWPM_CONNECTION0, [])
+    assert list(enumerate_connections(lib, page_size=50)) == []
+    assert lib.destroyed == [1]
+
+def test_streaming_fetches_pages_on_demand():
+    lib = FakeFwpuclnt("Connection", FWPM_CONNECTION0, make_connections(500))
+    stream = enumerate_connections(lib, page_size=100)
+
+    first = next(stream)
+    assert first["id"] == 1000
+    assert len(lib.enum_calls) == 1
+    assert lib.pages == {} # the page was copied out and freed before yielding
+
+    stream.close()
+    assert lib.destroyed == [1]
+
+def test_error_destroys_handle():
+    lib = FakeFwpuclnt("Connection", FWPM_CONNECTION0, make_connections(300), fail_on_call=2)
+
+    with pytest.raises(OSError, match="FwpmConnectionEnum0 failed"):
+        list(enumerate_connections(lib, page_size=100))
+    assert lib.destroyed == [1]
+    assert lib.pages == {}
+
+def test_invalid_page_size():
+    lib = FakeFwpuclnt("Connection", FWPM_CONNECTION0, [])
+    with pytest.raises(ValueError):
+        list(enumerate_connections(lib, page_size=0))
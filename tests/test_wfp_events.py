@@ -0,0 +1,220 @@
+import sys
+import os
+import ctypes
+import threading
+
+# Setup path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.addresses import parse_address
+from agent.connection_table import ConnectionTable
+from agent.pipeline import CONNECTION_CLOSED, CONNECTION_OPENED, EnrichmentPipeline
+from agent.wfp_events import ConnectionSubscription, EventCapture, EventQueue
+from agent.wfp_types import (
+    FWP_DIRECTION_OUTBOUND, FWPM_CONNECTION0, FWPM_CONNECTION_CALLBACK0, FWPM_CONNECTION_EVENT_ADD,
+    FWPM_CONNECTION_EVENT_DELETE, FWPM_CONNECTION_SUBSCRIPTION0, HANDLE, UINT32
+)
+
+class FakeFwpuclnt:
+    """Connection subscription half of fwpuclnt.dll: stores the callback and lets the test fire it."""
+
+    def __init__(self, result=0):
+        self.result = result
+        self.callback = None
+        self.unsubscribed = []
+        self._callbacks = {
+            "FwpmConnectionSubscribe0": ctypes.CFUNCTYPE(
+                UINT32, HANDLE, ctypes.POINTER(FWPM_CONNECTION_SUBSCRIPTION0), FWPM_CONNECTION_CALLBACK0,
+                ctypes.c_void_p, ctypes.POINTER(HANDLE))(self._subscribe),
+            "FwpmConnectionUnsubscribe0": ctypes.CFUNCTYPE(UINT32, HANDLE, HANDLE)(self._unsubscribe),
+        }
+
+    def __getattr__(self, name):
+        try:
+            return self._callbacks[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def _subscribe(self, engine, subscription, callback, context, handle_out):
+        if self.result:
+            return self.result
+        # callback arrives as a bare function pointer; rebuild the prototype to call it
+        self.callback = ctypes.cast(callback, FWPM_CONNECTION_CALLBACK0)
+        handle_out[0] = 99
+        return 0
+
+    def _unsubscribe(self, engine, handle):
+        self.unsubscribed.append(handle)
+        return 0
+
+    def emit(self, event_type, conn):
+        self.callback(None, event_type, ctypes.pointer(conn))
+
+class PreWin8Fwpuclnt:
+    """No FwpmConnectionSubscribe0 export."""
+
+def connection(cid, port=443):
+    conn = FWPM_CONNECTION0()
+    conn.connectionId = cid
+    conn.processId = 7
+    conn.remoteV4Address = 0x0A000001
+    conn.localPort = 50000 + cid
+    conn.remotePort = port
+    conn.direction = FWP_DIRECTION_OUTBOUND
+    return conn
+
+def raw(cid, port=443):
+    return {"id": cid, "process_id": 7, "local_addr": parse_address("10.0.0.2"), "local_port": 50000 + cid,
+            "remote_addr": parse_address("10.0.0.1"), "remote_port": port, "direction": "Outbound",
+            "process_name": "app.exe", "process_path": "C:\\Apps\\app.exe"}
+
+class FakeSource:
+    name = "fake"
+
+    def __init__(self, records=()):
+        self.records = list(records)
+        self.polls = 0
+
+    def iter_connections(self):
+        self.polls += 1
+        return iter(list(self.records))
+
+class FakeCollector:
+    def __init__(self):
+        self.samples = []
+
+    def add_sample(self, info):
+        self.samples.append(info)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_capture(lib, records=(), queue_size=100, reconcile_interval=60):
+    source = FakeSource(records)
+    pipeline = EnrichmentPipeline(source, collector=FakeCollector())
+    subscription = ConnectionSubscription(lib, HANDLE(1), EventQueue(queue_size))
+    clock = FakeClock()
+    capture = EventCapture(pipeline, subscription, reconcile_interval=reconcile_interval, clock=clock)
+    return capture, source, clock
+
+def test_apply_events_reports_short_lived_connections_as_added_and_removed():
+    table = ConnectionTable()
+    table.apply([], [{"id": 1, "process_id": 7}])
+
+    delta = table.apply_events([{"id": 2, "process_id": 7}], [1, 2, 3])
+
+    assert [info["id"] for info in delta.added] == [2]
+    assert sorted(info["id"] for info in delta.removed) == [1, 2]
+    assert delta.active == []
+
+def test_process_events_enriches_connection_closed_in_same_batch():
+    pipeline = EnrichmentPipeline(FakeSource(), collector=FakeCollector())
+    pipeline.process_events([(CONNECTION_OPENED, raw(1))])
+
+    delta = pipeline.process_events([
+        (CONNECTION_OPENED, raw(1)), # already known: not enriched again
+        (CONNECTION_OPENED, raw(2)),
+        (CONNECTION_CLOSED, raw(2)),
+        (CONNECTION_CLOSED, raw(3)), # never seen
+    ])
+
+    assert [info["id"] for info in delta.added] == [2]
+    assert [info["id"] for info in delta.removed] == [2]
+    assert [info["id"] for info in delta.active] == [1]
+    assert len(pipeline.collector.samples) == 2
+
+def test_event_queue_drops_oldest_when_full():
+    queue = EventQueue(maxlen=2)
+    for i in range(5):
+        queue.put(i)
+
+    assert queue.dropped == 3
+    assert queue.drain() == [3, 4]
+    assert len(queue) == 0
+
+def test_short_lived_connection_is_captured():
+    lib = FakeFwpuclnt()
+    capture, source, clock = make_capture(lib, records=[raw(1)])
+    assert capture.start() == "events"
+
+    delta = capture.step() # first step reconciles the connections open before subscribing
+    assert [info["id"] for info in delta.added] == [1]
+
+    # Opened and closed between two steps: a poll would never see it
+    lib.emit(FWPM_CONNECTION_EVENT_ADD, connection(5, port=4444))
+    lib.emit(FWPM_CONNECTION_EVENT_DELETE, connection(5, port=4444))
+    delta = capture.step()
+
+    assert [info["id"] for info in delta.added] == [5]
+    assert delta.added[0]["remote_port"] == 4444
+    assert [info["id"] for info in delta.removed] == [5]
+    assert [info["id"] for info in delta.active] == [1]
+    assert source.polls == 1
+    assert capture.pipeline.collector.samples[-1]["id"] == 5
+    assert capture.stats()["events_applied"] == 2
+
+def test_events_from_another_thread():
+    lib = FakeFwpuclnt()
+    capture, _, _ = make_capture(lib, queue_size=10000)
+    capture.start()
+    capture.step()
+
+    threads = [threading.Thread(target=lambda base=base: [lib.emit(FWPM_CONNECTION_EVENT_ADD, connection(base + i))
+                                                          for i in range(500)])
+               for base in (0, 1000)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    delta = capture.step()
+    assert len(delta.added) == 1000
+    assert capture.subscription.errors == 0
+
+def test_periodic_and_overflow_reconcile():
+    lib = FakeFwpuclnt()
+    capture, source, clock = make_capture(lib, queue_size=2, reconcile_interval=60)
+    capture.start()
+    capture.step()
+    assert source.polls == 1
+
+    clock.now = 30
+    capture.step()
+    assert source.polls == 1 # not due yet
+
+    # Dropped events: the table may be missing connections, so poll now
+    source.records = [raw(i) for i in range(3)]
+    for i in range(3):
+        lib.emit(FWPM_CONNECTION_EVENT_ADD, connection(i))
+    delta = capture.step()
+    assert capture.subscription.queue.dropped == 1
+    assert source.polls == 2
+    assert sorted(info["id"] for info in delta.active) == [0, 1, 2]
+
+    clock.now = 30 + 60
+    capture.step()
+    assert source.polls == 3
+    assert capture.stats()["reconciles"] == 3
+
+def test_falls_back_to_polling():
+    for lib in (FakeFwpuclnt(result=5), PreWin8Fwpuclnt()):
+        capture, source, _ = make_capture(lib, records=[raw(1)])
+        assert capture.start() == "poll"
+        capture.step()
+        capture.step()
+        assert source.polls == 2
+
+def test_stop_unsubscribes():
+    lib = FakeFwpuclnt()
+    capture, _, _ = make_capture(lib)
+    capture.start()
+    capture.stop()
+
+    assert lib.unsubscribed == [99]
+    assert capture.mode == "poll"
+    capture.stop() # idempotent
+    assert lib.unsubscribed == [99]
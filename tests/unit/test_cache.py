@@ -0,0 +1,35 @@
+import time
+from app.common.cache import LRUCache
+
+class TestLRUCache:
+    """Test suite for the shared LRU cache."""
+
+    def test_get_put(self):
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        assert cache.get("a") == 1
+        assert cache.get("missing", "default") == "default"
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_lru_eviction(self):
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")  # 'b' is now least recently used
+        cache.put("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        cache = LRUCache(maxsize=4, ttl=0.05)
+        cache.put("default", 1)
+        cache.put("long", 2, ttl=60)
+        time.sleep(0.1)
+
+        assert cache.get("default") is None
+        assert cache.get("long") == 2
+        assert [k for k, _ in cache.items()] == ["long"]
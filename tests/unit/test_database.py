@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.common.database import create_db_engine
+from app.common.models import Base
+from app.config import settings
+
+class TestDatabaseTuning:
+    """Test SQLite pragmas and the read-only engine."""
+
+    def test_writer_pragmas(self, tmp_path):
+        engine = create_db_engine(tmp_path / "tuned.db")
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            # NORMAL == 1
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == settings.DB_BUSY_TIMEOUT_MS
+            assert conn.execute(text("PRAGMA cache_size")).scalar() == -settings.DB_CACHE_SIZE_KB
+        assert engine.pool.size() == settings.DB_POOL_SIZE
+        engine.dispose()
+
+    def test_read_only_engine(self, tmp_path):
+        db_path = tmp_path / "shared.db"
+        writer = create_db_engine(db_path)
+        Base.metadata.create_all(bind=writer)
+        with writer.begin() as conn:
+            conn.execute(text("INSERT INTO dns_logs (timestamp, ip_address, hostname) "
+                              "VALUES (CURRENT_TIMESTAMP, '8.8.8.8', 'dns.google')"))
+
+        reader = create_db_engine(db_path, read_only=True)
+        with reader.connect() as conn:
+            assert conn.execute(text("SELECT hostname FROM dns_logs")).scalar() == "dns.google"
+            with pytest.raises(OperationalError):
+                conn.execute(text("DELETE FROM dns_logs"))
+
+        reader.dispose()
+        writer.dispose()
+
+    def test_memory_fallback(self):
+        engine = create_db_engine(":memory:")
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT 1")).scalar() == 1
@@ -0,0 +1,84 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+from app.common.migrations import run_migrations, get_schema_version, SCHEMA_VERSION
+from app.common.models import Base, Alert, AppPolicy, TrafficRollup, TrafficSample
+from app.core.action_manager import PENDING_STATUSES
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    """Database created before indexes existed: tables only, user_version 0."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(text(f"DROP INDEX {index.name}"))
+    yield engine
+    engine.dispose()
+
+def query_plan(engine, query) -> str:
+    sql = str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+class TestMigrations:
+    """Test schema migrations and index usage of hot queries."""
+
+    def test_legacy_db_gets_indexes(self, legacy_engine):
+        assert inspect(legacy_engine).get_indexes("alerts") == []
+
+        assert run_migrations(legacy_engine) == SCHEMA_VERSION
+        names = {ix["name"] for ix in inspect(legacy_engine).get_indexes("alerts")}
+        assert {"ix_alerts_status_timestamp", "ix_alerts_timestamp"} <= names
+
+        with legacy_engine.connect() as conn:
+            assert get_schema_version(conn) == SCHEMA_VERSION
+
+    def test_migrations_are_idempotent(self, legacy_engine):
+        run_migrations(legacy_engine)
+        assert run_migrations(legacy_engine) == SCHEMA_VERSION
+
+    def test_hot_queries_use_indexes(self, legacy_engine):
+        run_migrations(legacy_engine)
+        with Session(legacy_engine) as db:
+            # ActionManager.process_queue
+            plan = query_plan(legacy_engine, db.query(Alert).filter(Alert.status.in_(PENDING_STATUSES)))
+            assert "USING INDEX ix_alerts_status_timestamp" in plan
+
+            # MainWindow.load_alerts
+            plan = query_plan(legacy_engine, db.query(Alert).order_by(Alert.timestamp.desc()).limit(50))
+            assert "ix_alerts_timestamp" in plan
+            assert "TEMP B-TREE" not in plan
+
+            # PolicyEngine.add_policy
+            plan = query_plan(legacy_engine, db.query(AppPolicy).filter(AppPolicy.process_path == "C:\\x.exe"))
+            assert "USING INDEX sqlite_autoindex_app_policies" in plan
+
+            # Time-range reads of traffic samples
+            plan = query_plan(legacy_engine, db.query(TrafficSample).filter(TrafficSample.timestamp >= "2026-01-01"))
+            assert "ix_traffic_samples_timestamp" in plan
+
+    def test_null_rollup_buckets_are_merged(self, legacy_engine):
+        with legacy_engine.begin() as conn:
+            conn.execute(text("PRAGMA user_version=1"))
+            # traffic_rollups as first shipped, with nullable bucket key columns
+            conn.execute(text("DROP TABLE traffic_rollups"))
+            conn.execute(text(
+                "CREATE TABLE traffic_rollups (id INTEGER PRIMARY KEY, hour DATETIME NOT NULL, "
+                "process_name VARCHAR(255) NOT NULL, remote_port INTEGER, remote_hostname VARCHAR(255), "
+                "direction VARCHAR(10), sample_count INTEGER NOT NULL, "
+                "CONSTRAINT uq_traffic_rollups_bucket UNIQUE (hour, process_name, remote_port, remote_hostname, direction))"
+            ))
+            # Stored before the key columns were coalesced: the NULLs never conflicted
+            for count in (2, 3):
+                conn.execute(text(
+                    "INSERT INTO traffic_rollups (hour, process_name, remote_port, remote_hostname, direction, sample_count) "
+                    f"VALUES ('2024-03-10 10:00:00.000000', 'chrome.exe', 443, NULL, 'Outbound', {count})"
+                ))
+
+        run_migrations(legacy_engine)
+        with Session(legacy_engine) as db:
+            rows = [(r.remote_hostname, r.sample_count) for r in db.query(TrafficRollup)]
+        assert rows == [("", 5)]
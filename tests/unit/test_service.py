@@ -2,6 +2,7 @@ import logging
 import sys
 from unittest.mock import MagicMock, patch
 import pytest
+from sqlalchemy import create_engine, inspect, text
 
 # Mock win32 modules before importing service
 if 'win32serviceutil' not in sys.modules:
@@ -81,3 +82,30 @@ class TestPortKodiakService:
         service.main.assert_called_once()
 
 
+
+    def test_start_agent_migrates_existing_database(self, mock_service_deps, tmp_path) -> None:
+        """start_agent brings an old database up to date before the agent is built."""
+        from app.common import database
+        from app.common.migrations import SCHEMA_VERSION
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+        with engine.begin() as conn:
+            # Schema of a deployment from before indexes and rollups
+            conn.execute(text(
+                "CREATE TABLE alerts (id INTEGER PRIMARY KEY, timestamp DATETIME, severity VARCHAR(20), "
+                "title VARCHAR(255), description TEXT, process_name VARCHAR(255), "
+                "process_path VARCHAR(512), status VARCHAR(50))"
+            ))
+
+        service = PortKodiakService(['PortKodiakAIShield'])
+        wfp = MagicMock(WfpManager=MagicMock(side_effect=OSError("WFP unavailable")))
+        with patch.object(database, 'get_engine', return_value=engine), \
+             patch.dict(sys.modules, {'agent.wfp_wrapper': wfp}):
+            assert service.start_agent() is None
+
+        tables = set(inspect(engine).get_table_names())
+        assert {"traffic_rollups", "rollup_watermarks"} <= tables
+        assert "ix_alerts_timestamp" in {ix["name"] for ix in inspect(engine).get_indexes("alerts")}
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA user_version")).scalar() == SCHEMA_VERSION
+        engine.dispose()